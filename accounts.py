@@ -0,0 +1,186 @@
+"""
+User Accounts
+
+Records, video views and the daily rollup belong to a User (user_id), so
+one instance can host a whole class. A request acts as the user logged in
+through Flask-Login; without a login it acts as the default user, who owns
+the data of the original single-user installation. Once a second user
+exists (or when REQUIRE_LOGIN is set), anonymous /api/* requests are
+rejected instead, so students cannot act as the default user. Admin
+rights follow the same rule: an anonymous request is the admin of a
+single-user installation, and only logged-in admins are admins otherwise.
+"""
+
+import os
+import secrets
+import time
+
+from flask import current_app, has_request_context, jsonify, request
+from flask_login import LoginManager, current_user
+from sqlalchemy import select, update
+
+from models import db, User, UserStatus
+
+DEFAULT_USERNAME = 'default'
+DEFAULT_DISPLAY_NAME = 'イラスト・クリエイター'
+
+# ログイン不要のエンドポイント
+PUBLIC_ENDPOINTS = {'api.login', 'api.logout', 'api.get_current_account'}
+
+SECRET_KEY_FILE = 'secret.key'  # instance/ に保存する生成済みの署名鍵
+# 公開されているサンプル値（セッションを偽造できるため使用不可）
+PLACEHOLDER_SECRET_KEYS = {'your_secret_key_here'}
+
+# ユーザーの有無を再確認する間隔（秒）。他のプロセス（flask create-user）で作成されたユーザーはこの時間内に反映される
+LOGIN_CHECK_INTERVAL = 10
+
+login_manager = LoginManager()
+
+
+@login_manager.user_loader
+def load_user(user_id):
+    return db.session.get(User, int(user_id))
+
+
+def login_required():
+    """APIにログインが必要かどうか（REQUIRE_LOGIN、またはデフォルト以外のユーザーが存在する場合）を返します。
+
+    The answer is kept in the app config: once a user exists it stays
+    True (users are never deleted), and "no users yet" is re-checked every
+    LOGIN_CHECK_INTERVAL seconds instead of on every anonymous request.
+    """
+    config = current_app.config
+    if config.get('REQUIRE_LOGIN') or config.get('HAS_LOGIN_USERS'):
+        return True
+    now = time.monotonic()
+    checked_at = config.get('LOGIN_USERS_CHECKED_AT')
+    if checked_at is not None and now - checked_at < LOGIN_CHECK_INTERVAL:
+        return False
+    has_users = db.session.execute(
+        select(User.id).where(User.username != DEFAULT_USERNAME).limit(1)
+    ).first() is not None
+    config['HAS_LOGIN_USERS'] = has_users
+    config['LOGIN_USERS_CHECKED_AT'] = now
+    return has_users
+
+
+def load_secret_key(app):
+    """セッション署名鍵を返します。
+
+    The SECRET_KEY environment variable wins; otherwise a random key is
+    generated once and kept in instance/secret.key, so sessions survive
+    restarts and every server process signs with the same key.
+    """
+    key = os.environ.get('SECRET_KEY')
+    if key:
+        return key
+
+    path = os.path.join(app.instance_path, SECRET_KEY_FILE)
+    os.makedirs(app.instance_path, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(secrets.token_hex(32))
+        try:
+            # 同時に起動したプロセスのうち最初の1つの鍵だけが使われる
+            os.link(tmp_path, path)
+        except FileExistsError:
+            pass
+    finally:
+        os.remove(tmp_path)
+    with open(path, encoding='utf-8') as f:
+        return f.read().strip()
+
+
+def init_accounts(app):
+    """Flask-Login を初期化し、未ログインの /api/* リクエストの確認を登録します。"""
+    secret_key = app.config.get('SECRET_KEY')
+    if not secret_key or secret_key in PLACEHOLDER_SECRET_KEYS:
+        raise RuntimeError('SECRET_KEY が未設定かサンプル値のため、ログインを有効にできません。'
+                           '環境変数 SECRET_KEY を設定するか load_secret_key() を使用してください。')
+    app.config.setdefault('REQUIRE_LOGIN', False)
+    login_manager.init_app(app)
+
+    @app.before_request
+    def require_login():
+        if not request.path.startswith('/api/'):
+            return None
+        if request.endpoint in PUBLIC_ENDPOINTS or current_user.is_authenticated:
+            return None
+        if not login_required():
+            return None
+        return jsonify({'error': 'ログインが必要です。'}), 401
+
+
+def create_user(username, password, is_admin=False, display_name=None):
+    """ユーザーとそのステータス行を作成します（コミットは呼び出し側）。"""
+    user = User(username=username, is_admin=is_admin)
+    user.set_password(password)
+    db.session.add(user)
+    db.session.flush()
+    db.session.add(UserStatus(user_id=user.id, username=display_name or username, total_xp=0))
+    if username != DEFAULT_USERNAME:
+        current_app.config['HAS_LOGIN_USERS'] = True
+    return user
+
+
+def ensure_default_user():
+    """デフォルトユーザーとそのステータス行が無ければ作成し、IDを返します（コミットは呼び出し側）。
+
+    A status row left over from the single-user schema (no user_id) is
+    adopted, keeping its username and total XP.
+    """
+    user = User.query.filter_by(username=DEFAULT_USERNAME).first()
+    if user is None:
+        user = User(username=DEFAULT_USERNAME, is_admin=False)
+        user.set_password(secrets.token_urlsafe(32))  # パスワードでのログインは不可
+        db.session.add(user)
+        db.session.flush()
+
+    if UserStatus.query.filter_by(user_id=user.id).first() is None:
+        legacy = UserStatus.query.filter(UserStatus.user_id.is_(None)).order_by(UserStatus.id).first()
+        if legacy:
+            legacy.user_id = user.id
+        else:
+            db.session.add(UserStatus(user_id=user.id, username=DEFAULT_DISPLAY_NAME, total_xp=0))
+        db.session.flush()
+    return user.id
+
+
+def revoke_default_user_admin():
+    """以前のバージョンで管理者として作成されたデフォルトユーザーの管理者権限を外します。"""
+    db.session.execute(
+        update(User).where(User.username == DEFAULT_USERNAME).values(is_admin=False)
+    )
+
+
+def default_user_id():
+    """デフォルトユーザーのIDを返します。"""
+    user_id = current_app.config.get('DEFAULT_USER_ID')
+    if user_id is None:
+        user_id = ensure_default_user()
+        db.session.commit()
+        current_app.config['DEFAULT_USER_ID'] = user_id
+    return user_id
+
+
+def current_user_id():
+    """リクエストのユーザーID（未ログイン時やリクエスト外ではデフォルトユーザー）を返します。"""
+    if has_request_context() and current_user.is_authenticated:
+        return current_user.id
+    return default_user_id()
+
+
+def current_user_is_admin():
+    """管理者かどうかを返します。
+
+    Logged-in users are admins if their account is. An anonymous request is
+    an admin only while no login is required (the single-user installation,
+    where it acts as the default user); otherwise it is rejected before
+    reaching the API anyway.
+    """
+    if not has_request_context():
+        return False
+    if current_user.is_authenticated:
+        return bool(current_user.is_admin)
+    return not login_required()
@@ -3,15 +3,39 @@ REST API Endpoints for React SPA Frontend
 This file contains additional API endpoints for the React frontend
 """
 
-from flask import Blueprint, jsonify, request, current_app
-from datetime import datetime
-from models import db, UserStatus, Record, Book, ResourceLink, YouTubePlaylist, VideoView, PlaylistViewHistory, PlaylistMaterial
+from flask import Blueprint, jsonify, request, current_app, Response, send_file, stream_with_context
+from flask_login import login_user, logout_user, current_user
+from datetime import datetime, timedelta
+from models import db, User, UserStatus, Record, Book, ResourceLink, YouTubePlaylist, PlaylistVideo, VideoView, PlaylistViewHistory, PlaylistMaterial, DailyStats
 from xp_core import XPCalculator, Constants
+from page_cache import page_cache, file_version, make_cache_key
+from document_pool import document_pool
+from render_pool import render_pool
+from book_tasks import book_tasks
+from pdf_render import render_pixmap, read_pdf_metadata
+from book_thumbnails import build_sprite_sheets, load_index, remove_thumbnails, thumbnail_dir
+from book_search import index_book_text, remove_book_text, search_pages, MIN_QUERY_LENGTH
+from daily_stats import apply_record, clear_daily_stats
+from response_cache import response_cache, PROGRESS_VERSION_ID
+from storage import run_with_retry
+from user_xp import add_user_xp, get_user_status
+from accounts import current_user_id, current_user_is_admin, login_required
+from record_import import import_records, iter_csv_rows, iter_json_rows
+from record_export import iter_records_csv, iter_export_json, gzip_chunks
+from playlist_progress import get_playlist_progress, EMPTY_PROGRESS
+from playlist_cache import playlist_cache
+from playlist_refresh import playlist_refresh
+from playlist_videos import sync_playlist_videos, find_playlist_video, find_playlist_videos, mark_view_completed, record_view_progress
+from progress_buffer import progress_buffer
 from werkzeug.utils import secure_filename
+from sqlalchemy import func, tuple_, delete, case
 import os
+import json
+import uuid
+import base64
+import binascii
+from collections import deque
 import fitz  # PyMuPDF for PDF rendering
-import io
-from PIL import Image
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
@@ -20,6 +44,18 @@ UPLOAD_FOLDER = "static/uploads"
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "pdf", "epub"}
 ALLOWED_MATERIAL_EXTENSIONS = {"pdf", "pptx", "ppt", "doc", "docx", "zip", "txt", "md"}
 
+# Render settings used by the BookReader page view (pre-rendered into the page cache)
+READER_ZOOM = 2
+READER_QUALITY = 85
+
+# Deep zoom tiles: fixed pixel size, zoom levels beyond the page endpoint's 1-4
+TILE_SIZE = 512
+TILE_MAX_ZOOM = 8
+
+# Cursor pagination of records (/records, /archive, /works)
+CURSOR_PAGE_SIZE = 50
+CURSOR_MAX_PAGE_SIZE = 200
+
 
 def allowed_file(filename):
     """Check if file extension is allowed."""
@@ -46,9 +82,9 @@ def extract_pdf_first_page(pdf_filepath):
         if pdf_doc.page_count < 1:
             return None, None
         
-        # Get first page and render as image (300 dpi)
+        # Get first page and render as an RGB image (72 dpi, no alpha channel)
         first_page = pdf_doc[0]
-        pix = first_page.get_pixmap(matrix=fitz.Matrix(1, 1))
+        pix = render_pixmap(first_page, 1)
         
         # Generate filename
         timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
@@ -81,11 +117,284 @@ def normalize_file_path(file_path):
     return file_path
 
 
+def encode_cursor(record):
+    """Encode the (date, id) position of a record as an opaque cursor token."""
+    raw = f"{record.date.isoformat()}|{record.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a cursor token into (date, id). Raises ValueError if invalid."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        date, record_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(date), int(record_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError('カーソルが不正です。')
+
+
+def cursor_requested():
+    """Whether the client asked for cursor pagination (a 'cursor' parameter, empty for the first page)."""
+    return 'cursor' in request.args
+
+
+def paginate_records(query, serialize):
+    """Keyset-paginate a Record query on (date, id), newest first.
+    
+    Query Parameters:
+    - cursor: next_cursor of the previous page (empty for the first page)
+    - limit: Records per page (default: 50, max: 200)
+    
+    Only one page (plus one look-ahead row) is loaded, and the cursor
+    condition is an index range scan, so the cost does not grow with the
+    number of older records.
+    
+    Returns:
+        Dict with 'data' and 'next_cursor' (None on the last page)
+    """
+    limit = request.args.get('limit', CURSOR_PAGE_SIZE, type=int)
+    limit = max(1, min(CURSOR_MAX_PAGE_SIZE, limit))
+    
+    cursor = request.args.get('cursor', '')
+    if cursor:
+        date, record_id = decode_cursor(cursor)
+        query = query.filter(tuple_(Record.date, Record.id) < (date, record_id))
+    
+    records = query.order_by(Record.date.desc(), Record.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_cursor(records[limit - 1]) if len(records) > limit else None
+    return {
+        'data': [serialize(r) for r in records[:limit]],
+        'next_cursor': next_cursor
+    }
+
+
+def year_range(year):
+    """Get the [start, end) datetimes of a year, so year filters can use the date index."""
+    return datetime(year, 1, 1), datetime(year + 1, 1, 1)
+
+
+def get_book_pdf_path(book):
+    """Get the full path of a book's PDF file (None if the book has no PDF)."""
+    if not book.pdf_file_path:
+        return None
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], normalize_file_path(book.pdf_file_path))
+
+
+def store_book_metadata(book, pdf_path):
+    """Read page count, page sizes and outline from the PDF into the Book row (not committed)."""
+    with document_pool.open(pdf_path) as doc:
+        metadata = read_pdf_metadata(doc)
+    book.page_count = metadata['page_count']
+    book.page_sizes = json.dumps(metadata['page_sizes'])
+    book.outline = json.dumps(metadata['outline'], ensure_ascii=False)
+
+
+def store_uploaded_book_metadata(book, pdf_path):
+    """Read the metadata of a newly uploaded PDF into the Book row.
+    
+    A corrupt or password-protected PDF (fitz raises FileDataError, a
+    RuntimeError, or ValueError) is deleted again and a 400 response is
+    returned; None on success.
+    """
+    try:
+        store_book_metadata(book, pdf_path)
+    except (RuntimeError, ValueError):
+        document_pool.invalidate(pdf_path)
+        os.remove(pdf_path)
+        return jsonify({'error': 'PDFを読み込めませんでした。破損しているか、パスワードで保護されています。'}), 400
+    return None
+
+
+def ensure_book_metadata(book, pdf_path):
+    """Fill the PDF metadata of a book uploaded before it was stored, then return the page count."""
+    if book.page_count is None:
+        store_book_metadata(book, pdf_path)
+        db.session.commit()
+    return book.page_count
+
+
+def book_page_rect(book, page_num):
+    """Get a page rectangle from the stored page sizes (None if out of range)."""
+    page_sizes = book.get_page_sizes()
+    if page_num < 0 or page_num >= len(page_sizes):
+        return None
+    width, height = page_sizes[page_num]
+    return fitz.Rect(0, 0, width, height)
+
+
+def invalidate_book_renders(book_id, pdf_path):
+    """Drop everything rendered from a book's PDF (on delete or PDF replacement)."""
+    book_tasks.cancel(book_id)
+    page_cache.invalidate_book(book_id)
+    remove_thumbnails(current_app.config['THUMBNAIL_FOLDER'], book_id)
+    if pdf_path:
+        document_pool.invalidate(pdf_path)
+
+
+def get_render_options():
+    """Read zoom/quality/format options shared by the page endpoints.
+    
+    Returns:
+        Tuple of (zoom, quality, use_webp)
+    """
+    zoom = request.args.get('zoom', 2, type=int)
+    if zoom < 1 or zoom > 4:
+        zoom = 2
+    
+    # Get quality parameter (default 85 for good balance)
+    quality = request.args.get('quality', 85, type=int)
+    quality = max(50, min(95, quality))  # Clamp to 50-95
+    
+    # Get format preference from Accept header or query param
+    preferred_format = request.args.get('format', 'jpeg').lower()
+    accept_header = request.headers.get('Accept', '')
+    use_webp = preferred_format == 'webp' or 'image/webp' in accept_header
+    
+    return zoom, quality, use_webp
+
+
+def page_cache_key(book_id, version, page_num, zoom, quality, use_webp):
+    """Build the page cache key (also used as the ETag)."""
+    return make_cache_key('page', book_id, version, page_num, zoom, quality, 'webp' if use_webp else 'jpeg')
+
+
+def tile_grid(page_rect, zoom):
+    """Get the tile grid of a page at a zoom level.
+    
+    Returns:
+        Tuple of (width, height, cols, rows) in rendered pixels / tiles
+    """
+    width = int(round(page_rect.width * zoom))
+    height = int(round(page_rect.height * zoom))
+    return width, height, -(-width // TILE_SIZE), -(-height // TILE_SIZE)
+
+
+def tile_clip(page_rect, zoom, x, y):
+    """Get the clip rectangle (page coordinates) of tile (x, y), or None if outside the page."""
+    span = TILE_SIZE / zoom
+    x0 = page_rect.x0 + x * span
+    y0 = page_rect.y0 + y * span
+    if x < 0 or y < 0 or x0 >= page_rect.x1 or y0 >= page_rect.y1:
+        return None
+    return (x0, y0, min(x0 + span, page_rect.x1), min(y0 + span, page_rect.y1))
+
+
+def iter_page_images(book_id, pdf_path, page_nums, zoom, quality, use_webp):
+    """Yield (page_num, image_bytes, mimetype, error) in page order.
+    
+    Cached pages are served directly. Uncached pages are rendered by the
+    renderer pool with a bounded number in flight, so memory stays flat
+    however many pages are requested.
+    """
+    version = file_version(pdf_path)
+    window = max(2, render_pool.workers * 2)
+    pending = deque()
+    
+    def finish(page_num, cache_key, cached, future):
+        if cached:
+            return page_num, cached[0], cached[1], None
+        try:
+            data, mimetype = future.result()
+        except Exception as e:
+            return page_num, None, None, e
+        page_cache.put(cache_key, book_id, data, mimetype)
+        return page_num, data, mimetype, None
+    
+    for i in page_nums:
+        cache_key = page_cache_key(book_id, version, i, zoom, quality, use_webp)
+        cached = page_cache.get(cache_key)
+        future = None if cached else render_pool.submit(pdf_path, i, zoom, quality, use_webp)
+        pending.append((i, cache_key, cached, future))
+        while len(pending) >= window:
+            yield finish(*pending.popleft())
+    
+    while pending:
+        yield finish(*pending.popleft())
+
+
+def prerender_book_pages(task, book_id, pdf_path, max_pages):
+    """Background task: render a book's pages into the page cache at reader settings."""
+    with document_pool.open(pdf_path) as doc:
+        total = len(doc)
+    if max_pages:
+        total = min(total, max_pages)
+    task.total = total
+    
+    for page_num, data, mimetype, error in iter_page_images(book_id, pdf_path, range(total), READER_ZOOM, READER_QUALITY, False):
+        if task.cancelled:
+            break
+        if error is not None:
+            raise error
+        task.done += 1
+
+
+def start_prerender(book_id, pdf_path, max_pages=None):
+    """Queue a background pre-render of a book (replaces any running one)."""
+    if max_pages is None:
+        max_pages = current_app.config.get('PRERENDER_MAX_PAGES')
+    return book_tasks.submit('prerender', book_id, prerender_book_pages, book_id, pdf_path, max_pages)
+
+
+def start_text_index(book_id, pdf_path):
+    """Queue background text extraction of a book into the full-text search index."""
+    return book_tasks.submit('text_index', book_id, index_book_text, book_id, pdf_path)
+
+
+def prerender_requested():
+    """Whether an upload should be pre-rendered (form field 'prerender' overrides the config)."""
+    prerender = request.form.get('prerender')
+    if prerender is None:
+        return current_app.config.get('PRERENDER_ON_UPLOAD', False)
+    return prerender.lower() in ('1', 'true')
+
+
+def multipart_page_stream(header, pages, boundary):
+    """Encode a JSON header part followed by one image part per page as multipart/mixed."""
+    delimiter = f'--{boundary}\r\n'.encode()
+    yield delimiter
+    yield b'Content-Type: application/json\r\n\r\n'
+    yield json.dumps(header).encode() + b'\r\n'
+    
+    for page_num, data, mimetype, error in pages:
+        if error is not None:
+            data = json.dumps({'page_num': page_num, 'error': str(error)}).encode()
+            mimetype = 'application/json'
+        yield delimiter
+        yield (
+            f'Content-Type: {mimetype}\r\n'
+            f'Content-Length: {len(data)}\r\n'
+            f'X-Page-Num: {page_num}\r\n\r\n'
+        ).encode()
+        yield data
+        yield b'\r\n'
+    
+    yield f'--{boundary}--\r\n'.encode()
+
+
+def image_response(data, mimetype, etag):
+    """Build an image response that browsers revalidate with If-None-Match."""
+    response = Response(data, mimetype=mimetype)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept')
+    return response
+
+
+def not_modified_response(etag):
+    """Build a 304 response for a matching If-None-Match."""
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept')
+    return response
+
+
 # --- Status API ---
 @api_bp.route('/status', methods=['GET'])
 def get_status():
     """Get current user status and XP info"""
-    user_status = UserStatus.query.first()
+    user_id = current_user_id()
+    user_status = get_user_status(user_id)
     if not user_status:
         rank_info = XPCalculator.get_rank_info(0)
         rank_info['username'] = "新規ユーザー"
@@ -98,7 +407,7 @@ def get_status():
     
     total_time_minutes = db.session.scalar(
         db.select(db.func.sum(Record.duration_minutes))
-        .where(Record.type == '時間学習')
+        .where(Record.user_id == user_id, Record.type == '時間学習')
     ) or 0
     rank_info['total_time_minutes'] = total_time_minutes
     rank_info['total_time_hours'] = total_time_minutes // 60
@@ -117,59 +426,123 @@ def get_constants():
 
 
 # --- Records API ---
+def save_new_record(record):
+    """Insert a record, add its XP to the user and update the daily rollup in one transaction.
+    
+    The record belongs to the current user unless its user_id is already set.
+    The transaction is re-run on lock contention (see storage.run_with_retry).
+    
+    Returns:
+        The user's total XP after the record
+    """
+    if record.user_id is None:
+        record.user_id = current_user_id()
+    
+    def write():
+        db.session.add(record)
+        db.session.flush()
+        apply_record(record)
+        total_xp = add_user_xp(record.xp_gained, record.user_id)
+        db.session.commit()
+        return total_xp
+    
+    return run_with_retry(write)
+
+
+def remove_record(record_id):
+    """Delete a record of the current user, subtract its XP and update the daily rollup in one transaction.
+    
+    The row is deleted with DELETE ... RETURNING, so when two requests
+    delete the same record only one of them subtracts its XP.
+    
+    Returns:
+        True if the record existed
+    """
+    user_id = current_user_id()
+    
+    def write():
+        row = db.session.execute(
+            delete(Record).where(Record.id == record_id, Record.user_id == user_id).returning(
+                Record.user_id, Record.type, Record.subtype, Record.evaluation, Record.xp_gained,
+                Record.duration_minutes, Record.date
+            ),
+            execution_options={'synchronize_session': 'fetch'}
+        ).first()
+        if row is None:
+            db.session.rollback()
+            return False
+        
+        apply_record(Record(**row._asdict()), -1)
+        add_user_xp(-(row.xp_gained or 0), user_id)
+        db.session.commit()
+        return True
+    
+    return run_with_retry(write)
+
+
+def serialize_record(r):
+    return {
+        'id': r.id,
+        'type': r.type,
+        'subtype': r.subtype,
+        'description': r.description,
+        'xp_gained': r.xp_gained,
+        'date': r.date.isoformat() if r.date else None,
+        'duration_minutes': r.duration_minutes,
+        'evaluation': r.evaluation,
+        'image_path': r.image_path,
+        'year': r.get_year()
+    }
+
+
 @api_bp.route('/records', methods=['GET'])
 def get_records():
-    """Get all records with optional filtering"""
+    """Get all records with optional filtering
+    
+    Query Parameters:
+    - type: Record type (optional)
+    - year: Year (optional)
+    - limit: Max records (or page size in cursor mode)
+    - cursor: Enables cursor pagination; see paginate_records()
+    
+    Without 'cursor' a plain list is returned (legacy format).
+    """
     record_type = request.args.get('type')
     year = request.args.get('year')
     limit = request.args.get('limit', type=int)
     
-    query = Record.query.order_by(Record.date.desc())
+    query = Record.query.filter(Record.user_id == current_user_id())
     
     if record_type:
         query = query.filter(Record.type == record_type)
     
     if year:
-        query = query.filter(db.extract('year', Record.date) == int(year))
+        start, end = year_range(int(year))
+        query = query.filter(Record.date >= start, Record.date < end)
     
+    if cursor_requested():
+        try:
+            return jsonify(paginate_records(query, serialize_record))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    
+    query = query.order_by(Record.date.desc())
     if limit:
         query = query.limit(limit)
     
     records = query.all()
     
-    return jsonify([{
-        'id': r.id,
-        'type': r.type,
-        'subtype': r.subtype,
-        'description': r.description,
-        'xp_gained': r.xp_gained,
-        'date': r.date.isoformat() if r.date else None,
-        'duration_minutes': r.duration_minutes,
-        'evaluation': r.evaluation,
-        'image_path': r.image_path,
-        'year': r.get_year()
-    } for r in records])
+    return jsonify([serialize_record(r) for r in records])
 
 
 @api_bp.route('/records/<int:id>', methods=['GET'])
 def get_record(id):
     """Get a single record"""
     record = db.session.get(Record, id)
-    if not record:
+    if not record or record.user_id != current_user_id():
         return jsonify({'error': 'Record not found'}), 404
     
-    return jsonify({
-        'id': record.id,
-        'type': record.type,
-        'subtype': record.subtype,
-        'description': record.description,
-        'xp_gained': record.xp_gained,
-        'date': record.date.isoformat() if record.date else None,
-        'duration_minutes': record.duration_minutes,
-        'evaluation': record.evaluation,
-        'image_path': record.image_path,
-        'year': record.get_year()
-    })
+    return jsonify(serialize_record(record))
 
 
 @api_bp.route('/records/time', methods=['POST'])
@@ -224,22 +597,15 @@ def log_time():
             date=datetime.now()
         )
         
-        # Update user status
-        user_status = UserStatus.query.first()
-        if not user_status:
-            user_status = UserStatus(username='新規ユーザー', total_xp=0)
-            db.session.add(user_status)
-        
-        user_status.total_xp += gained_xp
-        db.session.add(new_record)
-        db.session.commit()
+        # Save the record and update user status
+        total_xp = save_new_record(new_record)
         
         return jsonify({
             'success': True,
             'message': f'{activity_type} の記録に成功しました! +{gained_xp:,} XPを獲得しました。',
             'xp_gained': gained_xp,
             'record_id': new_record.id,
-            'total_xp': user_status.total_xp
+            'total_xp': total_xp
         }), 201
     
     except ValueError as e:
@@ -283,11 +649,7 @@ def log_acquisition():
             image_path=image_path,
             date=datetime.now()
         )
-        db.session.add(new_record)
-        
-        user_status = UserStatus.query.first()
-        user_status.total_xp += gained_xp
-        db.session.commit()
+        save_new_record(new_record)
         
         return jsonify({
             'success': True,
@@ -330,11 +692,7 @@ def log_post():
             image_path=image_path,
             date=datetime.now()
         )
-        db.session.add(new_record)
-        
-        user_status = UserStatus.query.first()
-        user_status.total_xp += gained_xp
-        db.session.commit()
+        save_new_record(new_record)
         
         return jsonify({
             'success': True,
@@ -348,22 +706,63 @@ def log_post():
         return jsonify({'error': str(e)}), 500
 
 
+@api_bp.route('/records/bulk', methods=['POST'])
+def bulk_import_records():
+    """Bulk import records in the /export/csv or /export/json format.
+    
+    Body: a multipart upload in ``file`` (.csv or .json), or a raw
+    ``text/csv`` / ``application/json`` request body.
+    
+    Query Parameters:
+    - skip_duplicates: Skip rows whose date, type and subtype already exist (default: false)
+    - dry_run: Only validate the rows (default: false)
+    
+    XP is recomputed for every row. Valid rows are inserted in batches,
+    each with a single rollup and total XP update; invalid rows are
+    reported in ``errors`` with their 1-based row number.
+    """
+    try:
+        skip_duplicates = request.args.get('skip_duplicates', 'false').lower() == 'true'
+        dry_run = request.args.get('dry_run', 'false').lower() == 'true'
+        
+        upload = request.files.get('file')
+        if upload:
+            is_json = upload.filename.lower().endswith('.json') or upload.mimetype == 'application/json'
+            stream = upload.stream
+        elif request.mimetype in ('text/csv', 'application/json'):
+            is_json = request.mimetype == 'application/json'
+            stream = request.stream
+        else:
+            return jsonify({'error': 'CSVまたはJSONファイルを指定してください。'}), 400
+        
+        try:
+            if is_json:
+                rows = iter_json_rows(json.load(stream))
+            else:
+                rows = iter_csv_rows(stream)
+        except (ValueError, UnicodeDecodeError) as e:
+            return jsonify({'error': f'ファイルを読み込めません: {str(e)}'}), 400
+        
+        result = import_records(rows, current_user_id(), skip_duplicates=skip_duplicates, dry_run=dry_run)
+        result['success'] = True
+        result['dry_run'] = dry_run
+        return jsonify(result), 200 if dry_run else 201
+    
+    except UnicodeDecodeError as e:
+        db.session.rollback()
+        return jsonify({'error': f'ファイルを読み込めません: {str(e)}'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
 @api_bp.route('/records/<int:id>', methods=['DELETE'])
 def delete_record(id):
     """Delete a record"""
     try:
-        record = db.session.get(Record, id)
-        if not record:
+        if not remove_record(id):
             return jsonify({'error': 'Record not found'}), 404
         
-        # Subtract XP from user
-        user_status = UserStatus.query.first()
-        if user_status:
-            user_status.total_xp = max(0, user_status.total_xp - record.xp_gained)
-        
-        db.session.delete(record)
-        db.session.commit()
-        
         return jsonify({'success': True, 'message': '記録を削除しました。'})
     
     except Exception as e:
@@ -450,7 +849,8 @@ def get_book(id):
                 'description': book.description,
                 'pdf_file_path': normalize_file_path(book.pdf_file_path),
                 'cover_image_path': normalize_file_path(book.cover_image_path),
-                'added_date': book.added_date.isoformat() if book.added_date else None
+                'added_date': book.added_date.isoformat() if book.added_date else None,
+                'page_count': book.page_count
             })
         
         except Exception as e:
@@ -462,8 +862,11 @@ def get_book(id):
             if not book:
                 return jsonify({'error': 'Book not found'}), 404
             
+            pdf_path = get_book_pdf_path(book)
+            remove_book_text(id)
             db.session.delete(book)
             db.session.commit()
+            invalidate_book_renders(id, pdf_path)
             
             return jsonify({
                 'success': True,
@@ -486,12 +889,17 @@ def get_book(id):
             book.description = request.form.get('description', book.description)
             
             # Update PDF if provided
+            old_pdf_path = get_book_pdf_path(book)
             pdf_file = request.files.get('pdf_file')
             if pdf_file and pdf_file.filename and allowed_file(pdf_file.filename):
                 pdf_filename = secure_filename(f"{datetime.now().strftime('%Y%m%d%H%M%S')}_book_{pdf_file.filename}")
                 pdf_filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], pdf_filename)
                 pdf_file.save(pdf_filepath)
                 book.pdf_file_path = pdf_filename  # Store only filename
+                error_response = store_uploaded_book_metadata(book, pdf_filepath)
+                if error_response:
+                    db.session.rollback()
+                    return error_response
                 # Auto-extract cover from new PDF if no cover image is provided
                 cover_image = request.files.get('cover_image')
                 if not cover_image or not cover_image.filename:
@@ -508,6 +916,11 @@ def get_book(id):
                 book.cover_image_path = cover_filename  # Store only filename
             
             db.session.commit()
+            if pdf_file and pdf_file.filename and allowed_file(pdf_file.filename):
+                invalidate_book_renders(id, old_pdf_path)
+                start_text_index(id, pdf_filepath)
+                if prerender_requested():
+                    start_prerender(id, pdf_filepath)
             
             return jsonify({
                 'success': True,
@@ -540,7 +953,15 @@ def create_book():
         pdf_filename = secure_filename(f"{datetime.now().strftime('%Y%m%d%H%M%S')}_book_{pdf_file.filename}")
         pdf_filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], pdf_filename)
         pdf_file.save(pdf_filepath)
-        pdf_path = pdf_filename  # Store only filename
+        book = Book(
+            title=title,
+            author=author,
+            description=description,
+            pdf_file_path=pdf_filename  # Store only filename
+        )
+        error_response = store_uploaded_book_metadata(book, pdf_filepath)
+        if error_response:
+            return error_response
         
         # Save cover image or extract from PDF
         cover_path = None
@@ -556,16 +977,14 @@ def create_book():
             if extracted_filename:
                 cover_path = extracted_filename
         
-        book = Book(
-            title=title,
-            author=author,
-            description=description,
-            pdf_file_path=pdf_path,
-            cover_image_path=cover_path
-        )
+        book.cover_image_path = cover_path
         db.session.add(book)
         db.session.commit()
         
+        start_text_index(book.id, pdf_filepath)
+        if prerender_requested():
+            start_prerender(book.id, pdf_filepath)
+        
         return jsonify({
             'success': True,
             'message': f'書籍「{title}」を登録しました。',
@@ -577,9 +996,128 @@ def create_book():
         return jsonify({'error': str(e)}), 500
 
 
+@api_bp.route('/books/search', methods=['GET'])
+def search_books():
+    """Full-text search over the pages of all books.
+    
+    Query Parameters:
+    - q: Search words (each at least 3 characters; all must match)
+    - page: Page number (default: 1)
+    - limit: Results per page (default: 20, max: 100)
+    
+    Results are pages ranked by relevance, with the matches in the
+    snippet wrapped in <mark>. Books are searchable once their background
+    text index has completed (see /books/<id>/text_index).
+    """
+    query = request.args.get('q', '', type=str).strip()
+    page = max(1, request.args.get('page', 1, type=int))
+    limit = request.args.get('limit', 20, type=int)
+    if limit < 1 or limit > 100:
+        limit = 20
+    
+    if not any(len(term) >= MIN_QUERY_LENGTH for term in query.split()):
+        return jsonify({'error': f'検索語は{MIN_QUERY_LENGTH}文字以上で入力してください。'}), 400
+    
+    try:
+        results, has_next = search_pages(query, limit, (page - 1) * limit)
+        return jsonify({
+            'query': query,
+            'data': results,
+            'pagination': {
+                'page': page,
+                'limit': limit,
+                'has_next': has_next,
+                'has_prev': page > 1
+            }
+        })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/books/<int:id>/text_index', methods=['GET', 'POST'])
+def book_text_index(id):
+    """Get the full-text index status of a book, or rebuild it (POST)."""
+    book = db.session.get(Book, id)
+    if not book:
+        return jsonify({'error': 'Book not found'}), 404
+    
+    if request.method == 'GET':
+        task = book_tasks.get(id, 'text_index')
+        status = task.to_dict() if task else {'book_id': id, 'kind': 'text_index', 'status': 'idle'}
+        status['indexed_at'] = book.text_indexed_at.isoformat() if book.text_indexed_at else None
+        return jsonify(status)
+    
+    pdf_path = get_book_pdf_path(book)
+    if not pdf_path or not os.path.exists(pdf_path):
+        return jsonify({'error': 'PDF file not found'}), 404
+    
+    task = start_text_index(id, pdf_path)
+    return jsonify(task.to_dict()), 202
+
+
+@api_bp.route('/books/cache/stats', methods=['GET'])
+def get_book_cache_stats():
+    """Get rendered page cache, document pool and renderer pool statistics"""
+    return jsonify({
+        'page_cache': page_cache.stats(),
+        'document_pool': document_pool.stats(),
+        'render_pool': render_pool.stats()
+    })
+
+
+@api_bp.route('/books/<int:id>/prerender', methods=['GET', 'POST', 'DELETE'])
+def book_prerender(id):
+    """Get, start or cancel the background pre-render of a book.
+    
+    POST Body (optional):
+    - max_pages: Only pre-render the first N pages (default: PRERENDER_MAX_PAGES)
+    """
+    if request.method == 'GET':
+        task = book_tasks.get(id, 'prerender')
+        if not task:
+            return jsonify({'book_id': id, 'kind': 'prerender', 'status': 'idle'})
+        return jsonify(task.to_dict())
+    
+    if request.method == 'DELETE':
+        tasks = book_tasks.cancel(id, 'prerender')
+        return jsonify({
+            'success': True,
+            'message': f'{len(tasks)}件の事前レンダリングをキャンセルしました。'
+        })
+    
+    try:
+        book = db.session.get(Book, id)
+        if not book:
+            return jsonify({'error': 'Book not found'}), 404
+        
+        pdf_path = get_book_pdf_path(book)
+        if not pdf_path or not os.path.exists(pdf_path):
+            return jsonify({'error': 'PDF file not found'}), 404
+        
+        data = request.get_json(silent=True) or {}
+        max_pages = data.get('max_pages')
+        if max_pages is not None:
+            try:
+                max_pages = int(max_pages)
+            except (TypeError, ValueError):
+                return jsonify({'error': 'max_pages は整数である必要があります。'}), 400
+        
+        task = start_prerender(id, pdf_path, max_pages)
+        return jsonify(task.to_dict()), 202
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @api_bp.route('/books/<int:id>/pages', methods=['GET'])
 def get_book_pages(id):
-    """Get book PDF page information - Returns the total number of pages"""
+    """Get book PDF page information - Returns the total number of pages,
+    the size of every page ([width, height] in points) and the outline.
+    
+    Answered from the metadata stored on the Book row at upload time; the
+    PDF is only read for books uploaded before that was stored.
+    """
     try:
         book = db.session.get(Book, id)
         if not book:
@@ -588,25 +1126,27 @@ def get_book_pages(id):
         if not book.pdf_file_path:
             return jsonify({'error': 'Book has no PDF'}), 400
         
-        # Normalize file path (handles both old and new formats)
-        pdf_filename = normalize_file_path(book.pdf_file_path)
-        pdf_path = os.path.join(current_app.config['UPLOAD_FOLDER'], pdf_filename)
-        
-        if not os.path.exists(pdf_path):
-            return jsonify({'error': f'PDF file not found: {pdf_path}'}), 404
-        
-        try:
-            doc = fitz.open(pdf_path)
-            page_count = len(doc)
-            doc.close()
+        if book.page_count is None:
+            # Normalize file path (handles both old and new formats)
+            pdf_filename = normalize_file_path(book.pdf_file_path)
+            pdf_path = os.path.join(current_app.config['UPLOAD_FOLDER'], pdf_filename)
             
-            return jsonify({
-                'book_id': id,
-                'title': book.title,
-                'total_pages': page_count
-            })
-        except Exception as e:
-            return jsonify({'error': f'Failed to read PDF: {str(e)}'}), 500
+            if not os.path.exists(pdf_path):
+                return jsonify({'error': f'PDF file not found: {pdf_path}'}), 404
+            
+            try:
+                ensure_book_metadata(book, pdf_path)
+            except Exception as e:
+                db.session.rollback()
+                return jsonify({'error': f'Failed to read PDF: {str(e)}'}), 500
+        
+        return jsonify({
+            'book_id': id,
+            'title': book.title,
+            'total_pages': book.page_count,
+            'page_sizes': book.get_page_sizes(),
+            'outline': book.get_outline()
+        })
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -618,6 +1158,10 @@ def get_book_page(id, page_num):
     
     Query Parameters:
     - zoom: Zoom level (default: 2, range: 1-4)
+    - quality: JPEG/WebP quality (default: 85, range: 50-95)
+    - format: 'jpeg' or 'webp' (WebP is also chosen via the Accept header)
+    
+    Rendered images are cached on disk and revalidated via ETag / If-None-Match.
     """
     try:
         book = db.session.get(Book, id)
@@ -634,53 +1178,29 @@ def get_book_page(id, page_num):
         if not os.path.exists(pdf_path):
             return jsonify({'error': f'PDF file not found: {pdf_path}'}), 404
         
-        zoom = request.args.get('zoom', 2, type=int)
-        if zoom < 1 or zoom > 4:
-            zoom = 2
+        zoom, quality, use_webp = get_render_options()
+        
+        # Serve from the rendered page cache when possible
+        cache_key = page_cache_key(id, file_version(pdf_path), page_num, zoom, quality, use_webp)
+        if cache_key in request.if_none_match:
+            return not_modified_response(cache_key)
+        
+        cached = page_cache.get(cache_key)
+        if cached:
+            data, mimetype = cached
+            return image_response(data, mimetype, cache_key)
         
         try:
-            doc = fitz.open(pdf_path)
+            page_count = ensure_book_metadata(book, pdf_path)
             
-            if page_num < 0 or page_num >= len(doc):
+            if page_num < 0 or page_num >= page_count:
                 return jsonify({'error': 'Page not found'}), 404
             
-            page = doc[page_num]
-            # Render page to image with zoom
-            mat = fitz.Matrix(zoom, zoom)
-            pix = page.get_pixmap(matrix=mat)
-            doc.close()
-            
-            # Get quality parameter (default 85 for good balance)
-            quality = request.args.get('quality', 85, type=int)
-            quality = max(50, min(95, quality))  # Clamp to 50-95
-            
-            # Get format preference from Accept header or query param
-            preferred_format = request.args.get('format', 'jpeg').lower()
-            accept_header = request.headers.get('Accept', '')
+            # Rasterize and encode in a renderer worker process
+            data, mimetype = render_pool.render(pdf_path, page_num, zoom, quality, use_webp)
             
-            # Convert pixmap to PIL Image for compression
-            img_data = pix.tobytes("ppm")  # Get raw PPM data
-            pil_image = Image.open(io.BytesIO(img_data))
-            
-            # Convert to RGB if necessary (JPEG doesn't support alpha)
-            if pil_image.mode in ('RGBA', 'LA', 'P'):
-                pil_image = pil_image.convert('RGB')
-            
-            output = io.BytesIO()
-            
-            # Choose format based on preference and browser support
-            if preferred_format == 'webp' or 'image/webp' in accept_header:
-                pil_image.save(output, format='WEBP', quality=quality, method=4)
-                mimetype = 'image/webp'
-            else:
-                # Use JPEG for better compression than PNG
-                pil_image.save(output, format='JPEG', quality=quality, optimize=True)
-                mimetype = 'image/jpeg'
-            
-            output.seek(0)
-            
-            from flask import Response
-            return Response(output.getvalue(), mimetype=mimetype)
+            page_cache.put(cache_key, id, data, mimetype)
+            return image_response(data, mimetype, cache_key)
         
         except Exception as e:
             return jsonify({'error': f'Failed to render page: {str(e)}'}), 500
@@ -689,16 +1209,181 @@ def get_book_page(id, page_num):
         return jsonify({'error': str(e)}), 500
 
 
+@api_bp.route('/books/<int:id>/page/<int:page_num>/tiles', methods=['GET'])
+def get_book_page_tiles(id, page_num):
+    """Get the tile grid of a page for deep zoom.
+    
+    Query Parameters:
+    - z: Zoom level (default: 4, range: 1-8)
+    """
+    try:
+        book = db.session.get(Book, id)
+        if not book:
+            return jsonify({'error': 'Book not found'}), 404
+        
+        pdf_path = get_book_pdf_path(book)
+        if not pdf_path or not os.path.exists(pdf_path):
+            return jsonify({'error': 'PDF file not found'}), 404
+        
+        zoom = max(1, min(TILE_MAX_ZOOM, request.args.get('z', 4, type=int)))
+        
+        ensure_book_metadata(book, pdf_path)
+        page_rect = book_page_rect(book, page_num)
+        if page_rect is None:
+            return jsonify({'error': 'Page not found'}), 404
+        
+        width, height, cols, rows = tile_grid(page_rect, zoom)
+        return jsonify({
+            'book_id': id,
+            'page_num': page_num,
+            'zoom': zoom,
+            'tile_size': TILE_SIZE,
+            'width': width,
+            'height': height,
+            'cols': cols,
+            'rows': rows,
+            'url_template': f'/api/books/{id}/page/{page_num}/tile?z={zoom}&x={{x}}&y={{y}}'
+        })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/books/<int:id>/page/<int:page_num>/tile', methods=['GET'])
+def get_book_page_tile(id, page_num):
+    """Get one fixed-size tile of a page, rendering only its clip rectangle.
+    
+    Query Parameters:
+    - z: Zoom level (default: 4, range: 1-8)
+    - x, y: Tile column / row (0-indexed, see /tiles for the grid)
+    - quality / format: Same as the single page endpoint
+    
+    Edge tiles are smaller than TILE_SIZE. Tiles are cached and
+    revalidated via ETag like full pages.
+    """
+    try:
+        book = db.session.get(Book, id)
+        if not book:
+            return jsonify({'error': 'Book not found'}), 404
+        
+        pdf_path = get_book_pdf_path(book)
+        if not pdf_path or not os.path.exists(pdf_path):
+            return jsonify({'error': 'PDF file not found'}), 404
+        
+        zoom = max(1, min(TILE_MAX_ZOOM, request.args.get('z', 4, type=int)))
+        x = request.args.get('x', 0, type=int)
+        y = request.args.get('y', 0, type=int)
+        _, quality, use_webp = get_render_options()
+        
+        cache_key = make_cache_key('tile', id, file_version(pdf_path), page_num, zoom, x, y, quality, 'webp' if use_webp else 'jpeg')
+        if cache_key in request.if_none_match:
+            return not_modified_response(cache_key)
+        
+        cached = page_cache.get(cache_key)
+        if cached:
+            data, mimetype = cached
+            return image_response(data, mimetype, cache_key)
+        
+        ensure_book_metadata(book, pdf_path)
+        page_rect = book_page_rect(book, page_num)
+        if page_rect is None:
+            return jsonify({'error': 'Page not found'}), 404
+        
+        clip = tile_clip(page_rect, zoom, x, y)
+        if clip is None:
+            return jsonify({'error': 'Tile not found'}), 404
+        
+        try:
+            data, mimetype = render_pool.render(pdf_path, page_num, zoom, quality, use_webp, clip)
+        except Exception as e:
+            return jsonify({'error': f'Failed to render tile: {str(e)}'}), 500
+        
+        page_cache.put(cache_key, id, data, mimetype)
+        return image_response(data, mimetype, cache_key)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/books/<int:id>/thumbnails', methods=['GET'])
+def get_book_thumbnails(id):
+    """Get the thumbnail sprite-sheet index of a book for page navigation.
+    
+    The sheets are generated on first request for each PDF version and
+    cached on disk. Each page entry gives its sheet number and pixel offset;
+    sheet images are served by /books/<id>/thumbnails/<sheet>.
+    """
+    try:
+        book = db.session.get(Book, id)
+        if not book:
+            return jsonify({'error': 'Book not found'}), 404
+        
+        pdf_path = get_book_pdf_path(book)
+        if not pdf_path or not os.path.exists(pdf_path):
+            return jsonify({'error': 'PDF file not found'}), 404
+        
+        folder = current_app.config['THUMBNAIL_FOLDER']
+        version = file_version(pdf_path)
+        if version in request.if_none_match:
+            return not_modified_response(version)
+        
+        index = load_index(folder, id, version)
+        if index is None:
+            ensure_book_metadata(book, pdf_path)
+            page_rects = [book_page_rect(book, i) for i in range(book.page_count)]
+            index = build_sprite_sheets(folder, id, version, pdf_path, page_rects, render_pool)
+        
+        for sheet in index['sheets']:
+            sheet['url'] = f"/api/books/{id}/thumbnails/{sheet['sheet']}?v={version}"
+        
+        response = jsonify(index)
+        response.set_etag(version)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    
+    except Exception as e:
+        return jsonify({'error': f'Failed to build thumbnails: {str(e)}'}), 500
+
+
+@api_bp.route('/books/<int:id>/thumbnails/<int:sheet>', methods=['GET'])
+def get_book_thumbnail_sheet(id, sheet):
+    """Get one thumbnail sprite-sheet image (JPEG)"""
+    book = db.session.get(Book, id)
+    if not book:
+        return jsonify({'error': 'Book not found'}), 404
+    
+    pdf_path = get_book_pdf_path(book)
+    if not pdf_path or not os.path.exists(pdf_path):
+        return jsonify({'error': 'PDF file not found'}), 404
+    
+    version = file_version(pdf_path)
+    sheet_path = os.path.join(thumbnail_dir(current_app.config['THUMBNAIL_FOLDER'], id, version), f'sheet_{sheet}.jpg')
+    if not os.path.exists(sheet_path):
+        return jsonify({'error': 'Thumbnail sheet not found'}), 404
+    
+    # The URL carries the PDF version, so the image itself never changes
+    response = send_file(os.path.abspath(sheet_path), mimetype='image/jpeg', etag=version, conditional=True)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
 @api_bp.route('/books/<int:id>/pages/batch', methods=['GET'])
 def get_book_pages_batch(id):
     """Get multiple pages from a PDF at once (for optimization).
     
     Query Parameters:
     - start: Starting page number (0-indexed, default: 0)
-    - count: Number of pages to fetch (default: 5, max: 20)
-    - zoom: Zoom level (default: 1, range: 1-4)
-    
-    Returns base64-encoded PNG images for efficient transmission.
+    - count: Number of pages to fetch (default: 10, max: 30)
+    - zoom: Zoom level (default: 2, range: 1-4)
+    - quality / format: Same as the single page endpoint
+    - stream: If true, respond with multipart/mixed instead of JSON
+    
+    By default returns base64-encoded JPEG/WebP data URIs in one JSON
+    document. In stream mode the first part is a JSON header
+    (book_id, start_page, count, total_pages) and every following part is
+    one raw page image with an X-Page-Num header, sent as soon as it is
+    encoded. A page that fails to render is sent as a JSON part with an
+    "error" key.
     """
     try:
         book = db.session.get(Book, id)
@@ -717,53 +1402,38 @@ def get_book_pages_batch(id):
         
         start_page = request.args.get('start', 0, type=int)
         count = min(request.args.get('count', 10, type=int), 30)  # Max 30 pages per request
-        zoom = request.args.get('zoom', 2, type=int)
-        
-        if zoom < 1 or zoom > 4:
-            zoom = 2
+        zoom, quality, use_webp = get_render_options()
         
         try:
             import base64
-            doc = fitz.open(pdf_path)
-            total = len(doc)
+            total = ensure_book_metadata(book, pdf_path)
             
             if start_page >= total:
                 return jsonify({'error': 'Start page is out of range'}), 400
             
-            # Get quality parameter (default 85 for good balance)
-            quality = request.args.get('quality', 85, type=int)
-            quality = max(50, min(95, quality))  # Clamp to 50-95
+            page_nums = range(start_page, min(start_page + count, total))
+            pages = iter_page_images(id, pdf_path, page_nums, zoom, quality, use_webp)
             
-            # Get format preference
-            preferred_format = request.args.get('format', 'jpeg').lower()
-            accept_header = request.headers.get('Accept', '')
-            use_webp = preferred_format == 'webp' or 'image/webp' in accept_header
+            # Binary streaming mode: one multipart part per page
+            if request.args.get('stream', 'false').lower() in ('1', 'true'):
+                boundary = f'page-{uuid.uuid4().hex}'
+                header = {
+                    'book_id': id,
+                    'start_page': start_page,
+                    'count': len(page_nums),
+                    'total_pages': total
+                }
+                response = Response(
+                    multipart_page_stream(header, pages, boundary),
+                    mimetype=f'multipart/mixed; boundary={boundary}'
+                )
+                response.headers['X-Accel-Buffering'] = 'no'
+                return response
             
             pages_data = []
-            for i in range(start_page, min(start_page + count, total)):
-                page = doc[i]
-                mat = fitz.Matrix(zoom, zoom)
-                pix = page.get_pixmap(matrix=mat)
-                
-                # Convert to PIL Image for compression
-                img_data = pix.tobytes("ppm")
-                pil_image = Image.open(io.BytesIO(img_data))
-                
-                # Convert to RGB if necessary
-                if pil_image.mode in ('RGBA', 'LA', 'P'):
-                    pil_image = pil_image.convert('RGB')
-                
-                output = io.BytesIO()
-                
-                if use_webp:
-                    pil_image.save(output, format='WEBP', quality=quality, method=4)
-                    mimetype = 'image/webp'
-                else:
-                    pil_image.save(output, format='JPEG', quality=quality, optimize=True)
-                    mimetype = 'image/jpeg'
-                
-                output.seek(0)
-                compressed_bytes = output.getvalue()
+            for i, compressed_bytes, mimetype, error in pages:
+                if error is not None:
+                    raise error
                 
                 # Convert to base64 for JSON transmission
                 b64_data = base64.b64encode(compressed_bytes).decode('utf-8')
@@ -772,8 +1442,6 @@ def get_book_pages_batch(id):
                     'data': f'data:{mimetype};base64,{b64_data}'
                 })
             
-            doc.close()
-            
             return jsonify({
                 'book_id': id,
                 'start_page': start_page,
@@ -882,36 +1550,67 @@ def delete_link(id):
 
 
 # --- YouTube Playlists API ---
+def playlist_needs_refresh(playlist):
+    """Whether a playlist's stored video list is stale (older than PLAYLIST_REFRESH_MAX_AGE) or incomplete."""
+    max_age = timedelta(seconds=current_app.config.get('PLAYLIST_REFRESH_MAX_AGE', 24 * 3600))
+    return (
+        not playlist.cache_updated_at or
+        (datetime.utcnow() - playlist.cache_updated_at) > max_age or
+        not playlist.cached_video_count or
+        not playlist.thumbnail_url or
+        playlist.thumbnail_url.startswith('<')
+    )
+
+
+def refresh_playlist_videos(job, playlist_pk):
+    """Background job: fetch a playlist's entries with yt-dlp and store the changes."""
+    from app import get_youtube_playlist_entries
+    
+    playlist = db.session.get(YouTubePlaylist, playlist_pk)
+    if not playlist:
+        return {'video_count': 0, 'message': 'Playlist not found'}
+    
+    entries = get_youtube_playlist_entries(playlist.playlist_id)
+    if entries is None:
+        raise RuntimeError('yt-dlp で動画一覧を取得できませんでした。')
+    playlist_cache.put(playlist.playlist_id, entries)
+    
+    # 空の一覧（非公開化など）では保存済みの動画一覧を残す
+    if not entries:
+        return {'video_count': 0}
+    
+    def write():
+        changes = sync_playlist_videos(db.session.get(YouTubePlaylist, playlist_pk), entries)
+        db.session.commit()
+        return changes
+    
+    return dict(run_with_retry(write), video_count=len(entries))
+
+
+def start_playlist_refresh(playlist_pk, force=False):
+    """Queue a background refresh of a playlist's video list (deduplicated per playlist)."""
+    return playlist_refresh.submit(playlist_pk, refresh_playlist_videos, playlist_pk, force=force)
+
+
 @api_bp.route('/playlists', methods=['GET'])
 def get_playlists():
     """Get all YouTube playlists - optimized with caching"""
-    from datetime import datetime, timedelta
-    
     playlists = YouTubePlaylist.query.order_by(YouTubePlaylist.added_date.desc()).all()
+    progress = get_playlist_progress(current_user_id())
     
     result = []
     playlists_to_update = []  # キャッシュ更新が必要なプレイリスト
     
     for p in playlists:
-        # 完了した動画数を取得（DBのみ、高速）
-        video_views = VideoView.query.filter_by(playlist_id=p.id).all()
-        completed_videos = sum(1 for v in video_views if v.is_completed)
+        # 完了した動画数（全プレイリスト分を1クエリで集計済み）
+        completed_videos = progress.get(p.id, EMPTY_PROGRESS)['completed_count']
         
         # キャッシュされた動画数を使用
         total_videos = p.cached_video_count or 0
         thumbnail_url = p.thumbnail_url
         
         # キャッシュが古いか存在しない場合は更新リストに追加
-        cache_age = timedelta(hours=24)  # 24時間でキャッシュ更新
-        needs_update = (
-            not p.cache_updated_at or 
-            (datetime.utcnow() - p.cache_updated_at) > cache_age or
-            total_videos == 0 or
-            not thumbnail_url or 
-            thumbnail_url.startswith('<')
-        )
-        
-        if needs_update:
+        if playlist_needs_refresh(p):
             playlists_to_update.append(p)
         
         result.append({
@@ -926,37 +1625,48 @@ def get_playlists():
             'progress_rate': round((completed_videos / total_videos * 100) if total_videos > 0 else 0, 1)
         })
     
-    # キャッシュ更新が必要なプレイリストがあれば、バックグラウンドで更新
-    if playlists_to_update:
-        from app import get_youtube_playlist_video_ids
-        import threading
-        
-        def update_cache():
-            from app import app
-            with app.app_context():
-                for p in playlists_to_update:
-                    try:
-                        video_ids = get_youtube_playlist_video_ids(p.playlist_id)
-                        if video_ids:
-                            p.cached_video_count = len(video_ids)
-                            if not p.thumbnail_url or p.thumbnail_url.startswith('<'):
-                                p.thumbnail_url = f'https://i.ytimg.com/vi/{video_ids[0]}/hqdefault.jpg'
-                            p.cache_updated_at = datetime.utcnow()
-                            db.session.commit()
-                    except Exception as e:
-                        print(f"[WARNING] Failed to update cache for playlist {p.id}: {e}")
-        
-        thread = threading.Thread(target=update_cache)
-        thread.daemon = True
-        thread.start()
+    # キャッシュ更新が必要なプレイリストは、バックグラウンドの更新スケジューラに登録
+    for p in playlists_to_update:
+        start_playlist_refresh(p.id)
     
     return jsonify(result)
 
 
+@api_bp.route('/playlists/refresh/jobs', methods=['GET'])
+def get_playlist_refresh_jobs():
+    """Get the playlist refresh scheduler statistics and the latest job of each playlist"""
+    return jsonify({
+        'stats': playlist_refresh.stats(),
+        'jobs': [job.to_dict() for job in playlist_refresh.jobs()]
+    })
+
+
+@api_bp.route('/playlists/<int:id>/refresh', methods=['GET', 'POST'])
+def playlist_refresh_job(id):
+    """Get the status of, or queue, a background refresh of a playlist's video list"""
+    if request.method == 'GET':
+        job = playlist_refresh.get(id)
+        if not job:
+            return jsonify({'playlist_id': id, 'status': 'idle'})
+        return jsonify(job.to_dict())
+    
+    if not db.session.get(YouTubePlaylist, id):
+        return jsonify({'error': 'Playlist not found'}), 404
+    
+    job = start_playlist_refresh(id, force=True)
+    return jsonify(job.to_dict()), 202
+
+
+@api_bp.route('/playlists/cache/stats', methods=['GET'])
+def get_playlist_cache_stats():
+    """Get playlist extraction cache statistics"""
+    return jsonify(playlist_cache.stats())
+
+
 @api_bp.route('/playlists/<int:id>', methods=['GET'])
 def get_playlist(id):
     """Get playlist detail with videos and materials"""
-    from app import get_youtube_playlist_video_ids, get_youtube_playlist_videos_info_ytdlp
+    from app import get_cached_playlist_entries
     
     playlist = db.session.get(YouTubePlaylist, id)
     if not playlist:
@@ -975,23 +1685,34 @@ def get_playlist(id):
     progress_rate = 0
     
     if include_videos:
-        # Get video IDs and info (slower operation)
-        video_ids = get_youtube_playlist_video_ids(playlist.playlist_id)
-        video_info_map = get_youtube_playlist_videos_info_ytdlp(playlist.playlist_id)
+        # One cached yt-dlp extraction (slower operation on a miss)
+        entries = get_cached_playlist_entries(playlist.playlist_id)
+        if entries is None:
+            # 取得に失敗した場合は保存済みの動画一覧を使用
+            entries = [{
+                'video_id': v.video_id,
+                'title': v.title,
+                'duration': v.duration,
+                'thumbnail_url': v.thumbnail_url,
+                'channel': v.channel,
+            } for v in PlaylistVideo.query.filter_by(playlist_id=id).order_by(PlaylistVideo.position)]
         
         # Get video views
-        video_views = {v.video_index: v for v in VideoView.query.filter_by(playlist_id=id).all()}
-        
-        for idx, video_id in enumerate(video_ids):
-            info = video_info_map.get(video_id, {})
-            view = video_views.get(idx)
+        views = VideoView.query.filter_by(user_id=current_user_id(), playlist_id=id).all()
+        video_views = {v.video_id: v for v in views if v.video_id}
+        # 動画IDが未特定の旧データは記録時の位置で対応付け
+        legacy_views = {v.video_index: v for v in views if not v.video_id}
+        
+        for idx, entry in enumerate(entries):
+            video_id = entry['video_id']
+            view = video_views.get(video_id) or legacy_views.get(idx)
             
             videos.append({
                 'id': video_id,
-                'title': info.get('title', f'Video {video_id}'),
-                'thumbnail': info.get('thumbnail_url', f'https://i.ytimg.com/vi/{video_id}/hqdefault.jpg'),
-                'channel': info.get('channel', 'YouTube'),
-                'duration': info.get('duration', 0),
+                'title': entry['title'] or f'Video {video_id}',
+                'thumbnail': entry['thumbnail_url'] or f'https://i.ytimg.com/vi/{video_id}/hqdefault.jpg',
+                'channel': entry['channel'] or 'YouTube',
+                'duration': entry['duration'] or 0,
                 'completed': view.is_completed if view else False,
                 'views': view.watch_count if view else 0,
                 'total_watch_time': view.watched_duration_seconds if view else 0
@@ -1021,9 +1742,10 @@ def get_playlist(id):
 
 @api_bp.route('/playlists/<int:id>/reset', methods=['POST'])
 def reset_playlist_progress(id):
-    """Reset playlist progress"""
+    """Reset the current user's playlist progress"""
     try:
-        deleted = VideoView.query.filter_by(playlist_id=id).delete()
+        progress_buffer.discard(user_id=current_user_id(), playlist_pk=id)
+        deleted = VideoView.query.filter_by(user_id=current_user_id(), playlist_id=id).delete()
         db.session.commit()
         
         return jsonify({
@@ -1044,12 +1766,15 @@ def delete_playlist(id):
         if not playlist:
             return jsonify({'error': 'Playlist not found'}), 404
         
+        progress_buffer.discard(playlist_pk=id)
         VideoView.query.filter_by(playlist_id=id).delete()
+        PlaylistVideo.query.filter_by(playlist_id=id).delete()
         PlaylistViewHistory.query.filter_by(playlist_id=id).delete()
         PlaylistMaterial.query.filter_by(playlist_id=id).delete()
         
         db.session.delete(playlist)
         db.session.commit()
+        playlist_cache.invalidate(playlist.playlist_id)
         
         return jsonify({
             'success': True,
@@ -1061,42 +1786,138 @@ def delete_playlist(id):
         return jsonify({'error': str(e)}), 500
 
 
+def resolve_playlist_video(playlist_id, video_id):
+    """Look up a video of a registered playlist in the stored entries (one indexed query).
+    
+    A video missing from the stored entries (a playlist registered before
+    entries were stored, or a video added on YouTube after the last sync)
+    queues the playlist's refresh job and returns None right away; the job
+    is deduplicated and cooled down per playlist, so unknown videos do not
+    cause a yt-dlp call per request. See playlist_refresh_pending().
+    
+    Returns:
+        Row (playlist_pk, position, title), or None if the playlist or video is unknown
+    """
+    video = find_playlist_video(playlist_id, video_id)
+    if video is not None:
+        return video
+    
+    playlist = YouTubePlaylist.query.filter_by(playlist_id=playlist_id).first()
+    if playlist:
+        start_playlist_refresh(playlist.id)
+    return None
+
+
+def playlist_refresh_pending(playlist_id):
+    """Whether a refresh of the playlist (YouTube id) is queued or running, so a missing video may still appear."""
+    playlist = YouTubePlaylist.query.filter_by(playlist_id=playlist_id).first()
+    job = playlist_refresh.get(playlist.id) if playlist else None
+    return bool(job and job.active)
+
+
+def video_not_found_response(playlist_id):
+    """404 for an unknown video, or 202 (retry later) while the playlist's video list is being refreshed."""
+    if playlist_refresh_pending(playlist_id):
+        return jsonify({
+            'success': False,
+            'pending': True,
+            'message': '動画一覧を更新中です。しばらくしてから再送してください。'
+        }), 202
+    return jsonify({'error': 'Video not found in playlist'}), 404
+
+
+def parse_watch_time(value):
+    """Parse a reported watch time in seconds (None if it is not a number)."""
+    try:
+        return max(0, int(float(value or 0)))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+@api_bp.route('/playlists/progress', methods=['POST'])
+def record_video_progress_batch():
+    """Record the watch progress of several videos at once (player heartbeats)
+    
+    Body:
+    - events: [{playlist_id, video_id, watch_time}, ...] (YouTube ids, up to
+      PROGRESS_MAX_EVENTS); the longest watch time per video is kept
+    
+    Events for unknown videos or with an invalid watch time are returned
+    in "rejected"; the others are accepted. Unknown videos of a playlist
+    whose video list is being refreshed are marked "retry": true.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        events = data.get('events')
+        if not isinstance(events, list):
+            return jsonify({'error': 'events は配列である必要があります。'}), 400
+        max_events = current_app.config.get('PROGRESS_MAX_EVENTS', 500)
+        if len(events) > max_events:
+            return jsonify({'error': f'一度に送信できる進捗は{max_events}件までです。'}), 400
+        
+        accepted = []
+        rejected = []
+        for index, event in enumerate(events):
+            event = event if isinstance(event, dict) else {}
+            pair = (event.get('playlist_id'), event.get('video_id'))
+            watch_time = parse_watch_time(event.get('watch_time'))
+            if not all(isinstance(v, str) and v for v in pair):
+                rejected.append({'index': index, 'error': 'playlist_id と video_id が必要です。'})
+            elif watch_time is None:
+                rejected.append({'index': index, 'error': '視聴時間は数値である必要があります。'})
+            else:
+                accepted.append((index, pair, watch_time))
+        
+        # 全イベントの動画を1クエリで解決（見つからない動画は再生リストの更新を登録）
+        videos = find_playlist_videos({pair for _, pair, _ in accepted})
+        for pair in {pair for _, pair, _ in accepted} - videos.keys():
+            videos[pair] = resolve_playlist_video(*pair)
+        
+        user_id = current_user_id()
+        refreshing = {}  # YouTube playlist id -> 動画一覧を更新中か
+        count = 0
+        for index, pair, watch_time in accepted:
+            video = videos[pair]
+            if video is None:
+                if pair[0] not in refreshing:
+                    refreshing[pair[0]] = playlist_refresh_pending(pair[0])
+                rejected.append({'index': index, 'error': 'Video not found in playlist', 'retry': refreshing[pair[0]]})
+                continue
+            progress_buffer.add(user_id, video, watch_time)
+            count += 1
+        
+        return jsonify({
+            'success': True,
+            'accepted': count,
+            'rejected': sorted(rejected, key=lambda r: r['index'])
+        })
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/playlists/progress/stats', methods=['GET'])
+def get_progress_buffer_stats():
+    """Get watch progress write-behind buffer statistics"""
+    return jsonify(progress_buffer.stats())
+
+
 @api_bp.route('/playlists/<playlist_id>/video/<video_id>/view', methods=['POST'])
 def record_video_view(playlist_id, video_id):
-    """Record video view progress"""
+    """Record video view progress (the longest watch time is kept)"""
     try:
         data = request.json or {}
-        watch_time = data.get('watch_time', 0)
-        
-        playlist = YouTubePlaylist.query.filter_by(playlist_id=playlist_id).first()
-        if not playlist:
-            return jsonify({'error': 'Playlist not found'}), 404
+        watch_time = parse_watch_time(data.get('watch_time'))
+        if watch_time is None:
+            return jsonify({'error': '視聴時間は数値である必要があります。'}), 400
         
-        # Find video index
-        from app import get_youtube_playlist_video_ids
-        video_ids = get_youtube_playlist_video_ids(playlist_id)
-        try:
-            video_index = video_ids.index(video_id)
-        except ValueError:
-            video_index = 0
+        video = resolve_playlist_video(playlist_id, video_id)
+        if video is None:
+            return video_not_found_response(playlist_id)
         
-        video_view = VideoView.query.filter_by(
-            playlist_id=playlist.id,
-            video_index=video_index
-        ).first()
-        
-        if not video_view:
-            video_view = VideoView(
-                playlist_id=playlist.id,
-                video_index=video_index,
-                first_viewed=datetime.utcnow()
-            )
-            db.session.add(video_view)
-        
-        video_view.watched_duration_seconds = max(video_view.watched_duration_seconds or 0, watch_time)
-        video_view.last_viewed = datetime.utcnow()
-        
-        db.session.commit()
+        # Written to video_view by the write-behind buffer
+        progress_buffer.add(current_user_id(), video, watch_time)
         
         return jsonify({'success': True})
     
@@ -1109,39 +1930,27 @@ def record_video_view(playlist_id, video_id):
 def mark_video_complete(playlist_id, video_id):
     """Mark video as completed"""
     try:
-        playlist = YouTubePlaylist.query.filter_by(playlist_id=playlist_id).first()
-        if not playlist:
-            return jsonify({'error': 'Playlist not found'}), 404
+        video = resolve_playlist_video(playlist_id, video_id)
+        if video is None:
+            return video_not_found_response(playlist_id)
+        
+        user_id = current_user_id()
+        # XPは視聴時間から計算するため、この動画の保存待ちの進捗を同じトランザクションで書き込む
+        pending = progress_buffer.take(user_id, video.playlist_pk, video.video_id)
+        
+        def write():
+            if pending:
+                record_view_progress([pending])
+            xp = mark_view_completed(user_id, video)
+            db.session.commit()
+            return xp
         
-        from app import get_youtube_playlist_video_ids
-        video_ids = get_youtube_playlist_video_ids(playlist_id)
         try:
-            video_index = video_ids.index(video_id)
-        except ValueError:
-            video_index = 0
-        
-        video_view = VideoView.query.filter_by(
-            playlist_id=playlist.id,
-            video_index=video_index
-        ).first()
-        
-        if not video_view:
-            video_view = VideoView(
-                playlist_id=playlist.id,
-                video_index=video_index,
-                first_viewed=datetime.utcnow()
-            )
-            db.session.add(video_view)
-        
-        video_view.is_completed = True
-        video_view.last_viewed = datetime.utcnow()
-        
-        # Calculate XP
-        watch_time = video_view.watched_duration_seconds or 0
-        xp = max(10, min(500, int(watch_time / 36)))
-        video_view.xp_gained = xp
-        
-        db.session.commit()
+            xp = run_with_retry(write)
+        except Exception:
+            if pending:
+                progress_buffer.restore(pending)
+            raise
         
         return jsonify({
             'success': True,
@@ -1162,6 +1971,49 @@ def get_pixiv_topics():
     return jsonify(topics)
 
 
+# --- Auth API ---
+def serialize_account(user):
+    return {
+        'id': user.id,
+        'username': user.username,
+        'is_admin': bool(user.is_admin)
+    }
+
+
+@api_bp.route('/auth/login', methods=['POST'])
+def login():
+    """Log in with a username and password (session cookie)
+    
+    Request Body:
+        - username (str)
+        - password (str)
+        - remember (bool, optional): Keep the login after the browser closes
+    """
+    data = request.json or {}
+    user = User.query.filter_by(username=(data.get('username') or '').strip()).first()
+    if not user or not user.check_password(data.get('password') or ''):
+        return jsonify({'error': 'ユーザー名またはパスワードが正しくありません。'}), 401
+    
+    login_user(user, remember=bool(data.get('remember')))
+    return jsonify({'success': True, 'user': serialize_account(user)})
+
+
+@api_bp.route('/auth/logout', methods=['POST'])
+def logout():
+    """Log out"""
+    logout_user()
+    return jsonify({'success': True})
+
+
+@api_bp.route('/auth/me', methods=['GET'])
+def get_current_account():
+    """Get the logged-in user (null when the request acts as the default user)"""
+    return jsonify({
+        'user': serialize_account(current_user) if current_user.is_authenticated else None,
+        'require_login': login_required()
+    })
+
+
 # --- User Management API ---
 @api_bp.route('/user/username', methods=['PUT'])
 def update_username():
@@ -1173,7 +2025,7 @@ def update_username():
         if not new_username:
             return jsonify({'error': 'ユーザー名を入力してください。'}), 400
         
-        user_status = UserStatus.query.first()
+        user_status = get_user_status(current_user_id())
         if user_status:
             user_status.username = new_username
             db.session.commit()
@@ -1191,22 +2043,43 @@ def update_username():
 
 @api_bp.route('/user/reset', methods=['POST'])
 def reset_all_data():
-    """Reset all user data"""
+    """Reset the current user's data
+    
+    Deletes the user's records and video progress. The shared library
+    (books and links) is deleted too when an admin resets (see
+    current_user_is_admin(); in a single-user installation always).
+    """
     try:
-        user_status = UserStatus.query.first()
+        user_id = current_user_id()
+        user_status = get_user_status(user_id)
         if user_status:
             user_status.total_xp = 0
             user_status.username = "新規ユーザー"
         
-        db.session.query(Record).delete()
-        db.session.query(Book).delete()
-        db.session.query(ResourceLink).delete()
+        db.session.query(Record).filter(Record.user_id == user_id).delete()
+        clear_daily_stats(user_id)
+        progress_buffer.discard(user_id=user_id)
+        VideoView.query.filter_by(user_id=user_id).delete()
+        PlaylistViewHistory.query.filter_by(user_id=user_id).delete()
+        reset_library = current_user_is_admin()
+        books = []
+        if reset_library:
+            # 書籍削除と同じく、検索索引と描画キャッシュも書籍ごとに削除する
+            books = [(book.id, get_book_pdf_path(book)) for book in Book.query.all()]
+            for book_id, _ in books:
+                remove_book_text(book_id)
+            db.session.query(Book).delete()
+            db.session.query(ResourceLink).delete()
         
         db.session.commit()
+        for book_id, pdf_path in books:
+            invalidate_book_renders(book_id, pdf_path)
         
         return jsonify({
             'success': True,
-            'message': 'すべての学習データをリセットしました。'
+            'library_reset': reset_library,
+            'message': 'すべての学習データと本棚をリセットしました。' if reset_library
+                       else '学習データをリセットしました（本棚は管理者のみリセットできます）。'
         })
     
     except Exception as e:
@@ -1215,27 +2088,70 @@ def reset_all_data():
 
 
 # --- Archive API ---
+def serialize_archive_record(record):
+    return {
+        'id': record.id,
+        'type': record.type,
+        'subtype': record.subtype,
+        'description': record.description,
+        'xp_gained': record.xp_gained,
+        'date': record.date.isoformat() if record.date else None,
+        'duration_minutes': record.duration_minutes,
+        'evaluation': record.evaluation,
+        'image_path': record.image_path
+    }
+
+
 @api_bp.route('/archive', methods=['GET'])
 def get_archive():
-    """Get archived records grouped by year"""
-    all_records = Record.query.order_by(Record.date.desc()).all()
+    """Get archived records grouped by year
+    
+    Query Parameters (lazy mode):
+    - lazy: If true, return only the years with their record counts and
+      totals (year_summary: count, xp_gained, time_count)
+    - year: Return one year's records, cursor-paginated (see paginate_records())
+    
+    Without parameters every record is returned grouped by year (legacy format).
+    """
+    year = request.args.get('year', type=int)
+    if year:
+        start, end = year_range(year)
+        query = Record.query.filter(Record.user_id == current_user_id(), Record.date >= start, Record.date < end)
+        try:
+            page = paginate_records(query, serialize_archive_record)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        page['year'] = str(year)
+        return jsonify(page)
+    
+    if request.args.get('lazy', 'false').lower() in ('1', 'true'):
+        year_column = func.strftime('%Y', Record.date)
+        rows = db.session.query(
+            year_column,
+            func.count(Record.id),
+            func.coalesce(func.sum(Record.xp_gained), 0),
+            func.sum(case((Record.type == '時間学習', 1), else_=0))
+        ).filter(
+            Record.user_id == current_user_id()
+        ).group_by(year_column).all()
+        year_summary = {
+            year: {'count': count, 'xp_gained': xp_gained, 'time_count': time_count}
+            for year, count, xp_gained, time_count in rows if year
+        }
+        return jsonify({
+            'year_counts': {year: summary['count'] for year, summary in year_summary.items()},
+            'year_summary': year_summary,
+            'sorted_years': sorted(year_summary.keys(), reverse=True)
+        })
+    
+    all_records = Record.query.filter(Record.user_id == current_user_id()).order_by(Record.date.desc()).all()
     
     archive_data = {}
     for record in all_records:
         year = record.get_year()
         if year not in archive_data:
             archive_data[year] = []
-        archive_data[year].append({
-            'id': record.id,
-            'type': record.type,
-            'subtype': record.subtype,
-            'description': record.description,
-            'xp_gained': record.xp_gained,
-            'date': record.date.isoformat() if record.date else None,
-            'duration_minutes': record.duration_minutes,
-            'evaluation': record.evaluation,
-            'image_path': record.image_path
-        })
+        archive_data[year].append(serialize_archive_record(record))
     
     return jsonify({
         'archive_data': archive_data,
@@ -1244,14 +2160,8 @@ def get_archive():
 
 
 # --- Works API (for MyPage) ---
-@api_bp.route('/works', methods=['GET'])
-def get_works():
-    """Get user works (acquisitions and posts)"""
-    works = Record.query.filter(
-        Record.type.in_(['科目習得', '作品投稿'])
-    ).order_by(Record.date.desc()).all()
-    
-    return jsonify([{
+def serialize_work(w):
+    return {
         'id': w.id,
         'type': w.type,
         'subtype': w.subtype,
@@ -1260,21 +2170,60 @@ def get_works():
         'date': w.date.isoformat() if w.date else None,
         'evaluation': w.evaluation,
         'image_path': w.image_path
-    } for w in works])
+    }
+
+
+@api_bp.route('/works', methods=['GET'])
+def get_works():
+    """Get user works (acquisitions and posts)
+    
+    Pass 'cursor' (empty for the first page) for cursor pagination; see
+    paginate_records(). The first page also carries 'summary' (count,
+    a_count, xp_gained over all works). Without it a plain list is returned.
+    """
+    query = Record.query.filter(Record.user_id == current_user_id(), Record.type.in_(['科目習得', '作品投稿']))
+    
+    if cursor_requested():
+        try:
+            page = paginate_records(query, serialize_work)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if not request.args.get('cursor'):
+            count, a_count, xp_gained = query.with_entities(
+                func.count(Record.id),
+                func.coalesce(func.sum(case((Record.evaluation == 'A', 1), else_=0)), 0),
+                func.coalesce(func.sum(Record.xp_gained), 0)
+            ).one()
+            page['summary'] = {'count': count, 'a_count': a_count, 'xp_gained': xp_gained}
+        return jsonify(page)
+    
+    works = query.order_by(Record.date.desc()).all()
+    
+    return jsonify([serialize_work(w) for w in works])
 
 
 # --- Statistics API ---
+@api_bp.route('/statistics/cache', methods=['GET'])
+def statistics_cache_stats():
+    """Get statistics response cache statistics and the current data version"""
+    from response_cache import current_data_version
+    stats = response_cache.stats()
+    stats['data_version'] = current_data_version()
+    stats['progress_version'] = current_data_version(PROGRESS_VERSION_ID)
+    return jsonify(stats)
+
+
 @api_bp.route('/statistics/xp_by_technique', methods=['GET'])
+@response_cache.cached
 def statistics_xp_by_technique():
     """Get XP grouped by technique type"""
-    from sqlalchemy import func
-    
     results = db.session.query(
-        Record.subtype,
-        func.sum(Record.xp_gained).label('total_xp')
+        DailyStats.subtype,
+        func.sum(DailyStats.xp_sum).label('total_xp')
     ).filter(
-        Record.type.in_(['科目習得', '作品投稿'])
-    ).group_by(Record.subtype).all()
+        DailyStats.user_id == current_user_id(),
+        DailyStats.type.in_(['科目習得', '作品投稿'])
+    ).group_by(DailyStats.subtype).all()
     
     labels = [r[0] or '未分類' for r in results]
     data = [r[1] or 0 for r in results]
@@ -1286,17 +2235,17 @@ def statistics_xp_by_technique():
 
 
 @api_bp.route('/statistics/xp_by_evaluation', methods=['GET'])
+@response_cache.cached
 def statistics_xp_by_evaluation():
     """Get XP grouped by evaluation grade"""
-    from sqlalchemy import func
-    
     results = db.session.query(
-        Record.evaluation,
-        func.sum(Record.xp_gained).label('total_xp')
+        DailyStats.evaluation,
+        func.sum(DailyStats.xp_sum).label('total_xp')
     ).filter(
-        Record.type == '科目習得',
-        Record.evaluation.isnot(None)
-    ).group_by(Record.evaluation).all()
+        DailyStats.user_id == current_user_id(),
+        DailyStats.type == '科目習得',
+        DailyStats.evaluation != ''
+    ).group_by(DailyStats.evaluation).all()
     
     labels = [r[0] or '未評価' for r in results]
     data = [r[1] or 0 for r in results]
@@ -1308,17 +2257,18 @@ def statistics_xp_by_evaluation():
 
 
 @api_bp.route('/statistics/learning_patterns', methods=['GET'])
+@response_cache.cached
 def statistics_learning_patterns():
     """Get learning patterns by day of week and hour"""
-    from sqlalchemy import func, extract
+    from sqlalchemy import extract
+    
+    user_id = current_user_id()
     
     # By day of week (0=Monday, 6=Sunday)
     dow_results = db.session.query(
-        extract('dow', Record.date).label('day_of_week'),
-        func.count(Record.id).label('count')
-    ).filter(
-        Record.date.isnot(None)
-    ).group_by('day_of_week').all()
+        extract('dow', DailyStats.day).label('day_of_week'),
+        func.sum(DailyStats.record_count).label('count')
+    ).filter(DailyStats.user_id == user_id).group_by('day_of_week').all()
     
     day_labels = ['月', '火', '水', '木', '金', '土', '日']
     day_data = [0] * 7
@@ -1329,11 +2279,9 @@ def statistics_learning_patterns():
     
     # By hour
     hour_results = db.session.query(
-        extract('hour', Record.date).label('hour'),
-        func.count(Record.id).label('count')
-    ).filter(
-        Record.date.isnot(None)
-    ).group_by('hour').all()
+        DailyStats.hour,
+        func.sum(DailyStats.record_count).label('count')
+    ).filter(DailyStats.user_id == user_id).group_by(DailyStats.hour).all()
     
     hour_labels = [f'{h}時' for h in range(24)]
     hour_data = [0] * 24
@@ -1355,22 +2303,26 @@ def statistics_learning_patterns():
 
 
 @api_bp.route('/statistics/youtube_progress', methods=['GET'])
+@response_cache.cached(version_id=PROGRESS_VERSION_ID)
 def statistics_youtube_progress():
-    """Get YouTube playlist learning progress"""
-    playlists = YouTubePlaylist.query.all()
+    """Get YouTube playlist learning progress
+    
+    Cached on the watch-progress version, which only view and playlist
+    writes bump, so progress flushes leave the other statistics cached.
+    """
+    playlists = db.session.query(YouTubePlaylist.id, YouTubePlaylist.title).order_by(YouTubePlaylist.id).all()
+    progress = get_playlist_progress(current_user_id())
     
     result = []
     for playlist in playlists:
-        video_views = VideoView.query.filter_by(playlist_id=playlist.id).all()
-        total_xp = sum(v.xp_gained or 0 for v in video_views)
-        completed = sum(1 for v in video_views if v.is_completed)
-        total_time = sum(v.watched_duration_seconds or 0 for v in video_views)
+        stats = progress.get(playlist.id, EMPTY_PROGRESS)
+        total_time = stats['watch_seconds']
         
         result.append({
             'id': playlist.id,
             'title': playlist.title,
-            'total_xp': total_xp,
-            'completed_count': completed,
+            'total_xp': stats['total_xp'],
+            'completed_count': stats['completed_count'],
             'total_watch_time_seconds': total_time,
             'total_watch_time_formatted': f'{total_time // 3600}時間{(total_time % 3600) // 60}分'
         })
@@ -1379,9 +2331,9 @@ def statistics_youtube_progress():
 
 
 @api_bp.route('/statistics/activity_heatmap', methods=['GET'])
+@response_cache.cached
 def statistics_activity_heatmap():
     """Get activity heatmap data for a specific year (GitHub-style)"""
-    from sqlalchemy import func, and_
     from datetime import datetime, timedelta
     
     # Get year from query parameter, default to current year
@@ -1393,27 +2345,22 @@ def statistics_activity_heatmap():
     start_date = datetime(year, 1, 1)
     end_date_next_year = datetime(year + 1, 1, 1)
     
-    # Query all records to aggregate by date
-    records = db.session.query(
-        Record.date,
-        Record.xp_gained,
-        Record.duration_minutes
+    # Aggregate the daily rollup by date (at most 366 groups)
+    rows = db.session.query(
+        DailyStats.day,
+        func.sum(DailyStats.xp_sum),
+        func.sum(DailyStats.minutes_sum)
     ).filter(
-        and_(
-            Record.date >= start_date,
-            Record.date < end_date_next_year
-        )
-    ).all()
+        DailyStats.user_id == current_user_id(),
+        DailyStats.day >= start_date.date(),
+        DailyStats.day < end_date_next_year.date()
+    ).group_by(DailyStats.day).all()
     
     # Create a dictionary for easy lookup with aggregated data
-    heatmap_data = {}
-    for record_date, xp, duration_minutes in records:
-        if record_date:  # Only process if date is not None
-            date_str = record_date.strftime('%Y-%m-%d')
-            if date_str not in heatmap_data:
-                heatmap_data[date_str] = {'xp': 0, 'total_minutes': 0}
-            heatmap_data[date_str]['xp'] += (xp or 0)
-            heatmap_data[date_str]['total_minutes'] += (duration_minutes or 0)
+    heatmap_data = {
+        str(day): {'xp': xp or 0, 'total_minutes': minutes or 0}
+        for day, xp, minutes in rows
+    }
     
     # Fill in all dates with 0 for missing dates
     current = start_date.date()
@@ -1441,23 +2388,26 @@ def statistics_activity_heatmap():
 
 
 @api_bp.route('/statistics/time_analysis/<period>', methods=['GET'])
+@response_cache.cached
 def statistics_time_analysis(period):
     """Get time-based analysis data (daily, weekly, monthly)"""
-    from sqlalchemy import func, extract
+    from sqlalchemy import extract
     from datetime import datetime, timedelta
     
     now = datetime.now()
+    user_id = current_user_id()
     
     if period == 'daily':
         # Last 7 days
         start_date = now - timedelta(days=7)
         results = db.session.query(
-            func.date(Record.date).label('date'),
-            func.sum(Record.duration_minutes).label('minutes'),
-            func.sum(Record.xp_gained).label('xp')
+            DailyStats.day,
+            func.sum(DailyStats.minutes_sum).label('minutes'),
+            func.sum(DailyStats.xp_sum).label('xp')
         ).filter(
-            Record.date >= start_date
-        ).group_by(func.date(Record.date)).all()
+            DailyStats.user_id == user_id,
+            DailyStats.day >= start_date.date()
+        ).group_by(DailyStats.day).all()
         
         labels = [(start_date + timedelta(days=i)).strftime('%m/%d') for i in range(8)]
         
@@ -1465,11 +2415,12 @@ def statistics_time_analysis(period):
         # Last 4 weeks
         start_date = now - timedelta(weeks=4)
         results = db.session.query(
-            extract('week', Record.date).label('week'),
-            func.sum(Record.duration_minutes).label('minutes'),
-            func.sum(Record.xp_gained).label('xp')
+            extract('week', DailyStats.day).label('week'),
+            func.sum(DailyStats.minutes_sum).label('minutes'),
+            func.sum(DailyStats.xp_sum).label('xp')
         ).filter(
-            Record.date >= start_date
+            DailyStats.user_id == user_id,
+            DailyStats.day >= start_date.date()
         ).group_by('week').all()
         
         labels = [f'第{i+1}週' for i in range(4)]
@@ -1478,11 +2429,12 @@ def statistics_time_analysis(period):
         # Last 6 months
         start_date = now - timedelta(days=180)
         results = db.session.query(
-            extract('month', Record.date).label('month'),
-            func.sum(Record.duration_minutes).label('minutes'),
-            func.sum(Record.xp_gained).label('xp')
+            extract('month', DailyStats.day).label('month'),
+            func.sum(DailyStats.minutes_sum).label('minutes'),
+            func.sum(DailyStats.xp_sum).label('xp')
         ).filter(
-            Record.date >= start_date
+            DailyStats.user_id == user_id,
+            DailyStats.day >= start_date.date()
         ).group_by('month').all()
         
         labels = ['1月', '2月', '3月', '4月', '5月', '6月', '7月', '8月', '9月', '10月', '11月', '12月']
@@ -1494,7 +2446,7 @@ def statistics_time_analysis(period):
     for row in results:
         try:
             if period == 'daily':
-                idx = (datetime.strptime(str(row[0]), '%Y-%m-%d') - start_date).days
+                idx = (row[0] - start_date.date()).days
             elif period == 'weekly':
                 idx = min(int(row[0] or 0) % 4, 3)
             else:
@@ -1514,82 +2466,25 @@ def statistics_time_analysis(period):
 
 
 # --- Export API ---
+def export_response(chunks, mimetype, filename):
+    """Stream an export download, gzip-compressed on the fly when the client accepts it."""
+    headers = {'Content-Disposition': f'attachment; filename={filename}', 'Vary': 'Accept-Encoding'}
+    if request.accept_encodings['gzip']:
+        chunks = gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
+
+
 @api_bp.route('/export/csv', methods=['GET'])
 def export_csv():
-    """Export all records as CSV"""
-    import io
-    import csv
-    from flask import Response
-    
-    records = Record.query.order_by(Record.date.desc()).all()
-    
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Header
-    writer.writerow(['ID', '種別', 'サブタイプ', '説明', '取得XP', '日付', '時間(分)', '評価'])
-    
-    # Data
-    for r in records:
-        writer.writerow([
-            r.id,
-            r.type,
-            r.subtype,
-            r.description,
-            r.xp_gained,
-            r.date.strftime('%Y-%m-%d %H:%M:%S') if r.date else '',
-            r.duration_minutes or '',
-            r.evaluation or ''
-        ])
-    
-    output.seek(0)
-    return Response(
-        output.getvalue(),
-        mimetype='text/csv',
-        headers={'Content-Disposition': 'attachment; filename=xp_records.csv'}
-    )
+    """Export the user's records as CSV (streamed)"""
+    return export_response(iter_records_csv(current_user_id()), 'text/csv', 'xp_records.csv')
 
 
 @api_bp.route('/export/json', methods=['GET'])
 def export_json():
-    """Export all data as JSON"""
-    user_status = UserStatus.query.first()
-    records = Record.query.order_by(Record.date.desc()).all()
-    books = Book.query.all()
-    links = ResourceLink.query.all()
-    
-    export_data = {
-        'exported_at': datetime.now().isoformat(),
-        'user': {
-            'username': user_status.username if user_status else '新規ユーザー',
-            'total_xp': user_status.total_xp if user_status else 0
-        },
-        'records': [{
-            'id': r.id,
-            'type': r.type,
-            'subtype': r.subtype,
-            'description': r.description,
-            'xp_gained': r.xp_gained,
-            'date': r.date.isoformat() if r.date else None,
-            'duration_minutes': r.duration_minutes,
-            'evaluation': r.evaluation,
-            'image_path': r.image_path
-        } for r in records],
-        'books': [{
-            'id': b.id,
-            'title': b.title,
-            'author': b.author,
-            'description': b.description
-        } for b in books],
-        'links': [{
-            'id': l.id,
-            'name': l.name,
-            'url': l.url,
-            'description': l.description
-        } for l in links]
-    }
-    
-    return jsonify(export_data)
+    """Export the user's records and the library as JSON (streamed)"""
+    return export_response(iter_export_json(current_user_id()), 'application/json', 'xp_export.json')
 
 
 # --- YouTube Playlist Processing API ---
@@ -1606,7 +2501,7 @@ def create_playlist():
             return jsonify({'error': 'プレイリストURL/IDを入力してください。'}), 400
         
         # Import from app.py
-        from app import extract_playlist_id, fetch_youtube_playlist_info, get_youtube_playlist_videos_info_ytdlp, get_youtube_playlist_video_ids
+        from app import extract_playlist_id, fetch_youtube_playlist_info, get_youtube_playlist_entries
         
         # Extract playlist ID
         playlist_id = extract_playlist_id(playlist_id_or_url)
@@ -1621,18 +2516,13 @@ def create_playlist():
         
         oembed_title = playlist_info.get('title', f'Playlist ({playlist_id[:8]}...)')
         
-        # 動画一覧とサムネイルを取得
+        # 動画一覧を取得（保存してサムネイル・動画数にも使用）
+        entries = get_youtube_playlist_entries(playlist_id)
+        playlist_cache.put(playlist_id, entries)
         thumbnail_url = ''
-        video_count = 0
-        try:
-            video_ids = get_youtube_playlist_video_ids(playlist_id)
-            video_count = len(video_ids)
-            if video_ids:
-                first_video_id = video_ids[0]
-                # YouTubeの高画質サムネイルURLを直接生成
-                thumbnail_url = f'https://i.ytimg.com/vi/{first_video_id}/hqdefault.jpg'
-        except Exception as e:
-            print(f"[WARNING] Failed to get playlist thumbnail: {e}")
+        if entries:
+            # YouTubeの高画質サムネイルURLを直接生成
+            thumbnail_url = f"https://i.ytimg.com/vi/{entries[0]['video_id']}/hqdefault.jpg"
         
         final_title = title if title else oembed_title
         
@@ -1646,8 +2536,8 @@ def create_playlist():
             existing.description = description or existing.description
             if thumbnail_url:
                 existing.thumbnail_url = thumbnail_url
-            existing.cached_video_count = video_count
-            existing.cache_updated_at = datetime.utcnow()
+            if entries is not None:
+                sync_playlist_videos(existing, entries)
             db.session.commit()
             
             return jsonify({
@@ -1661,10 +2551,12 @@ def create_playlist():
                 title=final_title,
                 description=description,
                 thumbnail_url=thumbnail_url,
-                cached_video_count=video_count,
-                cache_updated_at=datetime.utcnow()
+                cached_video_count=0
             )
             db.session.add(new_playlist)
+            db.session.flush()
+            if entries is not None:
+                sync_playlist_videos(new_playlist, entries)
             db.session.commit()
             
             return jsonify({
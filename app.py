@@ -25,9 +25,23 @@ import fitz
 from models import db, UserStatus, Record, Book, ResourceLink, YouTubePlaylist, PlaylistViewHistory, VideoView, PlaylistMaterial
 from xp_core import XPCalculator, Constants
 from api_routes import api_bp
+from page_cache import page_cache
+from document_pool import document_pool
+from render_pool import render_pool
+from book_tasks import book_tasks
+from response_cache import response_cache, ensure_data_version
+from playlist_cache import playlist_cache
+from playlist_refresh import playlist_refresh
+from progress_buffer import progress_buffer
+from migrations import upgrade_schema
+from storage import init_storage, DEFAULT_SQLITE_PRAGMAS
+from commands import register_commands
+from accounts import init_accounts, ensure_default_user, load_secret_key
 
 # --- Configuration Constants ---
 UPLOAD_FOLDER = "static/uploads"
+PAGE_CACHE_FOLDER = "cache/pages"
+THUMBNAIL_FOLDER = "cache/thumbnails"
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "pdf", "epub"}
 DATABASE_FILE = "xp_system.db"
 ASSETS_FOLDER = "static/assets"
@@ -54,15 +68,53 @@ jp = pytz.timezone("Asia/Tokyo")
 # Flask Application Setup
 app = Flask(__name__, static_folder='static')
 CORS(app)
-app.config["SECRET_KEY"] = "your_secret_key_here"
+app.config["SECRET_KEY"] = load_secret_key(app)  # SECRET_KEY environment variable, or a random key kept in instance/secret.key
 app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{DATABASE_FILE}"
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 app.config["MAX_CONTENT_LENGTH"] = 256 * 1024 * 1024  # 256 MB max file size
+app.config["PAGE_CACHE_FOLDER"] = PAGE_CACHE_FOLDER
+app.config["THUMBNAIL_FOLDER"] = THUMBNAIL_FOLDER
+app.config["PAGE_CACHE_MAX_BYTES"] = 512 * 1024 * 1024  # Rendered page cache budget (disk)
+app.config["PAGE_CACHE_MEMORY_BYTES"] = 32 * 1024 * 1024  # Rendered page cache budget (memory)
+app.config["PDF_DOCUMENT_POOL_SIZE"] = 8  # Max open PDF documents shared by reader endpoints
+app.config["RENDER_WORKERS"] = min(4, os.cpu_count() or 1)  # Page renderer processes (0 = render inline)
+app.config["PRERENDER_ON_UPLOAD"] = True  # Warm the page cache in the background when a PDF is uploaded
+app.config["PRERENDER_MAX_PAGES"] = 20  # Pre-render only the first N pages (None = all pages; POST /api/books/<id>/prerender can ask for more)
+app.config["SQLITE_PRAGMAS"] = dict(DEFAULT_SQLITE_PRAGMAS)  # WAL + busy_timeout etc. applied to every connection
+app.config["DB_WRITE_RETRIES"] = 5  # Re-run a write transaction up to N times on "database is locked"
+app.config["RESPONSE_CACHE_MAX_ENTRIES"] = 256  # Memoized /statistics/* responses (invalidated on every record write; youtube_progress on every watch-progress write)
+app.config["PLAYLIST_CACHE_TTL"] = 600  # Seconds a yt-dlp playlist extraction is reused by the playlist detail page
+app.config["PLAYLIST_CACHE_MAX_ENTRIES"] = 64  # Playlists kept in the extraction cache (LRU)
+app.config["PLAYLIST_REFRESH_MAX_AGE"] = 24 * 3600  # Seconds before a playlist's stored video list is refreshed in the background
+app.config["PLAYLIST_REFRESH_WORKERS"] = 2  # Worker threads of the playlist refresh scheduler
+app.config["PLAYLIST_REFRESH_MIN_INTERVAL"] = 2.0  # Minimum seconds between outbound yt-dlp calls of the scheduler
+app.config["PLAYLIST_REFRESH_MAX_ATTEMPTS"] = 3  # Attempts per refresh job (retries back off exponentially)
+app.config["PLAYLIST_REFRESH_BACKOFF"] = 30.0  # Seconds before the first retry (doubled for each further retry)
+app.config["PLAYLIST_REFRESH_COOLDOWN"] = 300.0  # Seconds a finished job is reused before the same playlist is re-queued
+app.config["PROGRESS_FLUSH_INTERVAL"] = 5.0  # Seconds between batched writes of video watch progress (0 = write every report immediately)
+app.config["PROGRESS_BUFFER_MAX_PENDING"] = 5000  # Flush early once this many videos have unsaved progress
+app.config["PROGRESS_MAX_EVENTS"] = 500  # Max progress events per POST /api/playlists/progress
+app.config["REQUIRE_LOGIN"] = False  # True: /api/* always requires a login (False: only once a user other than the default one exists)
+
+
+def _init_extensions():
+    """Initialize the database, caches, worker pools and accounts."""
+    db.init_app(app)
+    init_storage(app)
+    page_cache.init_app(app)
+    document_pool.init_app(app)
+    render_pool.init_app(app)
+    book_tasks.init_app(app)
+    response_cache.init_app(app)
+    playlist_cache.init_app(app)
+    playlist_refresh.init_app(app)
+    progress_buffer.init_app(app)
+    init_accounts(app)
 
-db.init_app(app)
 
 # Register API blueprint
 app.register_blueprint(api_bp)
+register_commands(app)
 
 # --- Global Cache and Authentication State ---
 _pixiv_cache = None
@@ -84,8 +136,6 @@ def _init_directories():
                 print(f"⚠️ Failed to create directory {folder}: {e}")
 
 
-_init_directories()
-
 
 def allowed_file(filename):
     """Check if file extension is allowed."""
@@ -93,13 +143,23 @@ def allowed_file(filename):
 
 
 # --- Database Initialization ---
-with app.app_context():
-    db.create_all()
-    if not UserStatus.query.first():
-        db.session.add(UserStatus(username="イラスト・クリエイター"))
+def _init_database():
+    """Create tables, apply migrations and ensure the default user."""
+    with app.app_context():
+        upgrade_schema()
+        ensure_data_version()
+        app.config["DEFAULT_USER_ID"] = ensure_default_user()
         db.session.commit()
 
 
+# Render workers are started with "spawn", which re-imports this file as
+# __mp_main__ in every worker; only the web process runs the setup.
+if __name__ != '__mp_main__':
+    _init_extensions()
+    _init_directories()
+    _init_database()
+
+
 # --- Pixiv API Authentication ---
 _token_expires_at = datetime.min
 _refresh_token = None
@@ -472,10 +532,15 @@ def fetch_youtube_playlist_info(playlist_id):
         return None
 
 
-def get_youtube_playlist_video_ids(playlist_id):
-    """Extract all video IDs from a YouTube playlist using yt-dlp."""
+def get_youtube_playlist_entries(playlist_id):
+    """Extract the ordered video entries of a YouTube playlist using yt-dlp.
+
+    Returns a list of dicts (video_id, title, duration, thumbnail_url,
+    channel), or None if the extraction failed (as opposed to an empty
+    playlist).
+    """
     if not playlist_id:
-        return []
+        return None
 
     try:
         import yt_dlp
@@ -491,62 +556,39 @@ def get_youtube_playlist_video_ids(playlist_id):
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             info = ydl.extract_info(playlist_url, download=False)
 
-            video_ids = []
-            if 'entries' in info:
-                for entry in info['entries']:
-                    if entry and 'id' in entry:
-                        video_ids.append(entry['id'])
-
-            return video_ids
+            entries = []
+            for entry in info.get('entries') or []:
+                if entry and 'id' in entry:
+                    video_id = entry['id']
+                    thumbnails = entry.get('thumbnails')
+                    entries.append({
+                        'video_id': video_id,
+                        'title': entry.get('title') or f'Video {video_id}',
+                        'duration': int(entry.get('duration') or 0),
+                        'thumbnail_url': thumbnails[-1].get('url', '') if thumbnails else '',
+                        'channel': entry.get('channel') or 'YouTube',
+                    })
+
+            return entries
 
     except ImportError:
         print(f"[ERROR] yt-dlp not installed")
-        return []
+        return None
 
     except Exception as e:
-        print(f"[ERROR] Failed to get video IDs: {e}")
-        return []
-
-
-def get_youtube_playlist_videos_info_ytdlp(playlist_id):
-    """Extract video information from a YouTube playlist using yt-dlp."""
-    if not playlist_id:
-        return {}
-
-    try:
-        import yt_dlp
-
-        playlist_url = f"https://www.youtube.com/playlist?list={playlist_id}"
-
-        ydl_opts = {
-            'quiet': True,
-            'no_warnings': True,
-            'extract_flat': 'in_playlist',
-        }
-
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(playlist_url, download=False)
-
-            video_info_map = {}
-            if 'entries' in info:
-                for entry in info['entries']:
-                    if entry and 'id' in entry:
-                        video_id = entry['id']
-                        video_info_map[video_id] = {
-                            'title': entry.get('title', f'Video {video_id}'),
-                            'duration': entry.get('duration', 0),
-                            'thumbnail_url': entry.get('thumbnails', [{}])[-1].get('url', '') if entry.get('thumbnails') else '',
-                            'channel': entry.get('channel', 'YouTube'),
-                        }
+        print(f"[ERROR] Failed to extract playlist entries: {e}")
+        return None
 
-            return video_info_map
 
-    except ImportError:
-        return {}
+def get_cached_playlist_entries(playlist_id):
+    """Return the playlist entries from the in-process cache, extracting them once on a miss.
 
-    except Exception as e:
-        print(f"[ERROR] Failed to extract playlist info: {e}")
-        return {}
+    Concurrent callers for the same playlist share one yt-dlp extraction.
+    The returned list is shared and must not be modified.
+    """
+    if not playlist_id:
+        return None
+    return playlist_cache.get(playlist_id, get_youtube_playlist_entries)
 
 
 # --- Static File Routes ---
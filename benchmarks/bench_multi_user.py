@@ -0,0 +1,131 @@
+"""
+Multi-User Dashboard Benchmark
+
+Seeds one SQLite database with many users (each with a year of records
+and the daily rollup) and times the dashboard endpoints for a single
+user, with the response cache disabled. With the (user_id, ...)
+composite indexes each request touches only that user's rows, so the
+timings should barely change as the number of users grows.
+
+Also prints the SQLite query plan of the scoped record listing to show
+which index it uses.
+
+Usage:
+    python benchmarks/bench_multi_user.py [--users 1,100,300] [--records 2000] [--repeat 20]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import insert, text
+
+from models import db, Record
+from accounts import init_accounts, create_user
+from daily_stats import rebuild_daily_stats
+from response_cache import response_cache, ensure_data_version
+from storage import init_storage
+
+ENDPOINTS = (
+    '/api/status',
+    '/api/records?cursor=&limit=50',
+    '/api/archive?lazy=true',
+    '/api/statistics/xp_by_technique',
+    '/api/statistics/learning_patterns',
+    '/api/statistics/activity_heatmap',
+    '/api/statistics/time_analysis/monthly',
+)
+
+ACTIVITIES = ('基礎技法', '応用技法')
+
+
+def make_app(db_path):
+    from api_routes import api_bp
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SECRET_KEY'] = 'bench'
+    db.init_app(app)
+    init_storage(app)
+    response_cache.init_app(app)
+    init_accounts(app)
+    app.register_blueprint(api_bp)
+    return app
+
+
+def seed(users, records_per_user):
+    rng = random.Random(0)
+    start = datetime.now() - timedelta(days=365)
+    user_ids = []
+    for i in range(users):
+        user = create_user(f'student{i:04d}', 'password')
+        user_ids.append(user.id)
+        rows = [{
+            'user_id': user.id,
+            'type': '時間学習',
+            'subtype': rng.choice(ACTIVITIES),
+            'description': '',
+            'xp_gained': 1200,
+            'date': start + timedelta(minutes=rng.randrange(365 * 24 * 60)),
+            'duration_minutes': 30,
+        } for _ in range(records_per_user)]
+        db.session.execute(insert(Record), rows)
+    db.session.commit()
+    rebuild_daily_stats()
+    ensure_data_version()
+    return user_ids
+
+
+def run(users, records_per_user, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'users.db'))
+        with app.app_context():
+            db.create_all()
+            user_ids = seed(users, records_per_user)
+            plan = db.session.execute(text(
+                "EXPLAIN QUERY PLAN SELECT * FROM record WHERE user_id = :user_id "
+                "ORDER BY date DESC, id DESC LIMIT 51"
+            ), {'user_id': user_ids[-1]}).all()
+
+        client = app.test_client()
+        client.post('/api/auth/login', json={'username': f'student{users - 1:04d}', 'password': 'password'})
+        timings = {}
+        for url in ENDPOINTS:
+            elapsed = []
+            for _ in range(repeat):
+                response_cache.clear()
+                begin = time.perf_counter()
+                response = client.get(url)
+                elapsed.append(time.perf_counter() - begin)
+                assert response.status_code == 200, (url, response.status_code)
+            timings[url] = sorted(elapsed)[len(elapsed) // 2] * 1000
+
+        with app.app_context():
+            db.engine.dispose()
+
+    print(f"{users} users x {records_per_user} records "
+          f"(plan: {'; '.join(row[-1] for row in plan)})")
+    for url, ms in timings.items():
+        print(f"  {url:<42} {ms:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', default='1,100,300', help='Comma-separated user counts')
+    parser.add_argument('--records', type=int, default=2000, help='Records per user')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    for users in (int(u) for u in args.users.split(',')):
+        run(users, args.records, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
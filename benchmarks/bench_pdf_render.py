@@ -0,0 +1,115 @@
+"""
+PDF Render Micro-Benchmark
+
+Compares the legacy PPM round-trip used by the book reader against the
+zero-copy pixmap paths in pdf_render.py, at zoom levels 1-4.
+
+Usage:
+    python benchmarks/bench_pdf_render.py [path/to/book.pdf] [--pages N] [--quality Q]
+
+Without a PDF path a synthetic text + vector document is generated.
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz
+from PIL import Image
+
+from pdf_render import encode_pixmap, pixmap_to_image, render_pixmap
+
+
+def legacy_jpeg(page, zoom, quality):
+    """旧実装: PPMにシリアライズして Pillow で再パースする経路。"""
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+    pil_image = Image.open(io.BytesIO(pix.tobytes("ppm")))
+    if pil_image.mode in ('RGBA', 'LA', 'P'):
+        pil_image = pil_image.convert('RGB')
+    output = io.BytesIO()
+    pil_image.save(output, format='JPEG', quality=quality, optimize=True)
+    return output.getvalue()
+
+
+def frombuffer_jpeg(page, zoom, quality):
+    """pix.samples を Image.frombuffer で包み Pillow でエンコードする経路。"""
+    pix = render_pixmap(page, zoom)
+    output = io.BytesIO()
+    pixmap_to_image(pix).save(output, format='JPEG', quality=quality, optimize=True)
+    return output.getvalue()
+
+
+def native_jpeg(page, zoom, quality):
+    """MuPDF のネイティブJPEGエンコーダを使う経路。"""
+    return render_pixmap(page, zoom).tobytes('jpeg', jpg_quality=quality)
+
+
+def legacy_webp(page, zoom, quality):
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+    pil_image = Image.open(io.BytesIO(pix.tobytes("ppm")))
+    output = io.BytesIO()
+    pil_image.save(output, format='WEBP', quality=quality, method=4)
+    return output.getvalue()
+
+
+def frombuffer_webp(page, zoom, quality):
+    return encode_pixmap(render_pixmap(page, zoom), quality, True)[0]
+
+
+def render_only(page, zoom, quality):
+    """比較用: ラスタライズのみ（エンコードなし）。"""
+    render_pixmap(page, zoom)
+    return b''
+
+
+PATHS = [
+    ('render only', render_only),
+    ('jpeg: ppm round-trip (old)', legacy_jpeg),
+    ('jpeg: frombuffer + Pillow', frombuffer_jpeg),
+    ('jpeg: MuPDF native', native_jpeg),
+    ('webp: ppm round-trip (old)', legacy_webp),
+    ('webp: frombuffer + Pillow', frombuffer_webp),
+]
+
+
+def make_sample_pdf(pages):
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        for y in range(72, 760, 24):
+            page.insert_text((48, y), f"Page {i} line {y} - perspective grid and figure drawing notes", fontsize=11)
+        for k in range(12):
+            page.draw_circle((300, 420), 20 + k * 18, color=(k / 12, 0.3, 1 - k / 12), width=2)
+    return doc
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pdf', nargs='?', help='PDF file to benchmark (default: synthetic document)')
+    parser.add_argument('--pages', type=int, default=5, help='number of pages to render per measurement')
+    parser.add_argument('--quality', type=int, default=85)
+    args = parser.parse_args()
+
+    doc = fitz.open(args.pdf) if args.pdf else make_sample_pdf(args.pages)
+    pages = [doc[i] for i in range(min(args.pages, len(doc)))]
+
+    print(f"{len(pages)} page(s), quality={args.quality}")
+    print(f"{'zoom':>4}  {'path':<28} {'ms/page':>9} {'KB/page':>9}")
+    for zoom in range(1, 5):
+        for name, fn in PATHS:
+            fn(pages[0], zoom, args.quality)  # warm-up
+            size = 0
+            start = time.perf_counter()
+            for page in pages:
+                size += len(fn(page, zoom, args.quality))
+            elapsed = (time.perf_counter() - start) / len(pages)
+            print(f"{zoom:>4}  {name:<28} {elapsed * 1000:>9.1f} {size / len(pages) / 1024:>9.1f}")
+        print()
+
+
+if __name__ == '__main__':
+    main()
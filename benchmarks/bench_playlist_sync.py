@@ -0,0 +1,164 @@
+"""
+Incremental Playlist Sync Benchmark
+
+Seeds a large course playlist (500 videos by default) with viewing
+progress of several users, then re-syncs it with sync_playlist_videos()
+three times: with an unchanged list, with a few edits (videos moved,
+inserted at the top, removed and retitled), and with the list reversed.
+For each sync it prints the time, the SQL statements and the rows
+written (only changed playlist_video rows; video_view is never
+rewritten), and checks that every user's progress still belongs to the
+same video, now found at that video's new position.
+
+Exits with status 1 if any progress ended up on the wrong video.
+
+Usage:
+    python benchmarks/bench_playlist_sync.py [--videos 500] [--users 20]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import event, insert, select
+
+from models import db, YouTubePlaylist, PlaylistVideo, VideoView
+from accounts import create_user
+from playlist_videos import sync_playlist_videos
+
+
+def make_app(db_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    db.init_app(app)
+    return app
+
+
+def make_entries(video_ids):
+    return [{
+        'video_id': video_id,
+        'title': f'Lesson {video_id}',
+        'duration': 600,
+        'thumbnail_url': f'https://i.ytimg.com/vi/{video_id}/hqdefault.jpg',
+        'channel': 'Course',
+    } for video_id in video_ids]
+
+
+def seed(videos, users):
+    """再生リストを同期し、各ユーザーの全動画の視聴情報を作成します。"""
+    playlist = YouTubePlaylist(playlist_id='PLcourse', title='Course')
+    db.session.add(playlist)
+    db.session.flush()
+    video_ids = [f'vid{i:05d}' for i in range(videos)]
+    sync_playlist_videos(playlist, make_entries(video_ids))
+
+    now = datetime.utcnow()
+    for u in range(users):
+        user_id = create_user(f'student{u:03d}', 'password').id
+        db.session.execute(insert(VideoView), [{
+            'user_id': user_id,
+            'playlist_id': playlist.id,
+            'video_id': video_id,
+            'video_index': index,
+            'watch_count': 1,
+            # 動画ごとに異なる視聴時間で、進捗が別の動画に移っていないか確認する
+            'watched_duration_seconds': u * 10000 + index,
+            'is_completed': index % 2 == 0,
+            'xp_gained': 10,
+            'first_viewed': now,
+            'last_viewed': now,
+        } for index, video_id in enumerate(video_ids)])
+    db.session.commit()
+    return playlist.id, video_ids
+
+
+def check_progress(playlist_pk, seeded_ids, video_ids):
+    """各視聴情報が元の動画に紐づき、その動画の新しい位置で参照されるかを返します。"""
+    seeded_index = {video_id: index for index, video_id in enumerate(seeded_ids)}
+    position = {}
+    for index, video_id in enumerate(video_ids):
+        position.setdefault(video_id, index)
+    rows = db.session.execute(
+        select(VideoView.video_id, VideoView.watched_duration_seconds, PlaylistVideo.position)
+        .outerjoin(PlaylistVideo, (PlaylistVideo.playlist_id == VideoView.playlist_id)
+                   & (PlaylistVideo.video_id == VideoView.video_id))
+        .where(VideoView.playlist_id == playlist_pk)
+    ).all()
+    return all(
+        seconds % 10000 == seeded_index[video_id] and current == position.get(video_id)
+        for video_id, seconds, current in rows
+    )
+
+
+def run_sync(playlist_pk, entries):
+    """同期を1回実行し、(秒, SQL文の数, 書き込んだ行数, 差分) を返します。"""
+    statements = []
+    written = []
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+        if not statement.lstrip().upper().startswith('SELECT') and cursor.rowcount > 0:
+            written.append(cursor.rowcount)
+
+    engine = db.engine
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+    try:
+        begin = time.perf_counter()
+        changes = sync_playlist_videos(db.session.get(YouTubePlaylist, playlist_pk), entries)
+        db.session.commit()
+        elapsed = time.perf_counter() - begin
+    finally:
+        event.remove(engine, 'after_cursor_execute', after_cursor_execute)
+    return elapsed, len(statements), sum(written), changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--videos', type=int, default=500)
+    parser.add_argument('--users', type=int, default=20)
+    args = parser.parse_args()
+
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'sync.db'))
+        with app.app_context():
+            db.create_all()
+            playlist_pk, seeded_ids = seed(args.videos, args.users)
+            print(f"{args.videos} videos, {args.users} users ({args.videos * args.users} views)")
+
+            edited = list(seeded_ids)
+            moved = [edited.pop(10 + i) for i in range(5)]
+            edited[100:100] = moved                             # 5 videos moved
+            del edited[-5:]                                     # 5 videos removed
+            edited[0:0] = [f'new{i:03d}' for i in range(5)]     # 5 videos inserted at the top
+            entries = make_entries(edited)
+            for entry in entries[200:203]:                      # 3 videos retitled
+                entry['title'] += ' (revised)'
+
+            scenarios = (
+                ('unchanged', make_entries(seeded_ids), seeded_ids),
+                ('edited', entries, edited),
+                ('reversed', make_entries(edited[::-1]), edited[::-1]),
+            )
+            for name, scenario_entries, video_ids in scenarios:
+                elapsed, statements, rows, changes = run_sync(playlist_pk, scenario_entries)
+                correct = check_progress(playlist_pk, seeded_ids, video_ids)
+                ok &= correct
+                print(f"  {name:<10} {elapsed * 1000:8.1f} ms  {statements:4d} statements  {rows:6d} rows written  "
+                      + ' '.join(f"{k}={v}" for k, v in changes.items())
+                      + ('' if correct else '  (progress on the wrong video)'))
+            db.engine.dispose()
+
+    if ok:
+        print("✅ Progress follows its video after every sync")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
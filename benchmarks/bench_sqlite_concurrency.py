@@ -0,0 +1,149 @@
+"""
+SQLite Concurrency Stress Test
+
+Runs several worker processes (like gunicorn workers) against one SQLite
+file, each doing a log_time-style write transaction (read user status,
+insert a record, add XP, update the daily rollup) or a statistics-style
+read, and compares:
+
+- default: no pragmas, read-modify-write of total_xp, a failed write is
+           an error (the old behaviour)
+- tuned:   storage.init_storage() pragmas and the app's save_new_record()
+           (atomic XP increment, storage.run_with_retry())
+
+Usage:
+    python benchmarks/bench_sqlite_concurrency.py [--workers N] [--seconds S] [--read-ratio R]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+
+from models import db, UserStatus, Record, DailyStats
+from daily_stats import apply_record
+from storage import init_storage
+from accounts import ensure_default_user
+
+
+def make_app(db_path, tuned):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    db.init_app(app)
+    if tuned:
+        init_storage(app)
+    return app
+
+
+def new_record():
+    return Record(type='時間学習', subtype='基礎技法', duration_minutes=30, xp_gained=1200,
+                  description='bench', date=datetime.now())
+
+
+def legacy_write_once():
+    """旧実装の log_time 相当の書き込みトランザクション。"""
+    user_status = UserStatus.query.first()
+    record = new_record()
+    record.user_id = user_status.user_id
+    user_status.total_xp += record.xp_gained
+    db.session.add(record)
+    apply_record(record)
+    db.session.commit()
+
+
+def read_once():
+    """統計API相当の読み込み。"""
+    db.session.query(DailyStats.day, func.sum(DailyStats.xp_sum)).group_by(DailyStats.day).all()
+    db.session.query(func.count(Record.id)).scalar()
+    db.session.rollback()
+
+
+def worker(db_path, tuned, start_at, seconds, read_ratio, results):
+    from api_routes import save_new_record
+
+    app = make_app(db_path, tuned)
+    rng = random.Random(os.getpid())
+    writes = reads = errors = 0
+    latencies = []
+    with app.app_context():
+        time.sleep(max(0, start_at - time.time()))
+        deadline = start_at + seconds
+        while time.time() < deadline:
+            begin = time.perf_counter()
+            try:
+                if rng.random() < read_ratio:
+                    read_once()
+                    reads += 1
+                    continue
+                if tuned:
+                    save_new_record(new_record())
+                else:
+                    legacy_write_once()
+                writes += 1
+                latencies.append(time.perf_counter() - begin)
+            except OperationalError:
+                db.session.rollback()
+                errors += 1
+    results.put((writes, reads, errors, latencies))
+
+
+def run(mode, workers, seconds, read_ratio):
+    tuned = mode == 'tuned'
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        app = make_app(db_path, tuned)
+        with app.app_context():
+            db.create_all()
+            ensure_default_user()
+            db.session.commit()
+            db.engine.dispose()
+
+        ctx = multiprocessing.get_context('spawn')
+        results = ctx.Queue()
+        start_at = time.time() + 2  # allow the workers to import
+        procs = [ctx.Process(target=worker, args=(db_path, tuned, start_at, seconds, read_ratio, results))
+                 for _ in range(workers)]
+        for p in procs:
+            p.start()
+        collected = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+
+        with app.app_context():
+            total_xp = UserStatus.query.first().total_xp
+            record_count = db.session.query(func.count(Record.id)).scalar()
+
+    writes = sum(r[0] for r in collected)
+    reads = sum(r[1] for r in collected)
+    errors = sum(r[2] for r in collected)
+    latencies = sorted(l for r in collected for l in r[3])
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0
+    print(f"{mode:>8}: {writes / seconds:8.1f} writes/s  {reads / seconds:8.1f} reads/s  "
+          f"{errors:5d} failed writes  p95 write {p95:7.1f} ms  "
+          f"(records={record_count}, xp consistent={total_xp == record_count * 1200})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--read-ratio', type=float, default=0.5)
+    args = parser.parse_args()
+
+    print(f"{args.workers} processes, {args.seconds:g}s, read ratio {args.read_ratio:g}")
+    for mode in ('default', 'tuned'):
+        run(mode, args.workers, args.seconds, args.read_ratio)
+
+
+if __name__ == '__main__':
+    main()
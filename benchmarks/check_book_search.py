@@ -0,0 +1,73 @@
+"""
+Book Search Snippet Escaping Check
+
+Indexes a page whose text contains HTML markup (tags, a <script>
+element, an ampersand and the control characters used as match markers)
+and searches for a word on it. The
+snippet must come back HTML-escaped, with only the match wrapped in
+<mark>, so clients can render it as HTML without running the page text.
+
+Exits with status 1 if markup from the page text survives unescaped.
+
+Usage:
+    python benchmarks/check_book_search.py
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import text
+
+from models import db, Book
+from book_search import SEARCH_TABLE, create_search_table, normalize_page_text, search_pages
+
+# snippet() は一致箇所の前後40文字程度のみ返すため、マークアップは一致語の近くに置く
+PAGE_TEXT = '<b>\x02a\x03</b> perspective & <script>alert(1)</script>'
+
+
+def make_app(db_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    db.init_app(app)
+    return app
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'search.db'))
+        with app.app_context():
+            db.create_all()
+            create_search_table()
+            book = Book(title='Perspective <b>Basics</b>', pdf_file_path='perspective.pdf')
+            db.session.add(book)
+            db.session.flush()
+            db.session.execute(
+                text(f"INSERT INTO {SEARCH_TABLE} (text, book_id, page_num) VALUES (:text, :book_id, 0)"),
+                {'text': normalize_page_text(PAGE_TEXT), 'book_id': book.id}
+            )
+            db.session.commit()
+
+            results, _ = search_pages('perspective')
+            snippet = results[0]['snippet'] if results else ''
+            db.engine.dispose()
+
+    print(f"snippet: {snippet}")
+    page_markup = snippet.replace('<mark>perspective</mark>', '')
+    ok = (
+        '<mark>perspective</mark>' in snippet
+        and '<' not in page_markup and '>' not in page_markup
+        and '&lt;script&gt;' in snippet and '&amp;' in snippet
+    )
+    if ok:
+        print("✅ Page text is escaped; only the matches are marked up")
+    else:
+        print("❌ Snippet contains unescaped markup from the page text")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
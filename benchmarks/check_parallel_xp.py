@@ -0,0 +1,88 @@
+"""
+Parallel XP Writer Check
+
+Hammers the record write paths from several processes at once, each
+logging records through save_new_record() and deleting some of them again
+through remove_record() (including deletes of the same record racing
+each other), then checks that UserStatus.total_xp equals
+SUM(Record.xp_gained) and that the daily rollup matches the records.
+
+Exits with status 1 if any XP was lost or double-counted.
+
+Usage:
+    python benchmarks/check_parallel_xp.py [--workers N] [--writes M]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func
+
+from bench_sqlite_concurrency import make_app, new_record
+from models import db, UserStatus, Record, DailyStats
+from accounts import ensure_default_user
+
+
+def worker(db_path, writes, seed, barrier):
+    from api_routes import save_new_record, remove_record
+
+    app = make_app(db_path, tuned=True)
+    rng = random.Random(seed)
+    with app.app_context():
+        barrier.wait()
+        for _ in range(writes):
+            record = new_record()
+            record.xp_gained = rng.randint(1, 5000)
+            save_new_record(record)
+            if rng.random() < 0.3:
+                # Any recent record, possibly one another worker is deleting too
+                latest = db.session.query(func.max(Record.id)).scalar() or 0
+                db.session.rollback()
+                remove_record(rng.randint(max(1, latest - 5), max(1, latest)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--writes', type=int, default=200, help='Records logged per worker')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'xp.db')
+        app = make_app(db_path, tuned=True)
+        with app.app_context():
+            db.create_all()
+            ensure_default_user()
+            db.session.commit()
+
+        ctx = multiprocessing.get_context('spawn')
+        barrier = ctx.Barrier(args.workers)
+        procs = [ctx.Process(target=worker, args=(db_path, args.writes, seed, barrier)) for seed in range(args.workers)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+
+        with app.app_context():
+            total_xp = UserStatus.query.first().total_xp
+            record_xp = db.session.query(func.coalesce(func.sum(Record.xp_gained), 0)).scalar()
+            record_count = db.session.query(func.count(Record.id)).scalar()
+            rollup_xp = db.session.query(func.coalesce(func.sum(DailyStats.xp_sum), 0)).scalar()
+            rollup_count = db.session.query(func.coalesce(func.sum(DailyStats.record_count), 0)).scalar()
+
+    failed = [p for p in procs if p.exitcode != 0]
+    print(f"{args.workers} workers x {args.writes} writes: {record_count} records kept")
+    print(f"total_xp={total_xp:,}  SUM(xp_gained)={record_xp:,}  rollup xp={rollup_xp:,} count={rollup_count}")
+    ok = not failed and total_xp == record_xp == rollup_xp and rollup_count == record_count
+    print("✅ No XP lost" if ok else f"❌ XP drift detected ({len(failed)} worker(s) failed)")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
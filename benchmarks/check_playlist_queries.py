@@ -0,0 +1,135 @@
+"""
+Playlist Endpoint Query Count Check
+
+Seeds databases with different numbers of playlists (each with a few
+videos watched by a logged-in student and by another user) and counts the
+SQL statements issued by GET /api/playlists and
+GET /api/statistics/youtube_progress. The count must not grow with the
+number of playlists (no N+1 queries), and the aggregated progress must
+match the student's per-playlist totals.
+
+Exits with status 1 if a query count varies or a total is wrong.
+
+Usage:
+    python benchmarks/check_playlist_queries.py [--sizes 1,10,100]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import event
+
+from models import db, YouTubePlaylist, PlaylistVideo, VideoView
+from response_cache import response_cache, ensure_data_version
+from accounts import init_accounts, create_user
+
+ENDPOINTS = ('/api/playlists', '/api/statistics/youtube_progress')
+VIDEOS_PER_PLAYLIST = 5
+
+
+def make_app(db_path):
+    from api_routes import api_bp
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SECRET_KEY'] = 'bench'
+    db.init_app(app)
+    response_cache.init_app(app)
+    init_accounts(app)
+    app.register_blueprint(api_bp)
+    return app
+
+
+def seed(playlists):
+    user_id = create_user('student', 'password').id
+    other_id = create_user('other', 'other').id
+    for i in range(playlists):
+        # Fresh cache so that /api/playlists does not start a background refresh
+        playlist = YouTubePlaylist(playlist_id=f'PL{i:05d}', title=f'Playlist {i}',
+                                   thumbnail_url='https://example.com/t.jpg',
+                                   cached_video_count=VIDEOS_PER_PLAYLIST, cache_updated_at=datetime.utcnow())
+        db.session.add(playlist)
+        db.session.flush()
+        for index in range(VIDEOS_PER_PLAYLIST):
+            db.session.add(PlaylistVideo(playlist_id=playlist.id, video_id=f'vid{index}', position=index))
+            db.session.add(VideoView(user_id=user_id, playlist_id=playlist.id, video_id=f'vid{index}', video_index=index, watch_count=1,
+                                     watched_duration_seconds=60 * (index + 1), is_completed=index < 3,
+                                     xp_gained=100 if index < 3 else 0))
+            db.session.add(VideoView(user_id=other_id, playlist_id=playlist.id, video_id=f'vid{index}', video_index=index, watch_count=1,
+                                     watched_duration_seconds=600, is_completed=True, xp_gained=500))
+    db.session.commit()
+    ensure_data_version()
+    return user_id
+
+
+def count_queries(app, playlists):
+    """各エンドポイントの発行SQL数と、集計結果が正しいかを返します。"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    client = app.test_client()
+    client.post('/api/auth/login', json={'username': 'student', 'password': 'password'})
+    counts = {}
+    correct = True
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        for url in ENDPOINTS:
+            response_cache.clear()
+            statements.clear()
+            response = client.get(url)
+            counts[url] = len(statements)
+            data = response.get_json()
+            if len(data) != playlists:
+                correct = False
+            for item in data:
+                if url == ENDPOINTS[0]:
+                    correct &= item['completed_videos'] == 3
+                else:
+                    correct &= (item['completed_count'], item['total_xp'], item['total_watch_time_seconds']) == (3, 300, 900)
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return counts, correct
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1,10,100', help='Comma-separated playlist counts')
+    args = parser.parse_args()
+
+    results = {}
+    ok = True
+    for size in (int(s) for s in args.sizes.split(',')):
+        with tempfile.TemporaryDirectory() as tmp:
+            app = make_app(os.path.join(tmp, 'playlists.db'))
+            with app.app_context():
+                db.create_all()
+                seed(size)
+            counts, correct = count_queries(app, size)
+            with app.app_context():
+                db.engine.dispose()
+        results[size] = counts
+        ok &= correct
+        print(f"{size:5d} playlists: " + '  '.join(f"{url} {n} queries" for url, n in counts.items())
+              + ('' if correct else '  (wrong totals)'))
+
+    for url in ENDPOINTS:
+        if len({counts[url] for counts in results.values()}) != 1:
+            print(f"❌ {url}: query count depends on the number of playlists")
+            ok = False
+    if ok:
+        print("✅ Query counts are constant and totals are correct")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
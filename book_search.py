@@ -0,0 +1,140 @@
+"""
+Book Full-Text Search
+
+Per-page text of every book PDF in a SQLite FTS5 table using the trigram
+tokenizer, which matches Japanese text (no word boundaries) as well as
+substrings of English words. Text is extracted in a background book task
+after upload; searches are ranked with bm25 and return highlighted
+snippets.
+"""
+
+import html
+import re
+from datetime import datetime
+
+from sqlalchemy import text
+
+from models import db, Book
+from document_pool import document_pool
+
+SEARCH_TABLE = 'book_page_fts'
+MIN_QUERY_LENGTH = 3  # trigram は3文字未満の語を索引から検索できない
+INDEX_BATCH_PAGES = 20  # 1回のコミットで登録するページ数
+SNIPPET_TOKENS = 40  # trigram では1トークン≒1文字
+# snippet() の一致箇所の目印（PDFの本文に現れない制御文字。エスケープ後に <mark> へ置き換える）
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+
+_CJK = '\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef'  # 和文（かな・漢字・全角記号）
+_WHITESPACE_RE = re.compile(r'\s+')
+_CJK_GAP_RE = re.compile(f'(?<=[{_CJK}]) (?=[{_CJK}])')
+
+
+def create_search_table():
+    """全文検索用のFTS5仮想テーブルを作成します（存在する場合は何もしません）。"""
+    db.session.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+        "USING fts5(text, book_id UNINDEXED, page_num UNINDEXED, tokenize='trigram')"
+    ))
+    db.session.commit()
+
+
+def normalize_page_text(page_text):
+    """Collapse whitespace, and drop line breaks inside Japanese sentences so
+    that phrases wrapped across lines still match."""
+    page_text = page_text.replace(_MARK_START, '').replace(_MARK_END, '')
+    page_text = _WHITESPACE_RE.sub(' ', page_text).strip()
+    return _CJK_GAP_RE.sub('', page_text)
+
+
+def remove_book_text(book_id):
+    """書籍の索引を削除します（コミットは呼び出し側で行います）。"""
+    db.session.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE book_id = :book_id"), {'book_id': book_id})
+
+
+def index_book_text(task, book_id, pdf_path):
+    """Background task: extract the text of every page into the search index."""
+    with document_pool.open(pdf_path) as doc:
+        total = len(doc)
+    task.total = total
+
+    remove_book_text(book_id)
+    db.session.commit()
+
+    insert = text(f"INSERT INTO {SEARCH_TABLE} (text, book_id, page_num) VALUES (:text, :book_id, :page_num)")
+    for start in range(0, total, INDEX_BATCH_PAGES):
+        if task.cancelled:
+            # 途中までの索引は残さない
+            remove_book_text(book_id)
+            db.session.commit()
+            return
+
+        # Hold the shared document only for one batch so readers are not blocked
+        rows = []
+        with document_pool.open(pdf_path) as doc:
+            for page_num in range(start, min(start + INDEX_BATCH_PAGES, total)):
+                page_text = normalize_page_text(doc[page_num].get_text('text'))
+                if page_text:
+                    rows.append({'text': page_text, 'book_id': book_id, 'page_num': page_num})
+        if rows:
+            db.session.execute(insert, rows)
+        db.session.commit()
+        task.done = min(start + INDEX_BATCH_PAGES, total)
+
+    book = db.session.get(Book, book_id)
+    if book is not None:
+        book.text_indexed_at = datetime.utcnow()
+        db.session.commit()
+
+
+def build_match_query(query):
+    """Turn user input into an FTS5 MATCH expression.
+
+    Every whitespace-separated term becomes a quoted phrase (so FTS5
+    operators in the input are taken literally) and all terms must match.
+
+    Returns:
+        The MATCH expression, or None if no term is long enough to search
+    """
+    terms = [term for term in query.split() if len(term) >= MIN_QUERY_LENGTH]
+    if not terms:
+        return None
+    return ' AND '.join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def highlight_snippet(snippet):
+    """snippet() の結果をHTMLエスケープし、一致箇所の目印を <mark> に置き換えます。"""
+    escaped = html.escape(snippet or '')
+    return escaped.replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+
+
+def search_pages(query, limit=20, offset=0):
+    """全文検索を実行し、関連度順にページ単位の結果を返します。
+
+    Returns:
+        Tuple of (results, has_next). Each result has book_id, title,
+        page_num, snippet (HTML-escaped page text with the matches wrapped
+        in <mark>) and score.
+    """
+    match = build_match_query(query)
+    if match is None:
+        return [], False
+
+    rows = db.session.execute(text(
+        f"SELECT {SEARCH_TABLE}.book_id, {SEARCH_TABLE}.page_num, book.title, "
+        f"snippet({SEARCH_TABLE}, 0, :mark_start, :mark_end, '…', {SNIPPET_TOKENS}) AS snippet, "
+        f"bm25({SEARCH_TABLE}) AS score "
+        f"FROM {SEARCH_TABLE} JOIN book ON book.id = {SEARCH_TABLE}.book_id "
+        f"WHERE {SEARCH_TABLE} MATCH :match "
+        "ORDER BY score LIMIT :limit OFFSET :offset"
+    ), {'match': match, 'mark_start': _MARK_START, 'mark_end': _MARK_END,
+        'limit': limit + 1, 'offset': offset}).all()
+
+    results = [{
+        'book_id': row.book_id,
+        'title': row.title,
+        'page_num': row.page_num,
+        'snippet': highlight_snippet(row.snippet),
+        'score': round(-row.score, 4),
+    } for row in rows[:limit]]
+    return results, len(rows) > limit
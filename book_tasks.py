@@ -0,0 +1,120 @@
+"""
+Background Book Tasks
+
+A single background worker thread that runs long per-book jobs (such as
+pre-rendering pages into the page cache) off the request path, with
+progress reporting and cancellation.
+"""
+
+import queue
+import threading
+from datetime import datetime
+
+
+class BookTask:
+    """1件のバックグラウンドジョブの状態。"""
+
+    def __init__(self, kind, book_id, fn, args):
+        self.kind = kind
+        self.book_id = book_id
+        self.fn = fn
+        self.args = args
+        self.status = 'queued'  # queued / running / completed / cancelled / failed
+        self.total = 0
+        self.done = 0
+        self.error = None
+        self.created_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        self._cancel_event.set()
+        if self.status == 'queued':
+            self.status = 'cancelled'
+            self.finished_at = datetime.utcnow()
+
+    def to_dict(self):
+        return {
+            'book_id': self.book_id,
+            'kind': self.kind,
+            'status': self.status,
+            'total': self.total,
+            'done': self.done,
+            'progress_rate': round((self.done / self.total * 100) if self.total > 0 else 0, 1),
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class BookTaskQueue:
+    """書籍ごとのバックグラウンドジョブを1スレッドで順番に実行するキュー。
+
+    Only the latest task per (kind, book_id) is kept: submitting a new one
+    cancels the previous task, so replacing a PDF restarts its jobs.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._queue = queue.Queue()
+        self._tasks = {}  # (kind, book_id) -> BookTask
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def init_app(self, app):
+        """ジョブ実行時に使用するFlaskアプリを登録します。"""
+        self.app = app
+
+    def submit(self, kind, book_id, fn, *args):
+        """ジョブを登録します。fn(task, *args) がワーカースレッドで実行されます。"""
+        task = BookTask(kind, book_id, fn, args)
+        with self._lock:
+            previous = self._tasks.get((kind, book_id))
+            if previous is not None:
+                previous.cancel()
+            self._tasks[(kind, book_id)] = task
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='book-tasks', daemon=True)
+                self._thread.start()
+        self._queue.put(task)
+        return task
+
+    def cancel(self, book_id, kind=None):
+        """書籍のジョブをキャンセルします（書籍の削除・PDF差し替え時）。"""
+        with self._lock:
+            tasks = [t for (k, b), t in self._tasks.items() if b == book_id and (kind is None or k == kind)]
+        for task in tasks:
+            task.cancel()
+        return tasks
+
+    def get(self, book_id, kind):
+        """最新のジョブを返します。無ければ None。"""
+        with self._lock:
+            return self._tasks.get((kind, book_id))
+
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            if task.cancelled:
+                continue
+
+            task.status = 'running'
+            task.started_at = datetime.utcnow()
+            try:
+                with self.app.app_context():
+                    task.fn(task, *task.args)
+                task.status = 'cancelled' if task.cancelled else 'completed'
+            except Exception as e:
+                task.status = 'failed'
+                task.error = str(e)
+                print(f"[WARNING] Book task {task.kind} failed for book {task.book_id}: {e}")
+            task.finished_at = datetime.utcnow()
+
+
+book_tasks = BookTaskQueue()
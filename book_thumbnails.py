@@ -0,0 +1,154 @@
+"""
+Book Thumbnail Sprite Sheets
+
+Low-resolution thumbnails of every page of a book, packed into a few
+sprite-sheet JPEGs plus a JSON index of offsets. Generated once per PDF
+version and cached on disk, so the reader's navigation grid costs one or
+two requests instead of a full render per page.
+"""
+
+import io
+import json
+import os
+import shutil
+import threading
+import weakref
+from collections import deque
+
+from PIL import Image
+
+THUMB_WIDTH = 96  # サムネイルの幅（px）
+SHEET_COLUMNS = 20
+SHEET_ROWS = 20  # 1シートあたり最大400ページ
+SHEET_QUALITY = 80
+
+# 生成中の書籍のロックのみ保持（使い終わったロックは自動的に削除される）
+_locks = weakref.WeakValueDictionary()
+_locks_guard = threading.Lock()
+
+
+def _book_lock(book_id):
+    with _locks_guard:
+        lock = _locks.get(book_id)
+        if lock is None:
+            lock = _locks[book_id] = threading.Lock()
+        return lock
+
+
+def thumbnail_dir(folder, book_id, version):
+    return os.path.join(folder, str(book_id), version)
+
+
+def load_index(folder, book_id, version):
+    """生成済みのインデックスを読み込みます。無ければ None。"""
+    try:
+        with open(os.path.join(thumbnail_dir(folder, book_id, version), 'index.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def remove_thumbnails(folder, book_id):
+    """書籍のスプライトシートを全て削除します（PDF差し替え・書籍削除時）。"""
+    shutil.rmtree(os.path.join(folder, str(book_id)), ignore_errors=True)
+
+
+def build_sprite_sheets(folder, book_id, version, pdf_path, page_rects, render_pool):
+    """全ページのサムネイルを描画し、スプライトシートとインデックスを保存します。
+
+    Args:
+        page_rects: Page rectangles (fitz.Rect) in page order
+        render_pool: RenderPool used to rasterize the thumbnails
+
+    Returns:
+        The index dict (also written to index.json)
+    """
+    with _book_lock(book_id):
+        index = load_index(folder, book_id, version)
+        if index is not None:
+            return index
+
+        zooms = [THUMB_WIDTH / rect.width if rect.width else 1 for rect in page_rects]
+        heights = [max(1, int(round(rect.height * zoom))) for rect, zoom in zip(page_rects, zooms)]
+        cell_height = min(max(heights, default=THUMB_WIDTH), THUMB_WIDTH * 2)
+
+        out_dir = thumbnail_dir(folder, book_id, version)
+        tmp_dir = os.path.join(folder, f".{book_id}-{version}-{threading.get_ident()}.tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        try:
+            index = _render_sheets(tmp_dir, book_id, version, pdf_path, zooms, cell_height, render_pool)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        # 古いバージョンを削除してから差し替える
+        remove_thumbnails(folder, book_id)
+        os.makedirs(os.path.dirname(out_dir), exist_ok=True)
+        os.replace(tmp_dir, out_dir)
+        return index
+
+
+def _render_sheets(out_dir, book_id, version, pdf_path, zooms, cell_height, render_pool):
+    """サムネイルを描画してシートに詰め、out_dir に書き出します。"""
+    per_sheet = SHEET_COLUMNS * SHEET_ROWS
+    sheet_count = -(-len(zooms) // per_sheet)
+    pages = []
+    sheets = []
+    window = max(2, render_pool.workers * 2)
+    for sheet_num in range(sheet_count):
+        first = sheet_num * per_sheet
+        last = min(first + per_sheet, len(zooms))
+        rows = -(-(last - first) // SHEET_COLUMNS)
+        columns = min(SHEET_COLUMNS, last - first)
+        sheet = Image.new('RGB', (columns * THUMB_WIDTH, rows * cell_height), 'white')
+
+        pending = deque()
+        for page_num in range(first, last + 1):
+            if page_num < last:
+                pending.append((page_num, render_pool.submit_pixels(pdf_path, page_num, zooms[page_num])))
+            while pending and (len(pending) >= window or page_num == last):
+                done_num, future = pending.popleft()
+                data, (width, height) = future.result()
+                thumb = Image.frombuffer('RGB', (width, height), data, 'raw', 'RGB', 0, 1)
+                if height > cell_height:
+                    thumb = thumb.crop((0, 0, width, cell_height))
+                    height = cell_height
+                slot = done_num - first
+                x = (slot % SHEET_COLUMNS) * THUMB_WIDTH
+                y = (slot // SHEET_COLUMNS) * cell_height
+                sheet.paste(thumb, (x, y))
+                pages.append({
+                    'page_num': done_num,
+                    'sheet': sheet_num,
+                    'x': x,
+                    'y': y,
+                    'width': width,
+                    'height': height,
+                })
+
+        output = io.BytesIO()
+        sheet.save(output, format='JPEG', quality=SHEET_QUALITY, optimize=True)
+        with open(os.path.join(out_dir, f'sheet_{sheet_num}.jpg'), 'wb') as f:
+            f.write(output.getvalue())
+        sheets.append({
+            'sheet': sheet_num,
+            'width': sheet.width,
+            'height': sheet.height,
+            'first_page': first,
+            'last_page': last - 1,
+        })
+
+    index = {
+        'book_id': book_id,
+        'version': version,
+        'total_pages': len(zooms),
+        'thumb_width': THUMB_WIDTH,
+        'cell_height': cell_height,
+        'columns': SHEET_COLUMNS,
+        'sheets': sheets,
+        'pages': pages,
+    }
+    with open(os.path.join(out_dir, 'index.json'), 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+    return index
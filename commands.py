@@ -0,0 +1,160 @@
+"""
+Maintenance Commands
+
+Flask CLI commands for one-off data maintenance, run with
+``flask --app app <command>``.
+"""
+
+import os
+
+import click
+
+from models import db, Book, User, YouTubePlaylist
+
+
+def register_commands(app):
+    """FlaskアプリにCLIコマンドを登録します。"""
+
+    @app.cli.command('db-upgrade')
+    def db_upgrade():
+        """Bring an existing database up to the current schema (columns, data migrations, indexes)."""
+        from migrations import upgrade_schema
+
+        result = upgrade_schema()
+        if not any(result.values()):
+            click.echo("✅ Database is up to date")
+
+    @app.cli.command('rebuild-daily-stats')
+    def rebuild_daily_stats_command():
+        """Regenerate the DailyStats rollup from all records."""
+        from daily_stats import rebuild_daily_stats
+
+        rows = rebuild_daily_stats()
+        click.echo(f"✅ Rebuilt daily stats ({rows} rows)")
+
+    @app.cli.command('reconcile-xp')
+    @click.option('--dry-run', is_flag=True, help='Only report the drift, do not update total_xp.')
+    def reconcile_xp(dry_run):
+        """Recompute each user's total XP from the sum of their records."""
+        from user_xp import reconcile_user_xp
+
+        drifted = 0
+        for user in User.query.order_by(User.id).all():
+            stored, recomputed = reconcile_user_xp(user.id, apply=not dry_run)
+            drift = stored - recomputed
+            if not drift:
+                continue
+            drifted += 1
+            if dry_run:
+                click.echo(f"⚠️ {user.username}: total_xp drift: stored {stored:,}, records {recomputed:,} ({drift:+,})")
+            else:
+                click.echo(f"✅ {user.username}: total_xp corrected: {stored:,} -> {recomputed:,} ({drift:+,})")
+        if not drifted:
+            click.echo("✅ total_xp is consistent for all users")
+
+    @app.cli.command('create-user')
+    @click.argument('username')
+    @click.option('--password', prompt=True, hide_input=True, confirmation_prompt=True)
+    @click.option('--admin', is_flag=True, help='Allow resetting the shared library (books and links).')
+    @click.option('--display-name', help='Name shown on the dashboard (default: the username).')
+    def create_user_command(username, password, admin, display_name):
+        """Create a login user (e.g. one per student)."""
+        from accounts import create_user
+
+        if User.query.filter_by(username=username).first():
+            click.echo(f"⚠️ User {username} already exists")
+            return
+        user = create_user(username, password, is_admin=admin, display_name=display_name)
+        db.session.commit()
+        click.echo(f"✅ Created user {username} (id {user.id})")
+
+    @app.cli.command('refresh-playlists')
+    @click.option('--all', 'refresh_all', is_flag=True, help='Refresh every playlist, not only stale ones.')
+    @click.option('--id', 'playlist_ids', type=int, multiple=True, help='Refresh only this playlist (repeatable).')
+    def refresh_playlists(refresh_all, playlist_ids):
+        """Refresh the stored video lists of stale playlists through the refresh scheduler."""
+        from api_routes import playlist_needs_refresh, start_playlist_refresh
+
+        query = YouTubePlaylist.query.order_by(YouTubePlaylist.id)
+        if playlist_ids:
+            query = query.filter(YouTubePlaylist.id.in_(playlist_ids))
+        playlists = query.all()
+        if not (refresh_all or playlist_ids):
+            playlists = [p for p in playlists if playlist_needs_refresh(p)]
+        if not playlists:
+            click.echo("✅ All playlists are up to date")
+            return
+
+        # 同じスケジューラ（ワーカー数・呼び出し間隔・リトライ）で実行し、完了を待つ
+        jobs = [(p, start_playlist_refresh(p.id, force=True)) for p in playlists]
+        refreshed = failed = 0
+        for playlist, job in jobs:
+            job.wait()
+            if job.status == 'completed':
+                refreshed += 1
+                click.echo(f"Playlist {playlist.id}: {job.result['video_count']} videos")
+            else:
+                failed += 1
+                click.echo(f"⚠️ Playlist {playlist.id}: failed after {job.attempts} attempt(s): {job.error}")
+
+        click.echo(f"✅ Refreshed {refreshed} playlist(s), {failed} failed")
+
+    @app.cli.command('backfill-book-metadata')
+    @click.option('--force', is_flag=True, help='Re-read books that already have metadata.')
+    def backfill_book_metadata(force):
+        """Store page count, page sizes and outline for existing books."""
+        from api_routes import get_book_pdf_path, store_book_metadata
+
+        query = Book.query.order_by(Book.id)
+        if not force:
+            query = query.filter(Book.page_count.is_(None))
+
+        updated = failed = 0
+        for book in query.all():
+            pdf_path = get_book_pdf_path(book)
+            if not pdf_path or not os.path.exists(pdf_path):
+                click.echo(f"⚠️ Book {book.id}: PDF file not found ({book.pdf_file_path})")
+                failed += 1
+                continue
+            try:
+                store_book_metadata(book, pdf_path)
+                db.session.commit()
+                updated += 1
+            except Exception as e:
+                db.session.rollback()
+                click.echo(f"⚠️ Book {book.id}: failed to read PDF: {e}")
+                failed += 1
+
+        click.echo(f"✅ Updated metadata for {updated} book(s), {failed} failed")
+
+    @app.cli.command('index-book-text')
+    @click.option('--force', is_flag=True, help='Re-index books that are already indexed.')
+    def index_book_text_command(force):
+        """Build the full-text search index for existing books."""
+        from api_routes import get_book_pdf_path
+        from book_search import index_book_text
+        from book_tasks import BookTask
+
+        query = Book.query.order_by(Book.id)
+        if not force:
+            query = query.filter(Book.text_indexed_at.is_(None))
+
+        indexed = failed = 0
+        for book in query.all():
+            book_id = book.id
+            pdf_path = get_book_pdf_path(book)
+            if not pdf_path or not os.path.exists(pdf_path):
+                click.echo(f"⚠️ Book {book_id}: PDF file not found ({book.pdf_file_path})")
+                failed += 1
+                continue
+            task = BookTask('text_index', book_id, index_book_text, ())
+            try:
+                index_book_text(task, book_id, pdf_path)
+                indexed += 1
+                click.echo(f"Book {book_id}: {task.total} pages")
+            except Exception as e:
+                db.session.rollback()
+                click.echo(f"⚠️ Book {book_id}: failed to index text: {e}")
+                failed += 1
+
+        click.echo(f"✅ Indexed {indexed} book(s), {failed} failed")
@@ -0,0 +1,101 @@
+"""
+Daily Statistics Rollup
+
+Keeps the DailyStats table in step with Record. Callers apply each added
+or deleted record in the same session/transaction as the record itself,
+so the rollup is never out of date after a commit. rebuild_daily_stats()
+regenerates the whole table from Record.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import func, cast, Integer, delete, insert, literal
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db, Record, DailyStats
+
+
+KEY_COLUMNS = ('user_id', 'day', 'hour', 'type', 'subtype', 'evaluation')
+
+
+def rollup_key(user_id, date, type, subtype, evaluation):
+    """記録の属性から日別集計のキーを作成します。"""
+    return (user_id, date.date(), date.hour, type, subtype or '', evaluation or '')
+
+
+def apply_totals(totals):
+    """キーごとの増分 {key: [xp, minutes, count]} を日別集計に加算します。
+
+    All keys are upserted with one executemany statement; rows whose count
+    drops to zero are removed. The commit is left to the caller.
+    """
+    if not totals:
+        return
+    params = [
+        dict(zip(KEY_COLUMNS, key), xp_sum=xp, minutes_sum=minutes, record_count=count)
+        for key, (xp, minutes, count) in totals.items()
+    ]
+    stmt = sqlite_insert(DailyStats)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(KEY_COLUMNS),
+        set_={
+            'xp_sum': DailyStats.xp_sum + stmt.excluded.xp_sum,
+            'minutes_sum': DailyStats.minutes_sum + stmt.excluded.minutes_sum,
+            'record_count': DailyStats.record_count + stmt.excluded.record_count,
+        }
+    )
+    db.session.execute(stmt, params)
+
+    decreased_users = {key[0] for key, (_, _, count) in totals.items() if count < 0}
+    if decreased_users:
+        db.session.execute(delete(DailyStats).where(
+            DailyStats.user_id.in_(decreased_users),
+            DailyStats.record_count <= 0
+        ))
+
+
+def apply_record(record, sign=1):
+    """記録1件分を日別集計に加算（sign=-1 で減算）します。コミットは呼び出し側で行います。"""
+    if record.date is None:
+        record.date = datetime.utcnow()
+    key = rollup_key(record.user_id, record.date, record.type, record.subtype, record.evaluation)
+    apply_totals({key: [sign * (record.xp_gained or 0), sign * (record.duration_minutes or 0), sign]})
+
+
+def clear_daily_stats(user_id=None):
+    """日別集計を削除します（user_id 指定時はそのユーザー分のみ。全データリセット時）。"""
+    stmt = delete(DailyStats)
+    if user_id is not None:
+        stmt = stmt.where(DailyStats.user_id == user_id)
+    db.session.execute(stmt)
+
+
+def rebuild_daily_stats(user_id=None):
+    """Record テーブルから日別集計を作り直します（user_id 指定時はそのユーザー分のみ）。
+
+    Returns:
+        Number of DailyStats rows written
+    """
+    day = func.date(Record.date)
+    hour = cast(func.strftime('%H', Record.date), Integer)
+    subtype = func.coalesce(Record.subtype, literal(''))
+    evaluation = func.coalesce(Record.evaluation, literal(''))
+    rollup = db.session.query(
+        Record.user_id, day, hour, Record.type, subtype, evaluation,
+        func.coalesce(func.sum(Record.xp_gained), 0),
+        func.coalesce(func.sum(Record.duration_minutes), 0),
+        func.count(Record.id),
+    ).filter(Record.date.isnot(None)).group_by(Record.user_id, day, hour, Record.type, subtype, evaluation)
+    if user_id is not None:
+        rollup = rollup.filter(Record.user_id == user_id)
+
+    clear_daily_stats(user_id)
+    db.session.execute(insert(DailyStats).from_select(
+        [*KEY_COLUMNS, 'xp_sum', 'minutes_sum', 'record_count'],
+        rollup
+    ))
+    db.session.commit()
+    count = db.session.query(func.count(DailyStats.id))
+    if user_id is not None:
+        count = count.filter(DailyStats.user_id == user_id)
+    return count.scalar()
@@ -0,0 +1,138 @@
+"""
+PDF Document Pool
+
+Bounded, thread-safe LRU of open PyMuPDF documents shared by the book
+reader endpoints, so a PDF's xref and page tree are parsed once per
+reading session instead of once per request.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import fitz
+
+
+class _PooledDocument:
+    """プール内の1ドキュメント。利用中は lock を保持します。"""
+
+    __slots__ = ('path', 'doc', 'lock', 'users', 'retired')
+
+    def __init__(self, path, doc):
+        self.path = path
+        self.doc = doc
+        self.lock = threading.Lock()  # fitz.Document はスレッドセーフではないため利用を直列化
+        self.users = 0
+        self.retired = False
+
+
+class DocumentPool:
+    """開いた fitz.Document を (パス, 更新日時) 単位で保持するLRUプール。"""
+
+    def __init__(self, max_documents=8):
+        self.max_documents = max_documents
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (path, mtime_ns) -> _PooledDocument
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def init_app(self, app):
+        """Flaskアプリの設定からプールサイズを読み込みます。"""
+        self.max_documents = app.config.setdefault('PDF_DOCUMENT_POOL_SIZE', self.max_documents)
+
+    @contextmanager
+    def open(self, path):
+        """PDFを開いて返すコンテキストマネージャ。
+
+        The document stays open in the pool after the block exits and must
+        not be closed by the caller. A replaced file (new mtime) gets a
+        fresh entry; the stale one ages out of the LRU.
+        """
+        path = os.path.abspath(path)
+        key = (path, os.stat(path).st_mtime_ns)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry.users += 1
+                self.hits += 1
+
+        if entry is None:
+            doc = fitz.open(path)
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    # 他スレッドが先に開いた場合はそちらを使う
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                else:
+                    entry = _PooledDocument(path, doc)
+                    self._entries[key] = entry
+                    self.misses += 1
+                    doc = None
+                entry.users += 1
+                self._evict()
+            if doc is not None:
+                doc.close()
+
+        try:
+            with entry.lock:
+                yield entry.doc
+        finally:
+            with self._lock:
+                entry.users -= 1
+                if entry.retired and entry.users == 0:
+                    self._close(entry)
+
+    def invalidate(self, path):
+        """指定パスのドキュメントを閉じます（PDF差し替え・書籍削除時）。"""
+        path = os.path.abspath(path)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == path]:
+                self._retire(self._entries.pop(key))
+
+    def clear(self):
+        """全てのドキュメントを閉じます。"""
+        with self._lock:
+            while self._entries:
+                _, entry = self._entries.popitem(last=False)
+                self._retire(entry)
+
+    def stats(self):
+        """ヒット/ミス数とプールの使用状況を返します。"""
+        with self._lock:
+            return {
+                'open_documents': len(self._entries),
+                'max_documents': self.max_documents,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    # --- 内部処理（ロック取得済みで呼び出すこと） ---
+
+    def _evict(self):
+        while len(self._entries) > self.max_documents:
+            _, entry = self._entries.popitem(last=False)
+            self.evictions += 1
+            self._retire(entry)
+
+    def _retire(self, entry):
+        entry.retired = True
+        if entry.users == 0:
+            self._close(entry)
+
+    @staticmethod
+    def _close(entry):
+        if entry.doc is not None:
+            try:
+                entry.doc.close()
+            except Exception as e:
+                print(f"[WARNING] Failed to close PDF {entry.path}: {e}")
+            entry.doc = None
+
+
+document_pool = DocumentPool()
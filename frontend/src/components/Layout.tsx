@@ -10,9 +10,11 @@ import {
   Menu,
   Youtube,
   Timer,
+  LogOut,
 } from 'lucide-react'
-import { getStatus } from '../services/api'
-import type { UserStatus } from '../types'
+import { getStatus, getCurrentAccount, logout } from '../services/api'
+import type { UserStatus, CurrentAccount } from '../types'
+import LoginForm from './LoginForm'
 
 const navItems = [
   { to: '/', icon: Home, label: 'ダッシュボード' },
@@ -28,12 +30,24 @@ const navItems = [
 export default function Layout() {
   const [sidebarOpen, setSidebarOpen] = useState(false)
   const [status, setStatus] = useState<UserStatus | null>(null)
+  const [account, setAccount] = useState<CurrentAccount | null>(null)
   const location = useLocation()
 
   useEffect(() => {
-    getStatus().then((res) => setStatus(res.data))
+    getCurrentAccount().then((res) => {
+      setAccount(res.data)
+      // ログインが必要な場合はログイン後に取得する
+      if (res.data.user || !res.data.require_login) {
+        getStatus().then((res) => setStatus(res.data))
+      }
+    })
   }, [])
 
+  const handleLogout = async () => {
+    await logout()
+    window.location.reload()
+  }
+
   // 本棚がアクティブかどうかを判定（/resourcesまたは/book/:bookIdの時）
   const isResourcesActive = location.pathname === '/resources' || location.pathname.startsWith('/book/')
   // YouTubeがアクティブかどうかを判定（/youtubeまたは/youtube/:playlistIdの時）
@@ -48,6 +62,15 @@ export default function Layout() {
       )
     : 0
 
+  if (!account) {
+    return null
+  }
+
+  if (account.require_login && !account.user) {
+    // ログイン後は各ページのデータを取り直すため再読み込みする
+    return <LoginForm onLogin={() => window.location.reload()} />
+  }
+
   return (
     <div className="min-h-screen bg-gradient-to-br from-gray-50 to-gray-100">
       {/* Fixed Header with Toggle Button */}
@@ -165,6 +188,15 @@ export default function Layout() {
 
           {/* Footer */}
           <div className="p-4 border-t">
+            {account.user && (
+              <button
+                onClick={handleLogout}
+                className="w-full flex items-center justify-center gap-2 mb-3 px-4 py-2 rounded-xl text-sm text-gray-600 hover:bg-gray-100"
+              >
+                <LogOut className="w-4 h-4" />
+                ログアウト（{account.user.username}）
+              </button>
+            )}
             <p className="text-xs text-center text-gray-400">
               © 2025 Art Learning XP System
             </p>
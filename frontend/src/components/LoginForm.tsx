@@ -0,0 +1,63 @@
+import { useState, FormEvent } from 'react'
+import { login } from '../services/api'
+import Button from './Button'
+
+interface LoginFormProps {
+  onLogin: () => void
+}
+
+export default function LoginForm({ onLogin }: LoginFormProps) {
+  const [username, setUsername] = useState('')
+  const [password, setPassword] = useState('')
+  const [remember, setRemember] = useState(true)
+  const [error, setError] = useState('')
+  const [submitting, setSubmitting] = useState(false)
+
+  const handleSubmit = async (e: FormEvent) => {
+    e.preventDefault()
+    setSubmitting(true)
+    setError('')
+    try {
+      await login(username, password, remember)
+      onLogin()
+    } catch {
+      setError('ユーザー名またはパスワードが正しくありません。')
+    } finally {
+      setSubmitting(false)
+    }
+  }
+
+  return (
+    <div className="min-h-screen flex items-center justify-center bg-gradient-to-br from-gray-50 to-gray-100 p-4">
+      <form onSubmit={handleSubmit} className="w-full max-w-sm bg-white rounded-2xl shadow-lg p-6 space-y-4">
+        <h1 className="text-xl font-bold gradient-text text-center">Art Learning XP</h1>
+        <input
+          type="text"
+          value={username}
+          onChange={(e) => setUsername(e.target.value)}
+          placeholder="ユーザー名"
+          autoComplete="username"
+          className="w-full px-4 py-2.5 border border-gray-300 rounded-xl focus:outline-none focus:ring-2 focus:ring-blue-500"
+          required
+        />
+        <input
+          type="password"
+          value={password}
+          onChange={(e) => setPassword(e.target.value)}
+          placeholder="パスワード"
+          autoComplete="current-password"
+          className="w-full px-4 py-2.5 border border-gray-300 rounded-xl focus:outline-none focus:ring-2 focus:ring-blue-500"
+          required
+        />
+        <label className="flex items-center gap-2 text-sm text-gray-600">
+          <input type="checkbox" checked={remember} onChange={(e) => setRemember(e.target.checked)} />
+          ログイン状態を保持する
+        </label>
+        {error && <p className="text-sm text-red-500">{error}</p>}
+        <Button type="submit" fullWidth disabled={submitting}>
+          ログイン
+        </Button>
+      </form>
+    </div>
+  )
+}
@@ -1,24 +1,56 @@
 import { useState, useEffect } from 'react'
 import { Archive as ArchiveIcon, Calendar, Clock, Palette, Award, ChevronDown } from 'lucide-react'
-import { getArchive } from '../services/api'
-import type { Record, ArchiveData } from '../types'
+import Button from '../components/Button'
+import { getArchiveYears, getArchiveYear } from '../services/api'
+import type { Record, ArchiveYears } from '../types'
 
 export default function Archive() {
-  const [archiveData, setArchiveData] = useState<ArchiveData | null>(null)
+  const [archiveYears, setArchiveYears] = useState<ArchiveYears | null>(null)
   const [selectedYear, setSelectedYear] = useState<string | null>(null)
+  const [currentRecords, setCurrentRecords] = useState<Record[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
   const [loading, setLoading] = useState(true)
+  const [loadingMore, setLoadingMore] = useState(false)
 
   useEffect(() => {
-    getArchive().then((res) => {
-      setArchiveData(res.data)
+    // 年ごとの件数と合計だけを取得し、記録は選択した年をページ単位で読み込む
+    getArchiveYears().then((res) => {
+      setArchiveYears(res.data)
       if (res.data.sorted_years.length > 0) {
         setSelectedYear(res.data.sorted_years[0])
+      } else {
+        setLoading(false)
       }
-      setLoading(false)
     })
   }, [])
 
-  if (loading) {
+  useEffect(() => {
+    if (!selectedYear) return
+    let cancelled = false
+    setLoading(true)
+    getArchiveYear(selectedYear).then((res) => {
+      if (cancelled) return
+      setCurrentRecords(res.data.data)
+      setNextCursor(res.data.next_cursor)
+      setLoading(false)
+    })
+    return () => {
+      cancelled = true
+    }
+  }, [selectedYear])
+
+  const loadMore = () => {
+    if (!selectedYear || !nextCursor) return
+    setLoadingMore(true)
+    getArchiveYear(selectedYear, nextCursor)
+      .then((res) => {
+        setCurrentRecords((records) => [...records, ...res.data.data])
+        setNextCursor(res.data.next_cursor)
+      })
+      .finally(() => setLoadingMore(false))
+  }
+
+  if (loading && !archiveYears) {
     return (
       <div className="flex items-center justify-center min-h-[60vh]">
         <div className="animate-spin w-12 h-12 border-4 border-primary-500 border-t-transparent rounded-full" />
@@ -52,9 +84,7 @@ export default function Archive() {
     }
   }
 
-  const currentRecords: Record[] = selectedYear && archiveData
-    ? archiveData.archive_data[selectedYear] || []
-    : []
+  const summary = selectedYear && archiveYears ? archiveYears.year_summary[selectedYear] : undefined
 
   return (
     <div className="space-y-8">
@@ -71,14 +101,14 @@ export default function Archive() {
         </div>
 
         {/* Year Selector */}
-        {archiveData && archiveData.sorted_years.length > 0 && (
+        {archiveYears && archiveYears.sorted_years.length > 0 && (
           <div className="relative">
             <select
               value={selectedYear || ''}
               onChange={(e) => setSelectedYear(e.target.value)}
               className="appearance-none bg-white border border-gray-200 rounded-xl px-4 py-2 pr-10 focus:ring-2 focus:ring-primary-500 focus:border-transparent text-sm sm:text-base"
             >
-              {archiveData.sorted_years.map((year) => (
+              {archiveYears.sorted_years.map((year) => (
                 <option key={year} value={year}>
                   {year}年
                 </option>
@@ -90,28 +120,28 @@ export default function Archive() {
       </div>
 
       {/* Summary Stats */}
-      {currentRecords.length > 0 && (
+      {summary && summary.count > 0 && (
         <div className="grid grid-cols-2 sm:grid-cols-4 gap-3 sm:gap-4">
           <div className="bg-white rounded-xl p-3 sm:p-4 shadow-sm">
             <p className="text-gray-500 text-xs sm:text-sm">総記録数</p>
-            <p className="text-xl sm:text-2xl font-bold text-gray-800">{currentRecords.length}</p>
+            <p className="text-xl sm:text-2xl font-bold text-gray-800">{summary.count}</p>
           </div>
           <div className="bg-white rounded-xl p-3 sm:p-4 shadow-sm">
             <p className="text-gray-500 text-xs sm:text-sm">獲得XP</p>
             <p className="text-xl sm:text-2xl font-bold text-primary-600">
-              {currentRecords.reduce((sum, r) => sum + r.xp_gained, 0).toLocaleString()}
+              {summary.xp_gained.toLocaleString()}
             </p>
           </div>
           <div className="bg-white rounded-xl p-3 sm:p-4 shadow-sm">
             <p className="text-gray-500 text-xs sm:text-sm">時間学習</p>
             <p className="text-xl sm:text-2xl font-bold text-blue-600">
-              {currentRecords.filter((r) => r.type === '時間学習').length}
+              {summary.time_count}
             </p>
           </div>
           <div className="bg-white rounded-xl p-3 sm:p-4 shadow-sm">
             <p className="text-gray-500 text-xs sm:text-sm">作品</p>
             <p className="text-xl sm:text-2xl font-bold text-purple-600">
-              {currentRecords.filter((r) => r.type !== '時間学習').length}
+              {summary.count - summary.time_count}
             </p>
           </div>
         </div>
@@ -186,6 +216,17 @@ export default function Archive() {
                 </div>
               </div>
             ))}
+            {nextCursor && (
+              <div className="p-4 flex justify-center">
+                <Button variant="ghost" size="sm" onClick={loadMore} disabled={loadingMore}>
+                  {loadingMore ? '読み込み中...' : 'さらに表示'}
+                </Button>
+              </div>
+            )}
+          </div>
+        ) : loading ? (
+          <div className="py-16 flex justify-center">
+            <div className="animate-spin w-8 h-8 border-4 border-primary-500 border-t-transparent rounded-full" />
           </div>
         ) : (
           <div className="py-16 text-center">
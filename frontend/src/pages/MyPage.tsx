@@ -1,28 +1,47 @@
 import { useState, useEffect } from 'react'
 import { User, Image, ExternalLink, Award } from 'lucide-react'
-import { getStatus, getWorks, getPixivTopics } from '../services/api'
-import type { UserStatus, Record, PixivTopic } from '../types'
+import { getStatus, getWorksPage, getPixivTopics } from '../services/api'
+import type { UserStatus, Record, PixivTopic, WorksSummary } from '../types'
 import XPProgressCard from '../components/XPProgressCard'
+import Button from '../components/Button'
 
 export default function MyPage() {
   const [status, setStatus] = useState<UserStatus | null>(null)
   const [works, setWorks] = useState<Record[]>([])
+  const [worksSummary, setWorksSummary] = useState<WorksSummary>({ count: 0, a_count: 0, xp_gained: 0 })
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [pixivTopics, setPixivTopics] = useState<PixivTopic[]>([])
   const [loading, setLoading] = useState(true)
 
   useEffect(() => {
     Promise.all([
       getStatus(),
-      getWorks(),
+      getWorksPage(),
       getPixivTopics().catch(() => ({ data: [] })),
     ]).then(([statusRes, worksRes, pixivRes]) => {
       setStatus(statusRes.data)
-      setWorks(worksRes.data)
+      setWorks(worksRes.data.data)
+      setNextCursor(worksRes.data.next_cursor)
+      if (worksRes.data.summary) {
+        setWorksSummary(worksRes.data.summary)
+      }
       setPixivTopics(pixivRes.data)
       setLoading(false)
     })
   }, [])
 
+  const loadMoreWorks = () => {
+    if (!nextCursor) return
+    setLoadingMore(true)
+    getWorksPage(nextCursor)
+      .then((res) => {
+        setWorks((current) => [...current, ...res.data.data])
+        setNextCursor(res.data.next_cursor)
+      })
+      .finally(() => setLoadingMore(false))
+  }
+
   if (loading) {
     return (
       <div className="flex items-center justify-center min-h-[60vh]">
@@ -63,7 +82,7 @@ export default function MyPage() {
               <Image className="w-6 h-6 text-primary-500" />
               <h2 className="text-xl font-semibold text-gray-800">作品ギャラリー</h2>
               <span className="bg-primary-100 text-primary-700 text-sm px-3 py-1 rounded-full">
-                {works.length}作品
+                {worksSummary.count}作品
               </span>
             </div>
 
@@ -127,6 +146,13 @@ export default function MyPage() {
                     </div>
                   </div>
                 ))}
+                {nextCursor && (
+                  <div className="sm:col-span-2 flex justify-center">
+                    <Button variant="ghost" size="sm" onClick={loadMoreWorks} disabled={loadingMore}>
+                      {loadingMore ? '読み込み中...' : 'さらに表示'}
+                    </Button>
+                  </div>
+                )}
               </div>
             ) : (
               <div className="text-center py-12">
@@ -189,18 +215,18 @@ export default function MyPage() {
               <div className="space-y-4">
                 <div className="flex justify-between items-center">
                   <span className="text-gray-700 font-medium">総作品数</span>
-                  <span className="font-semibold text-gray-800">{works.length}</span>
+                  <span className="font-semibold text-gray-800">{worksSummary.count}</span>
                 </div>
                 <div className="flex justify-between items-center">
                   <span className="text-gray-700 font-medium">評価A作品</span>
                   <span className="font-semibold text-yellow-600">
-                    {works.filter((w) => w.evaluation === 'A').length}
+                    {worksSummary.a_count}
                   </span>
                 </div>
                 <div className="flex justify-between items-center">
                   <span className="text-gray-700 font-medium">総獲得XP</span>
                   <span className="font-semibold text-primary-600">
-                    {works.reduce((sum, w) => sum + w.xp_gained, 0).toLocaleString()}
+                    {worksSummary.xp_gained.toLocaleString()}
                   </span>
                 </div>
               </div>
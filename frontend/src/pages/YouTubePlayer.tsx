@@ -14,10 +14,17 @@ import {
   File,
   ListVideo,
 } from 'lucide-react'
-import { getPlaylist, recordVideoView, markVideoComplete } from '../services/api'
-import type { PlaylistDetail } from '../types'
+import { getPlaylist, recordVideoProgressBatch, markVideoComplete } from '../services/api'
+import type { PlaylistDetail, VideoProgressEvent } from '../types'
 import Toast from '../components/Toast'
 
+// 再生中の視聴位置を記録する間隔と、まとめて送信する間隔
+const PROGRESS_SAMPLE_MS = 10000
+const PROGRESS_SEND_MS = 60000
+// 動画一覧の更新中に完了を送った場合の再送間隔と回数
+const COMPLETE_RETRY_MS = 15000
+const COMPLETE_MAX_RETRIES = 4
+
 // YouTube IFrame API types
 interface YTPlayer {
   destroy: () => void
@@ -77,6 +84,47 @@ export default function YouTubePlayer() {
   const containerRef = useRef<HTMLDivElement>(null)
   const playlistContainerRef = useRef<HTMLDivElement>(null)
   const pendingStartTimeRef = useRef<number | null>(null)
+  const progressQueueRef = useRef<Map<string, VideoProgressEvent>>(new Map())
+
+  // 視聴進捗は動画ごとに最長の視聴時間だけを残し、まとめて送信する
+  const queueProgress = useCallback((event: VideoProgressEvent) => {
+    const key = `${event.playlist_id}/${event.video_id}`
+    const queued = progressQueueRef.current.get(key)
+    if (!queued || queued.watch_time < event.watch_time) {
+      progressQueueRef.current.set(key, event)
+    }
+  }, [])
+
+  const sendProgress = useCallback((beacon = false) => {
+    const events = Array.from(progressQueueRef.current.values())
+    progressQueueRef.current.clear()
+    if (events.length === 0) return Promise.resolve()
+    if (beacon && navigator.sendBeacon) {
+      // ページを閉じる時は送信完了を待てないため sendBeacon を使用
+      navigator.sendBeacon('/api/playlists/progress', new Blob([JSON.stringify({ events })], { type: 'application/json' }))
+      return Promise.resolve()
+    }
+    return recordVideoProgressBatch(events)
+      .then((res) => {
+        // 動画一覧の更新中で受け付けられなかった進捗は次回に再送する
+        res.data.rejected.filter((r) => r.retry).forEach((r) => queueProgress(events[r.index]))
+      })
+      .catch(() => {
+        // 送信に失敗した進捗は次回に再送する
+        events.forEach(queueProgress)
+      })
+  }, [queueProgress])
+
+  useEffect(() => {
+    const timer = setInterval(() => sendProgress(), PROGRESS_SEND_MS)
+    const handlePageHide = () => sendProgress(true)
+    window.addEventListener('pagehide', handlePageHide)
+    return () => {
+      clearInterval(timer)
+      window.removeEventListener('pagehide', handlePageHide)
+      sendProgress()
+    }
+  }, [sendProgress])
 
   // Load YouTube IFrame API
   useEffect(() => {
@@ -243,12 +291,16 @@ export default function YouTubePlayer() {
         // ユーザーが再生を開始したことを記録
         setUserInitiatedPlayback(true)
 
+        const previousInterval = (window as { _trackInterval?: NodeJS.Timeout })._trackInterval
+        if (previousInterval) {
+          clearInterval(previousInterval)
+        }
         const trackProgress = setInterval(() => {
           if (playerRef.current) {
             const currentTime = playerRef.current.getCurrentTime()
-            recordVideoView(playlist.playlist_id, currentVideo.id, Math.floor(currentTime))
+            queueProgress({ playlist_id: playlist.playlist_id, video_id: currentVideo.id, watch_time: Math.floor(currentTime) })
           }
-        }, 30000) // Every 30 seconds
+        }, PROGRESS_SAMPLE_MS)
 
         // Store interval for cleanup
         ;(window as { _trackInterval?: NodeJS.Timeout })._trackInterval = trackProgress
@@ -261,17 +313,26 @@ export default function YouTubePlayer() {
           clearInterval((window as { _trackInterval?: NodeJS.Timeout })._trackInterval)
         }
 
-        // Mark as complete
-        markVideoComplete(playlist.playlist_id, currentVideo.id).then((res) => {
-          if (res.data.success) {
-            setToast({
-              message: `動画を完了しました！ +${res.data.xp_gained} XP`,
-              type: 'success',
-            })
-            // Refresh playlist data with videos
-            getPlaylist(playlist.id, true).then((r) => setPlaylist(r.data))
-          }
-        })
+        // Mark as complete (after sending the queued progress, which the XP is based on)
+        if (playerRef.current) {
+          queueProgress({ playlist_id: playlist.playlist_id, video_id: currentVideo.id, watch_time: Math.floor(playerRef.current.getCurrentTime()) })
+        }
+        const complete = (retries: number) => {
+          markVideoComplete(playlist.playlist_id, currentVideo.id).then((res) => {
+            if (res.data.success) {
+              setToast({
+                message: `動画を完了しました！ +${res.data.xp_gained ?? 0} XP`,
+                type: 'success',
+              })
+              // Refresh playlist data with videos
+              getPlaylist(playlist.id, true).then((r) => setPlaylist(r.data))
+            } else if (res.data.pending && retries < COMPLETE_MAX_RETRIES) {
+              // 動画一覧の更新が終わってから再送する
+              setTimeout(() => complete(retries + 1), COMPLETE_RETRY_MS)
+            }
+          })
+        }
+        sendProgress().then(() => complete(0))
 
         // Auto-advance to next video - 自動再生トリガーはここのみ
         if (playlist?.videos && currentIndex < playlist.videos.length - 1) {
@@ -281,7 +342,7 @@ export default function YouTubePlayer() {
         }
       }
     },
-    [playlist, currentIndex]
+    [playlist, currentIndex, queueProgress, sendProgress]
   )
 
   const playVideo = (index: number) => {
@@ -10,8 +10,15 @@ import type {
   Constants,
   ApiResponse,
   VideoCompleteResponse,
+  VideoProgressEvent,
+  VideoProgressBatchResponse,
   LearningPatterns,
   ArchiveData,
+  ArchiveYears,
+  WorksSummary,
+  CursorPage,
+  Account,
+  CurrentAccount,
 } from '../types'
 
 const api = axios.create({
@@ -21,6 +28,12 @@ const api = axios.create({
   },
 })
 
+// Auth API
+export const login = (username: string, password: string, remember = false) =>
+  api.post<ApiResponse & { user: Account }>('/auth/login', { username, password, remember })
+export const logout = () => api.post<ApiResponse>('/auth/logout')
+export const getCurrentAccount = () => api.get<CurrentAccount>('/auth/me')
+
 // Status API
 export const getStatus = () => api.get<UserStatus>('/status')
 export const getConstants = () => api.get<Constants>('/constants')
@@ -31,6 +44,8 @@ export const resetAllData = () => api.post<ApiResponse>('/user/reset')
 // Records API
 export const getRecords = (params?: { type?: string; year?: string; limit?: number }) =>
   api.get<Record[]>('/records', { params })
+export const getRecordsPage = (params?: { type?: string; year?: string; limit?: number; cursor?: string | null }) =>
+  api.get<CursorPage<Record>>('/records', { params: { ...params, cursor: params?.cursor ?? '' } })
 
 export const getRecord = (id: number) => api.get<Record>(`/records/${id}`)
 
@@ -100,6 +115,8 @@ export const deletePlaylistMaterial = (playlistId: number, materialId: number) =
   api.delete<ApiResponse>(`/playlists/${playlistId}/materials/${materialId}`)
 export const recordVideoView = (playlistId: string, videoId: string, watchTime: number) =>
   api.post<ApiResponse>(`/playlists/${playlistId}/video/${videoId}/view`, { watch_time: watchTime })
+export const recordVideoProgressBatch = (events: VideoProgressEvent[]) =>
+  api.post<VideoProgressBatchResponse>('/playlists/progress', { events })
 export const markVideoComplete = (playlistId: string, videoId: string) =>
   api.post<VideoCompleteResponse>(`/playlists/${playlistId}/video/${videoId}/complete`)
 
@@ -108,9 +125,14 @@ export const getPixivTopics = () => api.get<PixivTopic[]>('/pixiv/topics')
 
 // Archive API
 export const getArchive = () => api.get<ArchiveData>('/archive')
+export const getArchiveYears = () => api.get<ArchiveYears>('/archive', { params: { lazy: true } })
+export const getArchiveYear = (year: string, cursor?: string | null, limit?: number) =>
+  api.get<CursorPage<Record> & { year: string }>('/archive', { params: { year, cursor: cursor ?? '', limit } })
 
 // Works API
 export const getWorks = () => api.get<Record[]>('/works')
+export const getWorksPage = (cursor?: string | null, limit?: number) =>
+  api.get<CursorPage<Record> & { summary?: WorksSummary }>('/works', { params: { cursor: cursor ?? '', limit } })
 
 // Statistics API
 export const getXpByTechnique = () => api.get<{ labels: string[]; data: number[] }>('/statistics/xp_by_technique')
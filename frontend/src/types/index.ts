@@ -98,6 +98,18 @@ export interface Constants {
   evaluations: { [key: string]: number }
 }
 
+// Accounts
+export interface Account {
+  id: number
+  username: string
+  is_admin: boolean
+}
+
+export interface CurrentAccount {
+  user: Account | null
+  require_login: boolean
+}
+
 // API Responses
 export interface ApiResponse<T = unknown> {
   success?: boolean
@@ -110,7 +122,20 @@ export interface ApiResponse<T = unknown> {
 
 export interface VideoCompleteResponse {
   success: boolean
-  xp_gained: number
+  xp_gained?: number
+  pending?: boolean  // 動画一覧の更新中（202）。しばらくしてから再送する
+}
+
+export interface VideoProgressEvent {
+  playlist_id: string
+  video_id: string
+  watch_time: number
+}
+
+export interface VideoProgressBatchResponse {
+  success: boolean
+  accepted: number
+  rejected: { index: number; error: string; retry?: boolean }[]
 }
 
 // Statistics
@@ -128,3 +153,26 @@ export interface ArchiveData {
   archive_data: { [year: string]: Record[] }
   sorted_years: string[]
 }
+
+export interface WorksSummary {
+  count: number
+  a_count: number
+  xp_gained: number
+}
+
+export interface CursorPage<T> {
+  data: T[]
+  next_cursor: string | null
+}
+
+export interface ArchiveYearSummary {
+  count: number
+  xp_gained: number
+  time_count: number
+}
+
+export interface ArchiveYears {
+  year_counts: { [year: string]: number }
+  year_summary: { [year: string]: ArchiveYearSummary }
+  sorted_years: string[]
+}
@@ -0,0 +1,252 @@
+"""
+Schema Migrations
+
+Lightweight, idempotent schema upgrades for existing SQLite databases.
+Missing tables are created, and an existing xp_system.db is brought up
+to date here, at startup and by ``flask --app app db-upgrade``:
+
+1. Columns added to a model later are appended with ALTER TABLE.
+2. Named data migrations (e.g. removing duplicates before a unique index)
+   run once each, tracked in the schema_migrations table.
+3. Indexes declared on the models that are missing are created.
+
+Every server process runs this on startup, so each step takes the SQLite
+write lock (BEGIN IMMEDIATE) and re-checks the schema inside it; workers
+that start together wait for each other instead of applying a step twice.
+"""
+
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import inspect, select, text
+from sqlalchemy.schema import CreateIndex
+
+from models import db, PlaylistVideo, VideoView
+from accounts import ensure_default_user, revoke_default_user_admin
+from book_search import create_search_table
+from daily_stats import rebuild_daily_stats
+from playlist_videos import adopt_position_views
+from storage import is_busy_error
+
+MIGRATION_LOCK_TIMEOUT = 600  # 秒（他のプロセスの移行が終わるまで待つ上限）
+MIGRATION_LOCK_RETRY_DELAY = 0.5  # 秒
+
+
+@contextmanager
+def _write_lock():
+    """データベースの書き込みロックを取得し、ブロックの終わりにコミットします。
+
+    BEGIN IMMEDIATE waits busy_timeout for the lock; while another process
+    is still migrating it is retried until MIGRATION_LOCK_TIMEOUT.
+    """
+    db.session.commit()
+    deadline = time.monotonic() + MIGRATION_LOCK_TIMEOUT
+    while True:
+        try:
+            db.session.execute(text('BEGIN IMMEDIATE'))
+            break
+        except Exception as e:
+            db.session.rollback()
+            if not is_busy_error(e) or time.monotonic() > deadline:
+                raise
+            time.sleep(MIGRATION_LOCK_RETRY_DELAY)
+    try:
+        yield
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def create_tables():
+    """モデルに定義されていて存在しないテーブルを作成します。"""
+    with _write_lock():
+        db.metadata.create_all(db.session.connection())
+
+
+def add_missing_columns():
+    """モデルに定義されていてテーブルに無いカラムを追加します。
+
+    Only nullable columns (or ones with a scalar default) can be added this
+    way; existing rows get NULL / the default.
+
+    Returns:
+        List of "table.column" names that were added
+    """
+    added = []
+    with _write_lock():
+        inspector = inspect(db.session.connection())
+        existing_tables = set(inspector.get_table_names())
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column.type.compile(db.engine.dialect)}'
+                if column.default is not None and column.default.is_scalar:
+                    ddl += f' DEFAULT {_sql_literal(column.default.arg)}'
+                db.session.execute(text(ddl))
+                added.append(f'{table.name}.{column.name}')
+    return added
+
+
+def create_missing_indexes():
+    """モデルに宣言されていて存在しないインデックスを作成します。
+
+    Returns:
+        List of index names that were created
+    """
+    created = []
+    with _write_lock():
+        inspector = inspect(db.session.connection())
+        existing_tables = set(inspector.get_table_names())
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                if index.name not in existing:
+                    db.session.execute(CreateIndex(index))
+                    created.append(index.name)
+    return created
+
+
+# --- データ移行（名前順ではなく定義順に1回ずつ実行） ---
+
+def _merge_duplicate_video_views():
+    """(playlist_id, video_index) が重複する視聴情報を1行にまとめます。
+
+    Older databases could hold several views of one playlist position;
+    once they are keyed by video id they would be one video's views and
+    conflict on uq_video_view_user_video_id. The oldest row is kept and
+    takes the combined watch count and the best progress of its duplicates.
+    """
+    duplicates = db.session.query(VideoView.playlist_id, VideoView.video_index).group_by(
+        VideoView.playlist_id, VideoView.video_index
+    ).having(db.func.count(VideoView.id) > 1).all()
+
+    for playlist_id, video_index in duplicates:
+        views = VideoView.query.filter_by(playlist_id=playlist_id, video_index=video_index).order_by(VideoView.id).all()
+        keep, extras = views[0], views[1:]
+        for view in extras:
+            keep.video_title = keep.video_title or view.video_title
+            keep.watch_count = (keep.watch_count or 0) + (view.watch_count or 0)
+            keep.watched_duration_seconds = max(keep.watched_duration_seconds or 0, view.watched_duration_seconds or 0)
+            keep.is_completed = bool(keep.is_completed or view.is_completed)
+            keep.xp_gained = max(keep.xp_gained or 0, view.xp_gained or 0)
+            keep.first_viewed = min((d for d in (keep.first_viewed, view.first_viewed) if d), default=None)
+            keep.last_viewed = max((d for d in (keep.last_viewed, view.last_viewed) if d), default=None)
+            db.session.delete(view)
+
+
+# user_id で所有者を持つテーブル
+OWNED_TABLES = ('record', 'daily_stats', 'video_view', 'playlist_view_history')
+
+
+def _assign_rows_to_default_user():
+    """所有者の無い行（単一ユーザー時代のデータ）をデフォルトユーザーに割り当てます。"""
+    user_id = ensure_default_user()
+    for table in OWNED_TABLES:
+        db.session.execute(text(f'UPDATE "{table}" SET user_id = :user_id WHERE user_id IS NULL'), {'user_id': user_id})
+
+
+def _key_video_views_by_video_id():
+    """保存済みの動画一覧がある再生リストの視聴情報を動画IDに紐づけます。
+
+    Views of playlists whose entries are stored get the video id found at
+    their position; the others are assigned when the playlist is next
+    synced.
+    """
+    for playlist_pk in db.session.execute(select(PlaylistVideo.playlist_id).distinct()).scalars().all():
+        adopt_position_views(playlist_pk)
+
+
+MIGRATIONS = [
+    ('0001_merge_duplicate_video_views', _merge_duplicate_video_views),
+    ('0002_build_daily_stats', rebuild_daily_stats),
+    ('0003_assign_rows_to_default_user', _assign_rows_to_default_user),
+    ('0004_key_video_views_by_video_id', _key_video_views_by_video_id),
+    ('0005_revoke_default_user_admin', revoke_default_user_admin),
+]
+
+
+def _ensure_migrations_table():
+    db.session.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations "
+        "(name VARCHAR(255) PRIMARY KEY, applied_at DATETIME NOT NULL)"
+    ))
+    db.session.commit()
+
+
+def applied_migrations():
+    """適用済みのデータ移行名を返します。"""
+    _ensure_migrations_table()
+    return {row[0] for row in db.session.execute(text("SELECT name FROM schema_migrations"))}
+
+
+def _is_applied(name):
+    return db.session.execute(
+        text("SELECT 1 FROM schema_migrations WHERE name = :name"), {'name': name}
+    ).first() is not None
+
+
+def run_migrations():
+    """未適用のデータ移行を順番に実行します。
+
+    Each migration runs under the write lock and is re-checked once the
+    lock is held, so a migration another process applied meanwhile is
+    skipped. Its schema_migrations row is committed with it, so a failed
+    migration is retried on the next run.
+
+    Returns:
+        List of migration names that were applied
+    """
+    applied = applied_migrations()
+    ran = []
+    for name, migrate in MIGRATIONS:
+        if name in applied:
+            continue
+        with _write_lock():
+            if _is_applied(name):
+                continue
+            migrate()
+            # rebuild_daily_stats のように途中でコミットする移行もあるため、重複しても失敗しないようにする
+            db.session.execute(
+                text("INSERT OR IGNORE INTO schema_migrations (name, applied_at) VALUES (:name, :applied_at)"),
+                {'name': name, 'applied_at': datetime.utcnow()}
+            )
+        ran.append(name)
+    return ran
+
+
+def upgrade_schema():
+    """起動時に呼び出し、既存データベースのスキーマを最新化します。
+
+    Returns:
+        Dict with the added columns, applied migrations and created indexes
+    """
+    create_tables()
+    result = {
+        'columns': add_missing_columns(),
+        'migrations': run_migrations(),
+        'indexes': create_missing_indexes(),
+    }
+    create_search_table()
+    for name in result['columns']:
+        print(f"✅ Added column: {name}")
+    for name in result['migrations']:
+        print(f"✅ Applied migration: {name}")
+    for name in result['indexes']:
+        print(f"✅ Created index: {name}")
+    return result
+
+
+def _sql_literal(value):
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
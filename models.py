@@ -4,6 +4,7 @@ Database Models for Art Learning XP System
 Data models for user status, learning records, books, resource links, and YouTube playlists.
 """
 
+import json
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -13,17 +14,38 @@ db = SQLAlchemy()
 
 
 class UserStatus(db.Model):
-    """ユーザーの全体ステータス（累計XP）を保持するテーブル。1レコードのみ存在します。"""
+    """ユーザーの全体ステータス（累計XP）を保持するテーブル。ユーザーごとに1レコード存在します。"""
+
+    __tablename__ = "user_status"
+    __table_args__ = (
+        db.Index("uq_user_status_user_id", "user_id", unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     username = db.Column(db.String(80), default="新規ユーザー", nullable=False)
     total_xp = db.Column(db.Integer, default=0, nullable=False)
 
 
+class DataVersion(db.Model):
+    """データ更新のたびに加算されるバージョン番号（統計レスポンスキャッシュの無効化用）。カウンターごとに1レコード存在します。"""
+
+    __tablename__ = "data_version"
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
+
+
 class Record(db.Model):
     """個別の学習記録を保持するテーブル。"""
 
+    __table_args__ = (
+        db.Index("ix_record_user_date", "user_id", "date"),
+        db.Index("ix_record_user_type_date", "user_id", "type", "date"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))  # 記録の所有者
 
     # 記録の基本情報
     type = db.Column(db.String(50), nullable=False)  # '時間学習' or '科目習得'
@@ -47,6 +69,34 @@ class Record(db.Model):
         return self.date.strftime("%Y")
 
 
+class DailyStats(db.Model):
+    """学習記録の日別集計（統計API用）。記録の追加・削除時に同じトランザクションで更新されます。
+
+    One row per (user, day, hour, type, subtype, evaluation), so the
+    statistics endpoints aggregate O(days) rows of one user instead of
+    every Record.
+    """
+
+    __tablename__ = "daily_stats"
+    __table_args__ = (
+        db.Index("uq_daily_stats_user_key", "user_id", "day", "hour", "type", "subtype", "evaluation", unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    day = db.Column(db.Date, nullable=False)  # 記録日（Record.date の日付部分）
+    hour = db.Column(db.Integer, nullable=False)  # 記録時刻の時（0-23）
+    type = db.Column(db.String(50), nullable=False)
+    subtype = db.Column(db.String(100), nullable=False)
+    evaluation = db.Column(db.String(1), nullable=False, default="")  # 評価なしは空文字
+    xp_sum = db.Column(db.Integer, nullable=False, default=0)
+    minutes_sum = db.Column(db.Integer, nullable=False, default=0)
+    record_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<DailyStats {self.day} {self.hour}時 {self.type}/{self.subtype}: {self.record_count}件>"
+
+
 class Book(db.Model):
     """学習用書籍を保持するテーブル。"""
 
@@ -57,10 +107,23 @@ class Book(db.Model):
     cover_image_path = db.Column(db.String(255))  # 表紙画像ファイル名
     pdf_file_path = db.Column(db.String(255), unique=True, nullable=False)  # PDFファイル名
     added_date = db.Column(db.DateTime, default=datetime.utcnow)
+    # PDFメタデータのキャッシュ（アップロード時に保存）
+    page_count = db.Column(db.Integer)  # 総ページ数
+    page_sizes = db.Column(db.Text)  # ページサイズ [[幅, 高さ], ...] のJSON（pt単位）
+    outline = db.Column(db.Text)  # 目次 [{level, title, page_num}, ...] のJSON
+    text_indexed_at = db.Column(db.DateTime)  # 全文検索の索引作成日時
 
     def __repr__(self):
         return f"<Book {self.id}: {self.title}>"
 
+    def get_page_sizes(self):
+        """ページサイズの一覧を返します。未取得の場合は空リスト。"""
+        return json.loads(self.page_sizes) if self.page_sizes else []
+
+    def get_outline(self):
+        """目次の一覧を返します。未取得の場合は空リスト。"""
+        return json.loads(self.outline) if self.outline else []
+
 
 class ResourceLink(db.Model):
     """学習用リソースリンクを保持するテーブル。"""
@@ -94,12 +157,39 @@ class YouTubePlaylist(db.Model):
         return f"<YouTubePlaylist {self.id}: {self.title}>"
 
 
+class PlaylistVideo(db.Model):
+    """再生リスト内の動画（yt-dlp で取得した一覧の保存先）。登録時・更新時に同期されます。"""
+
+    __tablename__ = "playlist_video"
+    __table_args__ = (
+        db.Index("uq_playlist_video_playlist_video", "playlist_id", "video_id", unique=True),
+        db.Index("ix_playlist_video_playlist_position", "playlist_id", "position"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    playlist_id = db.Column(db.Integer, db.ForeignKey('youtube_playlist.id'), nullable=False)
+    video_id = db.Column(db.String(32), nullable=False)  # YouTube Video ID
+    position = db.Column(db.Integer, nullable=False)  # プレイリスト内の位置（0-based）
+    title = db.Column(db.String(500))
+    duration = db.Column(db.Integer, default=0)  # 秒
+    thumbnail_url = db.Column(db.String(500))
+    channel = db.Column(db.String(255))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<PlaylistVideo playlist_id={self.playlist_id}, position={self.position}: {self.video_id}>"
+
+
 class PlaylistViewHistory(db.Model):
     """プレイリスト視聴履歴を保持するテーブル。"""
     
     __tablename__ = "playlist_view_history"
+    __table_args__ = (
+        db.Index("ix_playlist_view_history_user_playlist", "user_id", "playlist_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     playlist_id = db.Column(db.Integer, db.ForeignKey('youtube_playlist.id'), nullable=False)
     playlist = db.relationship('YouTubePlaylist', backref='view_histories')
     video_index = db.Column(db.Integer)  # プレイリスト内の動画インデックス（0-based）
@@ -113,11 +203,19 @@ class VideoView(db.Model):
     """個別動画の視聴情報を保持するテーブル。"""
     
     __tablename__ = "video_view"
+    __table_args__ = (
+        # 進捗は動画IDに紐づく。ユーザー単位の進捗集計（user_id, playlist_id）にも使用
+        db.Index("uq_video_view_user_video_id", "user_id", "playlist_id", "video_id", unique=True),
+        # 再生リスト単位の参照（同期時の旧データの特定、全ユーザーの進捗集計）
+        db.Index("ix_video_view_playlist_video_id", "playlist_id", "video_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))  # 視聴したユーザー
     playlist_id = db.Column(db.Integer, db.ForeignKey('youtube_playlist.id'), nullable=False)
     playlist = db.relationship('YouTubePlaylist', backref='video_views')
-    video_index = db.Column(db.Integer)  # プレイリスト内のビデオインデックス
+    video_id = db.Column(db.String(32))  # YouTube Video ID（旧データで未特定の場合は NULL）
+    video_index = db.Column(db.Integer)  # 最後に記録した時点のプレイリスト内の位置（現在の位置は PlaylistVideo）
     video_title = db.Column(db.String(500))  # 動画タイトル（OEmbed APIから取得可能）
     watch_count = db.Column(db.Integer, default=0)  # 視聴回数
     watched_duration_seconds = db.Column(db.Integer, default=0)  # 視聴時間（秒）
@@ -127,13 +225,16 @@ class VideoView(db.Model):
     xp_gained = db.Column(db.Integer, default=0)  # 獲得XP
 
     def __repr__(self):
-        return f"<VideoView playlist_id={self.playlist_id}, video_index={self.video_index}>"
+        return f"<VideoView playlist_id={self.playlist_id}, video_id={self.video_id}, video_index={self.video_index}>"
 
 
 class PlaylistMaterial(db.Model):
     """プレイリスト講義資料を保持するテーブル。"""
     
     __tablename__ = "playlist_material"
+    __table_args__ = (
+        db.Index("ix_playlist_material_playlist_id", "playlist_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     playlist_id = db.Column(db.Integer, db.ForeignKey('youtube_playlist.id'), nullable=False)
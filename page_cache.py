@@ -0,0 +1,200 @@
+"""
+Rendered Page Cache
+
+Two-tier (memory + disk) LRU cache for rendered PDF page images.
+Entries are keyed by book, PDF file version and render parameters, so a
+replaced PDF never serves stale images.
+"""
+
+import hashlib
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+# 拡張子 <-> MIMEタイプ
+_EXTENSIONS = {
+    'image/jpeg': 'jpg',
+    'image/webp': 'webp',
+    'image/png': 'png',
+}
+_MIMETYPES = {ext: mimetype for mimetype, ext in _EXTENSIONS.items()}
+
+
+def file_version(path):
+    """ファイルの更新日時とサイズからバージョン識別子を生成します。"""
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+
+def make_cache_key(*parts):
+    """任意のパラメータからキャッシュキー（ETagとしても使用）を生成します。"""
+    raw = '|'.join(str(p) for p in parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class PageCache:
+    """レンダリング済みページ画像のメモリ + ディスクLRUキャッシュ。
+
+    Disk entries live in ``<folder>/<book_id>/<key>.<ext>`` so that all
+    images of a book can be dropped at once when it is replaced or deleted.
+    """
+
+    def __init__(self, folder=None, max_bytes=512 * 1024 * 1024, memory_bytes=32 * 1024 * 1024):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        self._lock = threading.Lock()
+        self._disk = OrderedDict()  # key -> (book_id, size, mimetype)
+        self._disk_size = 0
+        self._memory = OrderedDict()  # key -> (data, mimetype)
+        self._memory_size = 0
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def init_app(self, app):
+        """Flaskアプリの設定からキャッシュを初期化します。"""
+        self.folder = app.config.setdefault('PAGE_CACHE_FOLDER', self.folder or 'cache/pages')
+        self.max_bytes = app.config.setdefault('PAGE_CACHE_MAX_BYTES', self.max_bytes)
+        self.memory_bytes = app.config.setdefault('PAGE_CACHE_MEMORY_BYTES', self.memory_bytes)
+        os.makedirs(self.folder, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        """既存のディスクキャッシュを古い順に読み込みます。"""
+        entries = []
+        for book_dir in os.listdir(self.folder):
+            book_path = os.path.join(self.folder, book_dir)
+            if not os.path.isdir(book_path):
+                continue
+            for name in os.listdir(book_path):
+                key, _, ext = name.partition('.')
+                if ext not in _MIMETYPES:
+                    continue
+                stat = os.stat(os.path.join(book_path, name))
+                entries.append((stat.st_mtime, key, book_dir, stat.st_size, _MIMETYPES[ext]))
+
+        with self._lock:
+            self._disk.clear()
+            self._disk_size = 0
+            for _, key, book_id, size, mimetype in sorted(entries):
+                self._disk[key] = (book_id, size, mimetype)
+                self._disk_size += size
+            self._evict_disk()
+
+    def _path(self, key, book_id, mimetype):
+        return os.path.join(self.folder, str(book_id), f"{key}.{_EXTENSIONS[mimetype]}")
+
+    def get(self, key):
+        """キャッシュから (data, mimetype) を取得します。無ければ None。"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.hits_memory += 1
+                return entry
+
+            disk_entry = self._disk.get(key)
+            if disk_entry is None:
+                self.misses += 1
+                return None
+            self._disk.move_to_end(key)
+
+        book_id, _, mimetype = disk_entry
+        try:
+            with open(self._path(key, book_id, mimetype), 'rb') as f:
+                data = f.read()
+        except OSError:
+            with self._lock:
+                self._forget(key)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits_disk += 1
+            self._remember(key, data, mimetype)
+        return data, mimetype
+
+    def put(self, key, book_id, data, mimetype):
+        """レンダリング結果をキャッシュに保存します。"""
+        book_dir = os.path.join(self.folder, str(book_id))
+        path = self._path(key, book_id, mimetype)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(book_dir, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[WARNING] Failed to write page cache {path}: {e}")
+            return
+
+        with self._lock:
+            self._forget(key)
+            self._disk[key] = (str(book_id), len(data), mimetype)
+            self._disk_size += len(data)
+            self._remember(key, data, mimetype)
+            self._evict_disk()
+
+    def invalidate_book(self, book_id):
+        """書籍のキャッシュを全て削除します（PDF差し替え・削除時）。"""
+        book_id = str(book_id)
+        with self._lock:
+            for key in [k for k, v in self._disk.items() if v[0] == book_id]:
+                self._forget(key)
+        shutil.rmtree(os.path.join(self.folder, book_id), ignore_errors=True)
+
+    def stats(self):
+        """キャッシュのヒット率・使用量を返します。"""
+        with self._lock:
+            return {
+                'entries': len(self._disk),
+                'bytes': self._disk_size,
+                'max_bytes': self.max_bytes,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_size,
+                'hits_memory': self.hits_memory,
+                'hits_disk': self.hits_disk,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    # --- 内部処理（ロック取得済みで呼び出すこと） ---
+
+    def _remember(self, key, data, mimetype):
+        if len(data) > self.memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_size -= len(old[0])
+        self._memory[key] = (data, mimetype)
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes:
+            _, (old_data, _) = self._memory.popitem(last=False)
+            self._memory_size -= len(old_data)
+
+    def _forget(self, key):
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_size -= len(entry[0])
+        disk_entry = self._disk.pop(key, None)
+        if disk_entry is not None:
+            self._disk_size -= disk_entry[1]
+
+    def _evict_disk(self):
+        while self._disk_size > self.max_bytes and self._disk:
+            key, (book_id, size, mimetype) = self._disk.popitem(last=False)
+            self._disk_size -= size
+            self.evictions += 1
+            entry = self._memory.pop(key, None)
+            if entry is not None:
+                self._memory_size -= len(entry[0])
+            try:
+                os.remove(self._path(key, book_id, mimetype))
+            except OSError:
+                pass
+
+
+page_cache = PageCache()
@@ -0,0 +1,86 @@
+"""
+PDF Page Rendering Helpers
+
+Rasterization and image encoding shared by the book reader endpoints and
+the renderer worker processes. Kept free of Flask imports so that worker
+processes can import it cheaply.
+
+Pages are rasterized straight to alpha-free RGB pixmaps and handed to
+Pillow without an intermediate PPM serialization (the image wraps the
+pixmap samples in place). MuPDF's native JPEG encoder was measured to be
+slower and larger than Pillow's libjpeg-turbo; see
+benchmarks/bench_pdf_render.py.
+"""
+
+import io
+
+import fitz
+from PIL import Image
+
+
+def render_pixmap(page, zoom, clip=None):
+    """Rasterize a page (or a clip rectangle of it) to an RGB pixmap without alpha."""
+    return page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csRGB, alpha=False, clip=clip)
+
+
+def pixmap_to_image(pix):
+    """Wrap the pixmap samples in a PIL image without copying.
+
+    The image shares memory with ``pix``, so keep the pixmap alive while
+    the image is in use.
+    """
+    return Image.frombuffer('RGB', (pix.width, pix.height), pix.samples_mv, 'raw', 'RGB', pix.stride, 1)
+
+
+def encode_pixmap(pix, quality, use_webp):
+    """Compress a pixmap as JPEG or WebP.
+
+    Returns:
+        Tuple of (image_bytes, mimetype)
+    """
+    if use_webp:
+        output = io.BytesIO()
+        pixmap_to_image(pix).save(output, format='WEBP', quality=quality, method=4)
+        return output.getvalue(), 'image/webp'
+
+    output = io.BytesIO()
+    pixmap_to_image(pix).save(output, format='JPEG', quality=quality, optimize=True)
+    return output.getvalue(), 'image/jpeg'
+
+
+def encode_page_image(page, zoom, quality, use_webp, clip=None):
+    """Render a PDF page (or only the ``clip`` rectangle) and compress it as JPEG or WebP.
+
+    Returns:
+        Tuple of (image_bytes, mimetype)
+    """
+    return encode_pixmap(render_pixmap(page, zoom, clip), quality, use_webp)
+
+
+def render_page_pixels(page, zoom):
+    """Render a PDF page to raw RGB pixels.
+
+    Returns:
+        Tuple of (pixel_bytes, width, height)
+    """
+    pix = render_pixmap(page, zoom)
+    return pix.samples, pix.width, pix.height
+
+
+def read_pdf_metadata(doc):
+    """Read the page count, page sizes and outline of an open document.
+
+    Returns:
+        Dict with page_count, page_sizes ([width, height] per page, in
+        points) and outline (level, title and 0-based page_num per entry)
+    """
+    page_sizes = [[round(page.rect.width, 2), round(page.rect.height, 2)] for page in doc]
+    outline = [
+        {'level': level, 'title': title, 'page_num': page - 1}
+        for level, title, page in doc.get_toc(simple=True)
+    ]
+    return {
+        'page_count': len(page_sizes),
+        'page_sizes': page_sizes,
+        'outline': outline,
+    }
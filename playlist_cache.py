@@ -0,0 +1,129 @@
+"""
+Playlist Entry Cache
+
+In-process TTL + LRU cache of yt-dlp playlist extractions keyed by
+YouTube playlist id. Lookups are single-flight: concurrent requests for
+the same playlist wait for one in-flight extraction instead of each
+scraping YouTube.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Flight:
+    """実行中の取得処理。待機中のリクエストは done を待って結果を共有します。"""
+
+    __slots__ = ('done', 'result')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class PlaylistCache:
+    """再生リストの動画一覧（yt-dlp の抽出結果）の TTL 付き LRU キャッシュ。
+
+    Cached lists are shared between callers and must not be modified.
+    Failed extractions (None) are not cached, so the next request retries.
+    """
+
+    def __init__(self, ttl=600, max_entries=64):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # playlist_id -> (expires_at, entries)
+        self._flights = {}  # playlist_id -> _Flight
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.evictions = 0
+
+    def init_app(self, app):
+        """Flaskアプリの設定から有効期限と最大件数を読み込みます。"""
+        self.ttl = app.config.setdefault('PLAYLIST_CACHE_TTL', self.ttl)
+        self.max_entries = app.config.setdefault('PLAYLIST_CACHE_MAX_ENTRIES', self.max_entries)
+
+    def get(self, playlist_id, loader):
+        """キャッシュ済みの動画一覧を返します。無ければ loader(playlist_id) で取得します。
+
+        Args:
+            playlist_id: YouTube playlist id (cache key)
+            loader: Extraction function returning the entry list, or None on failure
+
+        Returns:
+            The entry list, or None if the extraction failed
+        """
+        with self._lock:
+            cached = self._entries.get(playlist_id)
+            if cached is not None:
+                if cached[0] > time.monotonic():
+                    self._entries.move_to_end(playlist_id)
+                    self.hits += 1
+                    return cached[1]
+                del self._entries[playlist_id]
+
+            flight = self._flights.get(playlist_id)
+            leader = flight is None
+            if leader:
+                flight = self._flights[playlist_id] = _Flight()
+                self.misses += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            flight.done.wait()
+            return flight.result
+
+        try:
+            flight.result = loader(playlist_id)
+        finally:
+            with self._lock:
+                del self._flights[playlist_id]
+                if flight.result is not None:
+                    self._store(playlist_id, flight.result)
+            flight.done.set()
+        return flight.result
+
+    def put(self, playlist_id, entries):
+        """取得済みの動画一覧を登録します（更新処理で取得した最新の一覧など）。"""
+        if entries is None:
+            return
+        with self._lock:
+            self._store(playlist_id, entries)
+
+    def invalidate(self, playlist_id):
+        """再生リストのエントリを削除します。"""
+        with self._lock:
+            self._entries.pop(playlist_id, None)
+
+    def clear(self):
+        """全てのエントリを削除します。"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """ヒット/ミス/共有待ちの回数とエントリ数を返します。"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'shared': self.shared,
+                'evictions': self.evictions,
+            }
+
+    # --- 内部処理 ---
+
+    def _store(self, playlist_id, entries):
+        self._entries[playlist_id] = (time.monotonic() + self.ttl, entries)
+        self._entries.move_to_end(playlist_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+
+playlist_cache = PlaylistCache()
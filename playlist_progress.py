@@ -0,0 +1,43 @@
+"""
+Playlist Progress Aggregation
+
+Per-playlist viewing totals (completed videos, XP, watch time) of one
+user, computed in one grouped query over video_view instead of loading
+every VideoView of every playlist and summing in Python.
+"""
+
+from sqlalchemy import func, case, exists, or_
+
+from models import db, PlaylistVideo, VideoView
+
+EMPTY_PROGRESS = {'completed_count': 0, 'total_xp': 0, 'watch_seconds': 0}
+
+
+def get_playlist_progress(user_id, playlist_ids=None):
+    """ユーザーのプレイリストごとの視聴進捗を1回のクエリで集計します。
+
+    Args:
+        user_id: Viewer whose progress is aggregated
+        playlist_ids: Restrict to these YouTubePlaylist ids (default: all)
+
+    Returns:
+        Dict of playlist id -> {completed_count, total_xp, watch_seconds};
+        playlists without any views are absent (use EMPTY_PROGRESS)
+    """
+    # 再生リストから削除された動画は完了数に含めない（動画IDが未特定の旧データは含める）
+    in_playlist = or_(VideoView.video_id.is_(None), exists().where(
+        PlaylistVideo.playlist_id == VideoView.playlist_id, PlaylistVideo.video_id == VideoView.video_id
+    ))
+    query = db.session.query(
+        VideoView.playlist_id,
+        func.sum(case((VideoView.is_completed & in_playlist, 1), else_=0)),
+        func.coalesce(func.sum(VideoView.xp_gained), 0),
+        func.coalesce(func.sum(VideoView.watched_duration_seconds), 0)
+    ).filter(VideoView.user_id == user_id).group_by(VideoView.playlist_id)
+    if playlist_ids is not None:
+        query = query.filter(VideoView.playlist_id.in_(playlist_ids))
+
+    return {
+        playlist_id: {'completed_count': completed or 0, 'total_xp': xp, 'watch_seconds': seconds}
+        for playlist_id, completed, xp, seconds in query
+    }
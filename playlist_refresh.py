@@ -0,0 +1,212 @@
+"""
+Playlist Refresh Scheduler
+
+Refreshes the stored video lists of playlists off the request path with
+a small fixed pool of worker threads. There is at most one queued or
+running job per playlist, outbound yt-dlp calls are spaced by a minimum
+interval, and failed jobs are retried with exponential backoff.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime
+
+# 実行中・待機中とみなす状態
+ACTIVE_STATUSES = ('queued', 'running', 'retrying')
+
+
+class RefreshJob:
+    """1件の再生リスト更新ジョブの状態。"""
+
+    def __init__(self, playlist_id, fn, args):
+        self.playlist_id = playlist_id
+        self.fn = fn
+        self.args = args
+        self.status = 'queued'  # queued / running / retrying / completed / failed
+        self.attempts = 0
+        self.error = None
+        self.result = None
+        self.created_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+        self.next_attempt_at = None
+        self._finished_event = threading.Event()
+
+    @property
+    def active(self):
+        return self.status in ACTIVE_STATUSES
+
+    def wait(self, timeout=None):
+        """ジョブが完了（成功または失敗）するまで待機します。"""
+        return self._finished_event.wait(timeout)
+
+    def to_dict(self):
+        return {
+            'playlist_id': self.playlist_id,
+            'status': self.status,
+            'attempts': self.attempts,
+            'error': self.error,
+            'result': self.result,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'next_attempt_at': self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+        }
+
+
+class PlaylistRefreshScheduler:
+    """再生リスト更新ジョブを固定数のワーカースレッドで実行するスケジューラ。
+
+    Jobs are deduplicated per playlist: submitting a playlist that already
+    has a queued, running or retrying job returns that job, and a finished
+    job is reused for ``cooldown`` seconds unless ``force`` is given (so
+    a playlist that cannot be fetched is not re-scraped on every request).
+    """
+
+    def __init__(self, workers=2, min_interval=2.0, max_attempts=3, backoff=30.0, cooldown=300.0):
+        self.app = None
+        self.workers = workers
+        self.min_interval = min_interval
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._heap = []  # (due monotonic time, seq, job)
+        self._seq = itertools.count()
+        self._jobs = {}  # playlist_id -> latest RefreshJob
+        self._threads = []
+        self._rate_lock = threading.Lock()
+        self._next_call = 0.0
+        self.submitted = 0
+        self.deduplicated = 0
+        self.retries = 0
+
+    def init_app(self, app):
+        """Flaskアプリの設定からワーカー数・間隔・リトライ設定を読み込みます。"""
+        self.app = app
+        self.workers = app.config.setdefault('PLAYLIST_REFRESH_WORKERS', self.workers)
+        self.min_interval = app.config.setdefault('PLAYLIST_REFRESH_MIN_INTERVAL', self.min_interval)
+        self.max_attempts = app.config.setdefault('PLAYLIST_REFRESH_MAX_ATTEMPTS', self.max_attempts)
+        self.backoff = app.config.setdefault('PLAYLIST_REFRESH_BACKOFF', self.backoff)
+        self.cooldown = app.config.setdefault('PLAYLIST_REFRESH_COOLDOWN', self.cooldown)
+
+    def submit(self, playlist_id, fn, *args, force=False):
+        """更新ジョブを登録します。fn(job, *args) がワーカースレッドで実行されます。
+
+        Returns:
+            The new job, or the existing one if it is still active (or
+            finished within the cooldown and force is not set)
+        """
+        with self._lock:
+            job = self._jobs.get(playlist_id)
+            if job is not None and (job.active or (not force and self._cooling_down(job))):
+                self.deduplicated += 1
+                return job
+
+            job = RefreshJob(playlist_id, fn, args)
+            self._jobs[playlist_id] = job
+            self.submitted += 1
+            self._push(job, time.monotonic())
+            self._start_workers()
+        return job
+
+    def get(self, playlist_id):
+        """再生リストの最新のジョブを返します。無ければ None。"""
+        with self._lock:
+            return self._jobs.get(playlist_id)
+
+    def jobs(self):
+        """全再生リストの最新のジョブを新しい順に返します。"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+
+    def stats(self):
+        """ワーカー数・待機中のジョブ数・登録/重複/リトライの回数を返します。"""
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+            return {
+                'workers': self.workers,
+                'alive_workers': sum(1 for t in self._threads if t.is_alive()),
+                'min_interval': self.min_interval,
+                'queued': statuses.count('queued') + statuses.count('retrying'),
+                'running': statuses.count('running'),
+                'completed': statuses.count('completed'),
+                'failed': statuses.count('failed'),
+                'submitted': self.submitted,
+                'deduplicated': self.deduplicated,
+                'retries': self.retries,
+            }
+
+    # --- 内部処理 ---
+
+    def _cooling_down(self, job):
+        return job.finished_at is not None and (datetime.utcnow() - job.finished_at).total_seconds() < self.cooldown
+
+    def _push(self, job, due):
+        heapq.heappush(self._heap, (due, next(self._seq), job))
+        self._ready.notify()
+
+    def _start_workers(self):
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < max(1, self.workers):
+            thread = threading.Thread(target=self._run, name=f'playlist-refresh-{len(self._threads)}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _next_job(self):
+        with self._lock:
+            while True:
+                if self._heap:
+                    due = self._heap[0][0]
+                    now = time.monotonic()
+                    if due <= now:
+                        return heapq.heappop(self._heap)[2]
+                    self._ready.wait(due - now)
+                else:
+                    self._ready.wait()
+
+    def _wait_for_rate_limit(self):
+        """外部呼び出しの間隔が min_interval 以上になるまで待機します。"""
+        with self._rate_lock:
+            now = time.monotonic()
+            start = max(now, self._next_call)
+            self._next_call = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            job.status = 'running'
+            job.attempts += 1
+            job.started_at = datetime.utcnow()
+            job.next_attempt_at = None
+            self._wait_for_rate_limit()
+            try:
+                with self.app.app_context():
+                    job.result = job.fn(job, *job.args)
+                job.status = 'completed'
+                job.error = None
+            except Exception as e:
+                job.error = str(e)
+                if job.attempts < self.max_attempts:
+                    delay = self.backoff * 2 ** (job.attempts - 1)
+                    print(f"[WARNING] Playlist refresh failed for playlist {job.playlist_id} "
+                          f"(attempt {job.attempts}/{self.max_attempts}), retrying in {delay:.0f}s: {e}")
+                    with self._lock:
+                        job.status = 'retrying'
+                        job.next_attempt_at = datetime.utcfromtimestamp(time.time() + delay)
+                        self.retries += 1
+                        self._push(job, time.monotonic() + delay)
+                    continue
+                job.status = 'failed'
+                print(f"[WARNING] Playlist refresh failed for playlist {job.playlist_id}: {e}")
+            job.finished_at = datetime.utcnow()
+            job._finished_event.set()
+
+
+playlist_refresh = PlaylistRefreshScheduler()
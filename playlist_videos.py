@@ -0,0 +1,243 @@
+"""
+Playlist Video Entries
+
+The videos of each registered playlist are stored in playlist_video when
+the playlist is created or refreshed, so that progress tracking resolves
+a YouTube video id to its playlist position with one indexed lookup
+instead of a yt-dlp scrape, and a progress ping is a single upsert into
+video_view (buffered and batched by progress_buffer).
+
+Progress is keyed by video id, not by position: a refresh diffs the
+fetched list against the stored one and writes only the added, removed
+and changed entries, and never has to touch video_view.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import delete, exists, func, insert, select, tuple_, update
+from sqlalchemy.orm import aliased
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db, YouTubePlaylist, PlaylistVideo, VideoView
+
+# 視聴完了時のXP（視聴秒数 / 36、10〜500）
+COMPLETE_XP_SECONDS_PER_POINT = 36
+COMPLETE_XP_MIN = 10
+COMPLETE_XP_MAX = 500
+
+# 1回のUPSERT文にまとめる視聴記録の行数（SQLiteのパラメータ数上限内）
+UPSERT_BATCH_SIZE = 500
+
+# IN句に渡すIDの最大数
+IN_CHUNK_SIZE = 500
+
+# 差分の比較対象となるエントリの列
+ENTRY_COLUMNS = ('position', 'title', 'duration', 'thumbnail_url', 'channel')
+
+
+def _chunks(items, size=IN_CHUNK_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def adopt_position_views(playlist_pk):
+    """動画IDの無い視聴情報（位置で記録された旧データ）に、保存済みの動画一覧の同じ位置の動画IDを設定します。
+
+    Rows whose video already has a keyed view of the same user are left
+    unassigned. The (playlist_id, video_id) index limits the scan to the
+    playlist's unassigned rows, so the call is cheap on every sync once
+    they are adopted.
+    """
+    video_id = select(PlaylistVideo.video_id).where(
+        PlaylistVideo.playlist_id == VideoView.playlist_id,
+        PlaylistVideo.position == VideoView.video_index
+    ).correlate_except(PlaylistVideo).scalar_subquery()
+    other = aliased(VideoView)
+    db.session.execute(
+        update(VideoView)
+        .where(
+            VideoView.playlist_id == playlist_pk,
+            VideoView.video_id.is_(None),
+            VideoView.video_index.is_not(None),
+            video_id.is_not(None),
+            ~exists().where(other.user_id == VideoView.user_id, other.playlist_id == VideoView.playlist_id,
+                            other.video_id == video_id)
+        )
+        .values(video_id=video_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def sync_playlist_videos(playlist, entries):
+    """取得した動画一覧と保存済みのエントリの差分だけを書き込みます（コミットは呼び出し側）。
+
+    Added entries are inserted, removed ones deleted, and moved or
+    retitled ones updated; unchanged entries are not written. Viewing
+    progress is keyed by video id, so it follows moved videos without
+    being rewritten; views of removed videos keep their XP but no longer
+    count as completed (and count again if the video is re-added). Also
+    updates the playlist's cached video count, thumbnail and cache
+    timestamp. A video listed more than once keeps its first position.
+
+    Args:
+        playlist: YouTubePlaylist
+        entries: Ordered entry dicts from app.get_youtube_playlist_entries()
+
+    Returns:
+        Dict with the number of added, removed, moved and updated entries
+    """
+    fetched = {}
+    for position, entry in enumerate(entries):
+        if entry['video_id'] in fetched:
+            continue
+        fetched[entry['video_id']] = {
+            'position': position,
+            'title': entry.get('title'),
+            'duration': entry.get('duration') or 0,
+            'thumbnail_url': entry.get('thumbnail_url'),
+            'channel': entry.get('channel'),
+        }
+    stored = {
+        row.video_id: row for row in db.session.execute(
+            select(PlaylistVideo.id, PlaylistVideo.video_id, *(getattr(PlaylistVideo, c) for c in ENTRY_COLUMNS))
+            .where(PlaylistVideo.playlist_id == playlist.id)
+        )
+    }
+
+    # 旧データの視聴情報は、記録時点の一覧（保存済みの一覧、無ければ取得した一覧）の位置で特定
+    if stored:
+        adopt_position_views(playlist.id)
+
+    now = datetime.utcnow()
+    removed = [row for video_id, row in stored.items() if video_id not in fetched]
+    added = [dict(row, playlist_id=playlist.id, video_id=video_id, updated_at=now)
+             for video_id, row in fetched.items() if video_id not in stored]
+    changed = []
+    moved = 0
+    for video_id, row in fetched.items():
+        old = stored.get(video_id)
+        if old is None:
+            continue
+        moved += old.position != row['position']
+        if any(getattr(old, column) != row[column] for column in ENTRY_COLUMNS):
+            changed.append(dict(row, id=old.id, updated_at=now))
+
+    for chunk in _chunks(removed):
+        db.session.execute(delete(PlaylistVideo).where(PlaylistVideo.id.in_([row.id for row in chunk])))
+    if changed:
+        db.session.execute(update(PlaylistVideo), changed)
+    if added:
+        db.session.execute(insert(PlaylistVideo), added)
+
+    if not stored:
+        adopt_position_views(playlist.id)
+
+    playlist.cached_video_count = len(entries)
+    if entries and (not playlist.thumbnail_url or playlist.thumbnail_url.startswith('<')):
+        playlist.thumbnail_url = f"https://i.ytimg.com/vi/{entries[0]['video_id']}/hqdefault.jpg"
+    playlist.cache_updated_at = now
+    return {'added': len(added), 'removed': len(removed), 'moved': moved, 'updated': len(changed)}
+
+
+def has_playlist_videos(playlist_pk):
+    """プレイリストの動画一覧が保存済みかどうかを返します。"""
+    return db.session.execute(
+        select(PlaylistVideo.id).where(PlaylistVideo.playlist_id == playlist_pk).limit(1)
+    ).first() is not None
+
+
+def find_playlist_video(youtube_playlist_id, video_id):
+    """YouTubeのプレイリストIDと動画IDから保存済みの動画を検索します。
+
+    One query over the unique indexes on youtube_playlist.playlist_id and
+    (playlist_video.playlist_id, video_id).
+
+    Returns:
+        Row (playlist_pk, video_id, position, title), or None if the video
+        is not stored for that playlist
+    """
+    return db.session.execute(
+        select(PlaylistVideo.playlist_id.label('playlist_pk'), PlaylistVideo.video_id,
+               PlaylistVideo.position, PlaylistVideo.title)
+        .join(YouTubePlaylist, YouTubePlaylist.id == PlaylistVideo.playlist_id)
+        .where(YouTubePlaylist.playlist_id == youtube_playlist_id, PlaylistVideo.video_id == video_id)
+    ).first()
+
+
+def find_playlist_videos(pairs):
+    """(YouTubeのプレイリストID, 動画ID) の組をまとめて1回のクエリで検索します。
+
+    Returns:
+        Dict of (youtube_playlist_id, video_id) -> Row (playlist_pk,
+        video_id, position, title); pairs that are not stored are absent
+    """
+    pairs = list(pairs)
+    if not pairs:
+        return {}
+    rows = db.session.execute(
+        select(YouTubePlaylist.playlist_id.label('youtube_playlist_id'), PlaylistVideo.video_id,
+               PlaylistVideo.playlist_id.label('playlist_pk'), PlaylistVideo.position, PlaylistVideo.title)
+        .join(YouTubePlaylist, YouTubePlaylist.id == PlaylistVideo.playlist_id)
+        .where(tuple_(YouTubePlaylist.playlist_id, PlaylistVideo.video_id).in_(pairs))
+    ).all()
+    return {(row.youtube_playlist_id, row.video_id): row for row in rows}
+
+
+def _upsert_view(user_id, video, values, set_):
+    now = datetime.utcnow()
+    stmt = sqlite_insert(VideoView).values(
+        user_id=user_id,
+        playlist_id=video.playlist_pk,
+        video_id=video.video_id,
+        video_index=video.position,
+        video_title=video.title,
+        watch_count=0,
+        first_viewed=now,
+        last_viewed=now,
+        **values
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=['user_id', 'playlist_id', 'video_id'],
+        set_=dict(last_viewed=now, video_index=video.position, **set_)
+    )
+
+
+def record_view_progress(rows):
+    """視聴時間（最大値）をまとめてUPSERTします（コミットは呼び出し側）。
+
+    Args:
+        rows: Dicts with user_id, playlist_id (YouTubePlaylist id),
+            video_id, video_index, video_title, watched_duration_seconds
+            and last_viewed, at most one per (user_id, playlist_id, video_id)
+    """
+    for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+        stmt = sqlite_insert(VideoView).values([
+            dict(row, watch_count=0, is_completed=False, xp_gained=0, first_viewed=row['last_viewed'])
+            for row in rows[start:start + UPSERT_BATCH_SIZE]
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id', 'playlist_id', 'video_id'],
+            set_={
+                'video_index': stmt.excluded.video_index,
+                'watched_duration_seconds': func.max(
+                    func.coalesce(VideoView.watched_duration_seconds, 0), stmt.excluded.watched_duration_seconds
+                ),
+                'last_viewed': stmt.excluded.last_viewed,
+            }
+        )
+        db.session.execute(stmt)
+
+
+def mark_view_completed(user_id, video):
+    """視聴完了として記録し、視聴時間から計算したXPを返します（コミットは呼び出し側）。"""
+    xp = func.max(COMPLETE_XP_MIN, func.min(
+        COMPLETE_XP_MAX,
+        func.coalesce(VideoView.watched_duration_seconds, 0) // COMPLETE_XP_SECONDS_PER_POINT
+    ))
+    stmt = _upsert_view(
+        user_id, video,
+        {'watched_duration_seconds': 0, 'is_completed': True, 'xp_gained': COMPLETE_XP_MIN},
+        {'is_completed': True, 'xp_gained': xp}
+    ).returning(VideoView.xp_gained)
+    return db.session.execute(stmt).scalar()
@@ -0,0 +1,184 @@
+"""
+Watch Progress Write-Behind Buffer
+
+The YouTube player reports the watch position every few seconds per
+viewer. Instead of one transaction per report, reports are coalesced in
+memory per (user, playlist, video), keeping the longest watch time, and
+written to video_view in one transaction every ``interval`` seconds by a
+background thread. Pending reports are flushed on shutdown.
+
+The buffer is per process; with several server processes each flushes
+its own reports (the upsert keeps the maximum either way).
+"""
+
+import atexit
+import threading
+from datetime import datetime
+
+from models import db
+from playlist_videos import record_view_progress
+from storage import run_with_retry
+
+
+class ProgressBuffer:
+    """視聴進捗の書き込みをまとめるライトビハインドバッファ。
+
+    ``interval = 0`` writes every report through immediately (no
+    buffering). The buffer is also flushed early once ``max_pending``
+    distinct videos are waiting.
+    """
+
+    def __init__(self, interval=5.0, max_pending=5000):
+        self.app = None
+        self.interval = interval
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # フラッシュを直列化
+        self._pending = {}  # (user_id, playlist_pk, video_id) -> row
+        self._wake = threading.Event()
+        self._thread = None
+        self.events = 0
+        self.coalesced = 0
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.failures = 0
+
+    def init_app(self, app):
+        """Flaskアプリの設定を読み込み、終了時のフラッシュを登録します。"""
+        self.app = app
+        self.interval = app.config.setdefault('PROGRESS_FLUSH_INTERVAL', self.interval)
+        self.max_pending = app.config.setdefault('PROGRESS_BUFFER_MAX_PENDING', self.max_pending)
+        atexit.register(self.flush)
+
+    def add(self, user_id, video, watch_time):
+        """視聴進捗を1件登録します。
+
+        Args:
+            user_id: Viewer
+            video: Row (playlist_pk, video_id, position, title) from find_playlist_video()
+            watch_time: Watched seconds reported by the player
+        """
+        key = (user_id, video.playlist_pk, video.video_id)
+        now = datetime.utcnow()
+        with self._lock:
+            self.events += 1
+            row = self._pending.get(key)
+            if row is None:
+                self._pending[key] = {
+                    'user_id': user_id,
+                    'playlist_id': video.playlist_pk,
+                    'video_id': video.video_id,
+                    'video_index': video.position,
+                    'video_title': video.title,
+                    'watched_duration_seconds': watch_time,
+                    'last_viewed': now,
+                }
+            else:
+                self.coalesced += 1
+                row['watched_duration_seconds'] = max(row['watched_duration_seconds'], watch_time)
+                row['last_viewed'] = now
+            full = len(self._pending) >= self.max_pending
+            if self.interval:
+                self._start_flusher()
+
+        if not self.interval:
+            self.flush()
+        elif full:
+            self._wake.set()
+
+    def flush(self):
+        """保存待ちの進捗を1トランザクションで video_view に書き込みます。
+
+        Rows that cannot be written are put back (merged with newer
+        reports) and retried on the next flush.
+
+        Returns:
+            Number of rows written
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            rows = list(pending.values())
+            try:
+                with self.app.app_context():
+                    def write():
+                        record_view_progress(rows)
+                        db.session.commit()
+
+                    run_with_retry(write)
+            except Exception as e:
+                self._restore(pending)
+                print(f"[WARNING] Failed to flush {len(rows)} watch progress row(s): {e}")
+                return 0
+
+            with self._lock:
+                self.flushes += 1
+                self.flushed_rows += len(rows)
+            return len(rows)
+
+    def take(self, user_id, playlist_pk, video_id):
+        """1本の動画の保存待ちの進捗を取り出します（視聴完了の書き込みにまとめる場合）。
+
+        Waits for a flush in progress, so a report that is being written
+        is committed before the caller reads video_view.
+
+        Returns:
+            The pending row (for record_view_progress()), or None
+        """
+        with self._flush_lock:
+            with self._lock:
+                return self._pending.pop((user_id, playlist_pk, video_id), None)
+
+    def restore(self, row):
+        """take() で取り出した進捗を書き込めなかった場合に戻します。"""
+        self._restore({(row['user_id'], row['playlist_id'], row['video_id']): row})
+
+    def discard(self, user_id=None, playlist_pk=None):
+        """保存待ちの進捗を破棄します（進捗のリセット・再生リストの削除時）。"""
+        with self._lock:
+            for key in [k for k in self._pending
+                        if (user_id is None or k[0] == user_id) and (playlist_pk is None or k[1] == playlist_pk)]:
+                del self._pending[key]
+
+    def stats(self):
+        """受付件数・集約件数・保存待ち件数・フラッシュ回数を返します。"""
+        with self._lock:
+            return {
+                'interval': self.interval,
+                'pending': len(self._pending),
+                'events': self.events,
+                'coalesced': self.coalesced,
+                'flushes': self.flushes,
+                'flushed_rows': self.flushed_rows,
+                'failures': self.failures,
+            }
+
+    # --- 内部処理 ---
+
+    def _restore(self, pending):
+        with self._lock:
+            self.failures += 1
+            for key, row in pending.items():
+                newer = self._pending.get(key)
+                if newer is None:
+                    self._pending[key] = row
+                else:
+                    newer['watched_duration_seconds'] = max(newer['watched_duration_seconds'],
+                                                            row['watched_duration_seconds'])
+
+    def _start_flusher(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='progress-buffer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+
+progress_buffer = ProgressBuffer()
@@ -0,0 +1,137 @@
+"""
+Streaming Record Export
+
+Generators for the /export/csv and /export/json downloads. Rows are
+fetched from the database in chunks (yield_per) and written out
+incrementally, so an export uses constant memory regardless of the
+number of records and the download starts with the first chunk.
+gzip_chunks() optionally compresses the stream on the fly.
+"""
+
+import csv
+import io
+import zlib
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import select
+
+from models import db, UserStatus, Record, Book, ResourceLink
+
+FETCH_SIZE = 1000
+CHUNK_SIZE = 64 * 1024  # 出力チャンクの目安（バイト）
+
+CSV_HEADER = ['ID', '種別', 'サブタイプ', '説明', '取得XP', '日付', '時間(分)', '評価']
+
+RECORD_COLUMNS = (Record.id, Record.type, Record.subtype, Record.description, Record.xp_gained,
+                  Record.date, Record.duration_minutes, Record.evaluation, Record.image_path)
+
+
+def _stream_rows(*columns, where=None, order_by=None):
+    stmt = select(*columns).execution_options(yield_per=FETCH_SIZE)
+    if where is not None:
+        stmt = stmt.where(where)
+    if order_by is not None:
+        stmt = stmt.order_by(order_by)
+    return db.session.execute(stmt)
+
+
+def _buffered(pieces, size=CHUNK_SIZE):
+    """小さな文字列をまとめ、約 size バイトごとのUTF-8チャンクとして返します。"""
+    buffer = []
+    length = 0
+    for piece in pieces:
+        buffer.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield ''.join(buffer).encode('utf-8')
+            buffer.clear()
+            length = 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def iter_records_csv(user_id):
+    """ユーザーの全記録を新しい順にCSVとして出力します（ヘッダー行を含む）。"""
+    def pieces():
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(CSV_HEADER)
+        yield output.getvalue()
+
+        # 取得したチャンク単位でまとめて書き出す
+        records = _stream_rows(*RECORD_COLUMNS, where=Record.user_id == user_id, order_by=Record.date.desc())
+        for rows in records.partitions():
+            output.seek(0)
+            output.truncate()
+            writer.writerows(
+                (r.id, r.type, r.subtype, r.description, r.xp_gained,
+                 r.date.isoformat(' ', 'seconds') if r.date else '',
+                 r.duration_minutes or '', r.evaluation or '')
+                for r in rows
+            )
+            yield output.getvalue()
+
+    return _buffered(pieces())
+
+
+def iter_export_json(user_id):
+    """ユーザーの全記録と書籍・リンクをJSONドキュメントとして出力します。
+
+    The document has the same shape (and key order) as the previous
+    jsonify() output: books, exported_at, links, records, user.
+    """
+    dumps = current_app.json.dumps
+
+    def array(rows, serialize):
+        first = True
+        for row in rows:
+            yield ('' if first else ',') + dumps(serialize(row))
+            first = False
+
+    def pieces():
+        yield '{"books":['
+        yield from array(
+            _stream_rows(Book.id, Book.title, Book.author, Book.description, order_by=Book.id),
+            lambda b: {'id': b.id, 'title': b.title, 'author': b.author, 'description': b.description}
+        )
+        yield '],"exported_at":' + dumps(datetime.now().isoformat())
+        yield ',"links":['
+        yield from array(
+            _stream_rows(ResourceLink.id, ResourceLink.name, ResourceLink.url, ResourceLink.description,
+                         order_by=ResourceLink.id),
+            lambda l: {'id': l.id, 'name': l.name, 'url': l.url, 'description': l.description}
+        )
+        yield '],"records":['
+        yield from array(
+            _stream_rows(*RECORD_COLUMNS, where=Record.user_id == user_id, order_by=Record.date.desc()),
+            lambda r: {
+                'id': r.id,
+                'type': r.type,
+                'subtype': r.subtype,
+                'description': r.description,
+                'xp_gained': r.xp_gained,
+                'date': r.date.isoformat() if r.date else None,
+                'duration_minutes': r.duration_minutes,
+                'evaluation': r.evaluation,
+                'image_path': r.image_path
+            }
+        )
+        user_status = UserStatus.query.filter_by(user_id=user_id).first()
+        yield '],"user":' + dumps({
+            'username': user_status.username if user_status else '新規ユーザー',
+            'total_xp': user_status.total_xp if user_status else 0
+        })
+        yield '}'
+
+    return _buffered(pieces())
+
+
+def gzip_chunks(chunks, level=6):
+    """バイト列のチャンクを逐次gzip圧縮して返します。"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31: gzipヘッダー付き
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
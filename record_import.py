@@ -0,0 +1,226 @@
+"""
+Bulk Record Import
+
+Imports learning records from the /export/csv and /export/json formats
+(or plain lists of records). Every row is validated and its XP is
+recomputed with XPCalculator, exactly like the single-record routes.
+Valid rows are inserted in batches: one executemany INSERT, one daily
+rollup upsert and one atomic total XP update per batch, each batch in its
+own transaction.
+"""
+
+import csv
+import io
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, tuple_
+
+from models import db, Record
+from xp_core import XPCalculator, Constants
+from daily_stats import rollup_key, apply_totals
+from storage import run_with_retry
+from user_xp import add_user_xp
+
+BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+
+# export_csv のヘッダー → Record の属性名
+CSV_COLUMNS = {
+    '種別': 'type',
+    'サブタイプ': 'subtype',
+    '説明': 'description',
+    '取得XP': 'xp_gained',
+    '日付': 'date',
+    '時間(分)': 'duration_minutes',
+    '評価': 'evaluation',
+}
+
+DATE_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d', '%Y/%m/%d %H:%M:%S', '%Y/%m/%d %H:%M', '%Y/%m/%d')
+
+
+def iter_csv_rows(stream):
+    """CSV（export_csv 形式、または英語の列名）を1行ずつ dict で返します。"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    for row in csv.DictReader(text):
+        yield {CSV_COLUMNS.get(key, key): value for key, value in row.items() if key is not None}
+
+
+def iter_json_rows(data):
+    """export_json のドキュメント（または記録の配列）から記録を返します。"""
+    if isinstance(data, dict):
+        data = data.get('records')
+    if not isinstance(data, list):
+        raise ValueError('JSONは記録の配列、または "records" を含むオブジェクトである必要があります。')
+    return iter(data)
+
+
+def parse_date(value):
+    if isinstance(value, (int, float)):
+        raise ValueError(f'日付の形式が不正です: {value}')
+    value = str(value or '').strip()
+    # 取り込み時刻で補うと重複判定や日別集計がずれるため、日付の無い行はエラーにする
+    if not value:
+        raise ValueError('日付は必須です。')
+    try:
+        parsed = datetime.fromisoformat(value)
+        # 記録の日時はローカル時刻（naive）で保存している
+        return parsed.astimezone().replace(tzinfo=None) if parsed.tzinfo else parsed
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f'日付の形式が不正です: {value}')
+
+
+def validate_row(row):
+    """1行を検証し、XPを再計算した Record 用の dict を返します。不正な場合は ValueError。
+
+    The xp_gained column of the input is ignored; XP always follows the
+    current XPCalculator rules.
+    """
+    if not isinstance(row, dict):
+        raise ValueError('記録はオブジェクトである必要があります。')
+
+    record_type = str(row.get('type') or '').strip()
+    subtype = str(row.get('subtype') or '').strip()
+    evaluation = str(row.get('evaluation') or '').strip().upper() or None
+    description = row.get('description') or ''
+    duration_minutes = 0
+
+    if record_type == '時間学習':
+        try:
+            duration_minutes = int(float(row.get('duration_minutes') or 0))
+        except (TypeError, ValueError):
+            raise ValueError('時間は整数である必要があります。')
+        if duration_minutes <= 0 or duration_minutes > 1440:
+            raise ValueError('時間は1〜1440分の間である必要があります。')
+        xp_gained = XPCalculator.calculate_time_xp(subtype, duration_minutes)
+        if xp_gained <= 0:
+            raise ValueError(f'無効な活動タイプです: {subtype}')
+        evaluation = None
+    elif record_type == '科目習得':
+        if not subtype:
+            raise ValueError('技法タイプは必須です。')
+        if evaluation not in Constants.EVALUATION_MAP:
+            raise ValueError(f'無効な評価です: {evaluation}')
+        xp_gained = XPCalculator.calculate_acquisition_xp(subtype, evaluation)
+    elif record_type == '作品投稿':
+        subtype = subtype or '自由投稿作品'
+        evaluation = None
+        xp_gained = XPCalculator.calculate_acquisition_xp('自由投稿', 'A')
+    else:
+        raise ValueError(f'無効な記録種別です: {record_type or "(空)"}')
+
+    if xp_gained <= 0:
+        raise ValueError('XPが0以下となりました。')
+
+    return {
+        'type': record_type,
+        'subtype': subtype,
+        'description': str(description)[:255],
+        'xp_gained': xp_gained,
+        'date': parse_date(row.get('date')),
+        'duration_minutes': duration_minutes,
+        'evaluation': evaluation,
+        'image_path': row.get('image_path') or None,
+    }
+
+
+def _duplicate_key(date, record_type, subtype):
+    # エクスポートの日時は秒単位なので、秒未満は比較しない
+    return date.replace(microsecond=0), record_type, subtype
+
+
+def _existing_keys(rows, user_id):
+    """バッチと同じ (日時, 種別, サブタイプ) のユーザーの既存記録のキーを返します。"""
+    dates = [row['date'] for row in rows]
+    existing = db.session.query(Record.date, Record.type, Record.subtype).filter(
+        Record.user_id == user_id,
+        Record.date >= min(dates).replace(microsecond=0),
+        Record.date < max(dates).replace(microsecond=0) + timedelta(seconds=1),
+        tuple_(Record.type, Record.subtype).in_({(row['type'], row['subtype']) for row in rows})
+    ).all()
+    return {_duplicate_key(*key) for key in existing}
+
+
+def _insert_batch(rows, user_id, skip_duplicates):
+    """1バッチ分を1トランザクションで登録し、(登録件数, スキップ件数, 獲得XP, 累計XP) を返します。"""
+    def write():
+        batch = rows
+        skipped = 0
+        if skip_duplicates:
+            existing = _existing_keys(rows, user_id)
+            batch = [row for row in rows
+                     if _duplicate_key(row['date'], row['type'], row['subtype']) not in existing]
+            skipped = len(rows) - len(batch)
+        if not batch:
+            db.session.rollback()
+            return 0, skipped, 0, None
+
+        db.session.execute(insert(Record), [dict(row, user_id=user_id) for row in batch])
+
+        totals = {}
+        for row in batch:
+            key = rollup_key(user_id, row['date'], row['type'], row['subtype'], row['evaluation'])
+            entry = totals.setdefault(key, [0, 0, 0])
+            entry[0] += row['xp_gained']
+            entry[1] += row['duration_minutes']
+            entry[2] += 1
+        apply_totals(totals)
+
+        xp = sum(row['xp_gained'] for row in batch)
+        total_xp = add_user_xp(xp, user_id)
+        db.session.commit()
+        return len(batch), skipped, xp, total_xp
+
+    return run_with_retry(write)
+
+
+def import_records(rows, user_id, skip_duplicates=False, dry_run=False, batch_size=BATCH_SIZE):
+    """記録を検証し、ユーザーの記録としてバッチ単位で一括登録します。
+
+    Args:
+        rows: Iterable of row dicts (see iter_csv_rows / iter_json_rows)
+        user_id: Owner of the imported records
+        skip_duplicates: Skip rows whose (date, type, subtype) already exists,
+            so re-importing an export does not double the records
+        dry_run: Validate only (skip_duplicates is not checked)
+
+    Returns:
+        Dict with imported / skipped / error_count / errors (row numbers are
+        1-based data rows), xp_gained and total_xp
+    """
+    result = {'imported': 0, 'skipped': 0, 'error_count': 0, 'errors': [], 'xp_gained': 0, 'total_xp': None}
+    batch = []
+
+    def flush():
+        imported, skipped, xp, total_xp = _insert_batch(batch, user_id, skip_duplicates)
+        result['imported'] += imported
+        result['skipped'] += skipped
+        result['xp_gained'] += xp
+        if total_xp is not None:
+            result['total_xp'] = total_xp
+        batch.clear()
+
+    for row_num, row in enumerate(rows, start=1):
+        try:
+            values = validate_row(row)
+        except ValueError as e:
+            result['error_count'] += 1
+            if len(result['errors']) < MAX_REPORTED_ERRORS:
+                result['errors'].append({'row': row_num, 'error': str(e)})
+            continue
+        if dry_run:
+            result['imported'] += 1
+            result['xp_gained'] += values['xp_gained']
+            continue
+        batch.append(values)
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+    return result
@@ -0,0 +1,225 @@
+"""
+Page Renderer Pool
+
+Persistent worker processes that rasterize and encode PDF pages off the
+Flask request thread. Results are handed back through
+multiprocessing.shared_memory blocks instead of being pickled through the
+result pipe, and a MuPDF crash only takes down a worker, never the web
+process.
+"""
+
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+from document_pool import DocumentPool, document_pool
+from pdf_render import encode_page_image, render_page_pixels, render_pixmap
+
+
+class RenderError(Exception):
+    """ワーカーの異常終了などでページを描画できなかった場合の例外。"""
+
+
+# --- ワーカープロセス側 ---
+_worker_documents = None
+
+
+def _init_worker(max_documents):
+    """ワーカープロセスごとのドキュメントプールを初期化します。"""
+    global _worker_documents
+    _worker_documents = DocumentPool(max_documents)
+
+
+def _to_shared_memory(data):
+    """バイト列を共有メモリに書き込み、そのブロック名を返します。"""
+    size = len(data)
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    try:
+        shm.buf[:size] = data
+    except Exception:
+        shm.close()
+        shm.unlink()
+        raise
+    shm.close()
+    return shm.name
+
+
+def _read_shared_memory(name, size):
+    """共有メモリからバイト列を読み出し、ブロックを解放します。"""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return bytes(shm.buf[:size])
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _render_job(pdf_path, page_num, zoom, quality, use_webp, clip=None):
+    with _worker_documents.open(pdf_path) as doc:
+        data, mimetype = encode_page_image(doc[page_num], zoom, quality, use_webp, clip)
+    return _to_shared_memory(data), len(data), mimetype
+
+
+def _render_pixels_job(pdf_path, page_num, zoom):
+    with _worker_documents.open(pdf_path) as doc:
+        pix = render_pixmap(doc[page_num], zoom)
+    # Copy the pixmap samples straight into shared memory (no bytes object)
+    return _to_shared_memory(pix.samples_mv), len(pix.samples_mv), (pix.width, pix.height)
+
+
+# --- Webプロセス側（ワーカー無効時のインライン描画） ---
+
+def _render_inline(pdf_path, page_num, zoom, quality, use_webp, clip=None):
+    with document_pool.open(pdf_path) as doc:
+        return encode_page_image(doc[page_num], zoom, quality, use_webp, clip)
+
+
+def _render_pixels_inline(pdf_path, page_num, zoom):
+    with document_pool.open(pdf_path) as doc:
+        samples, width, height = render_page_pixels(doc[page_num], zoom)
+    return samples, (width, height)
+
+
+class RenderPool:
+    """ページ描画ジョブを受け付けるワーカープロセスプール。
+
+    ``workers = 0`` renders inline in the calling thread using the shared
+    document pool, which is also the fallback when no process can be
+    started.
+    """
+
+    def __init__(self, workers=0, max_documents=4):
+        self.workers = workers
+        self.max_documents = max_documents
+        self._executor = None
+        self._lock = threading.Lock()
+        self.jobs = 0
+        self.crashes = 0
+
+    def init_app(self, app):
+        """Flaskアプリの設定からワーカー数を読み込みます。"""
+        self.workers = app.config.setdefault('RENDER_WORKERS', self.workers)
+        self.max_documents = app.config.setdefault('RENDER_WORKER_DOCUMENTS', self.max_documents)
+        atexit.register(self.shutdown)
+
+    def submit(self, pdf_path, page_num, zoom, quality, use_webp, clip=None):
+        """ページを描画・圧縮するジョブを投入します。
+
+        ``clip`` is an optional (x0, y0, x1, y1) rectangle in page
+        coordinates; only that region is rasterized.
+
+        Returns:
+            Future resolving to (image_bytes, mimetype)
+        """
+        if not self.workers:
+            return self._run_inline(_render_inline, pdf_path, page_num, zoom, quality, use_webp, clip)
+        return self._submit(_render_job, pdf_path, page_num, zoom, quality, use_webp, clip)
+
+    def submit_pixels(self, pdf_path, page_num, zoom):
+        """ページを生のRGBピクセルとして描画するジョブを投入します。
+
+        Returns:
+            Future resolving to (pixel_bytes, (width, height))
+        """
+        if not self.workers:
+            return self._run_inline(_render_pixels_inline, pdf_path, page_num, zoom)
+        return self._submit(_render_pixels_job, pdf_path, page_num, zoom)
+
+    def render(self, pdf_path, page_num, zoom, quality, use_webp, clip=None):
+        """ページを描画・圧縮して (image_bytes, mimetype) を返します。"""
+        return self.submit(pdf_path, page_num, zoom, quality, use_webp, clip).result()
+
+    def shutdown(self):
+        """ワーカープロセスを停止します。"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        """ワーカー数・ジョブ数・クラッシュ回数を返します。"""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'running': self._executor is not None,
+                'jobs': self.jobs,
+                'crashes': self.crashes,
+            }
+
+    # --- 内部処理 ---
+
+    def _run_inline(self, fn, *args):
+        result = Future()
+        with self._lock:
+            self.jobs += 1
+        try:
+            result.set_result(fn(*args))
+        except Exception as e:
+            result.set_exception(e)
+        return result
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # fork is unsafe in a threaded web server; spawn works on every platform
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(self.max_documents,),
+                )
+            return self._executor
+
+    def _reset(self, executor):
+        """クラッシュしたプールを破棄します。次のジョブで再起動されます。"""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+            self.crashes += 1
+        print("[WARNING] Render worker crashed; restarting the render pool")
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, fn, *args):
+        result = Future()
+        for attempt in range(2):
+            try:
+                executor = self._get_executor()
+            except OSError as e:
+                print(f"[WARNING] Failed to start render workers, rendering inline: {e}")
+                self.workers = 0
+                inline = _render_inline if fn is _render_job else _render_pixels_inline
+                return self._run_inline(inline, *args)
+            try:
+                job = executor.submit(fn, *args)
+                break
+            except (BrokenProcessPool, RuntimeError):
+                self._reset(executor)
+                if attempt:
+                    raise RenderError('レンダリングワーカーを起動できませんでした。')
+
+        with self._lock:
+            self.jobs += 1
+        job.add_done_callback(lambda job: self._collect(job, executor, result))
+        return result
+
+    def _collect(self, job, executor, result):
+        # Runs as soon as the job finishes, so shared memory is released even
+        # if the caller never reads the result (e.g. a cancelled stream).
+        try:
+            name, size, meta = job.result()
+            data = _read_shared_memory(name, size)
+        except (BrokenProcessPool, CancelledError):
+            self._reset(executor)
+            result.set_exception(RenderError('レンダリングワーカーが異常終了しました。'))
+        except Exception as e:
+            result.set_exception(e)
+        else:
+            result.set_result((data, meta))
+
+
+render_pool = RenderPool(workers=min(4, os.cpu_count() or 1))
@@ -0,0 +1,184 @@
+"""
+Versioned Response Cache
+
+Memoizes read-only aggregate endpoints (the /statistics/* family) keyed
+by (endpoint, arguments, user, data version). The data version is a
+counter in the data_version table that is bumped inside the same
+transaction as any write to the tables those endpoints read, so a cached
+response is reused exactly until the next write, across all server
+processes. The cache key doubles as an ETag, letting browsers revalidate
+with a 304.
+
+Watch progress is written every few seconds while a video plays, so it
+has a counter of its own (PROGRESS_VERSION_ID): progress flushes only
+invalidate the endpoints cached on that counter, not every statistic.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+from itertools import chain
+
+from flask import Response, make_response, request
+from sqlalchemy import event, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models import db, DataVersion, Record, DailyStats, VideoView, YouTubePlaylist, PlaylistVideo
+from page_cache import make_cache_key
+from accounts import current_user_id
+
+# data_version テーブルの行（カウンターごとに1行）
+DATA_VERSION_ID = 1
+PROGRESS_VERSION_ID = 2
+
+# 各カウンターを上げるテーブル。統計APIは記録と日別集計を、
+# /statistics/youtube_progress は視聴情報と再生リストを参照する
+VERSIONED_MODELS = {
+    DATA_VERSION_ID: (Record, DailyStats),
+    PROGRESS_VERSION_ID: (VideoView, YouTubePlaylist, PlaylistVideo),
+}
+
+
+def _version_ids(cls):
+    return [version_id for version_id, models in VERSIONED_MODELS.items() if issubclass(cls, models)]
+
+
+def _bump_data_version(connection, version_id):
+    table = DataVersion.__table__
+    connection.execute(update(table).where(table.c.id == version_id).values(version=table.c.version + 1))
+
+
+def _after_flush(session, flush_context):
+    # new / dirty / deleted still hold the pre-flush state here
+    bumped = set()
+    for obj in chain(session.new, session.deleted, session.dirty):
+        version_ids = set(_version_ids(type(obj))) - bumped
+        if not version_ids:
+            continue
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        for version_id in version_ids:
+            _bump_data_version(session.connection(), version_id)
+        bumped |= version_ids
+
+
+def _do_orm_execute(orm_execute_state):
+    # Bulk statements (query.delete(), update(), upserts) bypass the flush
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None:
+        for version_id in _version_ids(mapper.class_):
+            _bump_data_version(orm_execute_state.session.connection(), version_id)
+
+
+def ensure_data_version():
+    """バージョン行が無ければ作成します（起動時）。"""
+    # 複数のプロセスが同時に起動しても主キーが衝突しないよう INSERT OR IGNORE 相当で作成する
+    for version_id in VERSIONED_MODELS:
+        db.session.execute(sqlite_insert(DataVersion).values(id=version_id, version=0).on_conflict_do_nothing())
+    db.session.commit()
+
+
+def current_data_version(version_id=DATA_VERSION_ID):
+    """現在のデータバージョン（既定は統計用のカウンター）を返します。"""
+    return db.session.execute(select(DataVersion.version).where(DataVersion.id == version_id)).scalar() or 0
+
+
+class ResponseCache:
+    """データバージョン単位で無効化されるレスポンスのLRUキャッシュ。"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (body, mimetype)
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def init_app(self, app):
+        """設定を読み込み、データバージョンを更新するイベントを登録します。"""
+        self.max_entries = app.config.setdefault('RESPONSE_CACHE_MAX_ENTRIES', self.max_entries)
+        if not event.contains(Session, 'after_flush', _after_flush):
+            event.listen(Session, 'after_flush', _after_flush)
+            event.listen(Session, 'do_orm_execute', _do_orm_execute)
+
+    def cached(self, view=None, version_id=DATA_VERSION_ID):
+        """GETハンドラをメモ化するデコレータ。
+
+        The key covers the endpoint, its URL arguments, the query string,
+        the requesting user, today's date (for handlers that default to
+        "now") and the data version. Only 200 responses are stored. Use
+        ``@response_cache.cached(version_id=PROGRESS_VERSION_ID)`` for a
+        handler that reads watch progress instead of records.
+        """
+        if view is None:
+            return lambda view: self.cached(view, version_id)
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = make_cache_key(
+                request.endpoint,
+                sorted(kwargs.items()),
+                sorted(request.args.items(multi=True)),
+                current_user_id(),
+                date.today().isoformat(),
+                version_id,
+                current_data_version(version_id),
+            )
+            if key in request.if_none_match:
+                self.not_modified += 1
+                response = Response(status=304)
+            else:
+                entry = self._get(key)
+                if entry is None:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    entry = (response.get_data(), response.mimetype)
+                    self._put(key, entry)
+                response = Response(entry[0], mimetype=entry[1])
+            response.set_etag(key)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+
+    def clear(self):
+        """全てのエントリを削除します。"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """ヒット/ミス/304の回数とエントリ数を返します。"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+            }
+
+    # --- 内部処理 ---
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def _put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+response_cache = ResponseCache()
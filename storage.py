@@ -0,0 +1,88 @@
+"""
+SQLite Storage Configuration
+
+Connection pragmas and write retry for running the app with several
+server processes on one SQLite file:
+
+- WAL journal, so readers never block behind a writer (and vice versa)
+- synchronous=NORMAL, which is durable across application crashes in
+  WAL mode and avoids an fsync per commit
+- busy_timeout, so a writer waits for the lock instead of failing
+- mmap_size / cache_size for read-heavy statistics queries
+
+A write transaction that still fails with SQLITE_BUSY (e.g. a deferred
+transaction whose snapshot went stale while it waited) is rolled back and
+re-run by run_with_retry() with exponential backoff.
+"""
+
+import random
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from models import db
+
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # ミリ秒
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # 負の値は KiB 単位（64MB）
+    'temp_store': 'MEMORY',
+}
+
+WRITE_RETRIES = 5
+WRITE_RETRY_BASE_DELAY = 0.05  # 秒（試行ごとに倍増）
+
+_BUSY_MESSAGES = ('database is locked', 'database is busy', 'database table is locked')
+
+
+def init_storage(app):
+    """SQLite接続ごとにプラグマを設定するイベントを登録します。db.init_app の後に呼び出します。"""
+    pragmas = app.config.setdefault('SQLITE_PRAGMAS', dict(DEFAULT_SQLITE_PRAGMAS))
+    app.config.setdefault('DB_WRITE_RETRIES', WRITE_RETRIES)
+
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+        finally:
+            cursor.close()
+
+
+def is_busy_error(error):
+    """SQLITE_BUSY / SQLITE_LOCKED によるエラーかどうかを判定します。"""
+    return isinstance(error, OperationalError) and any(m in str(error.orig).lower() for m in _BUSY_MESSAGES)
+
+
+def run_with_retry(write, retries=None, base_delay=WRITE_RETRY_BASE_DELAY):
+    """書き込み処理を実行し、ロック競合で失敗した場合はロールバックして再実行します。
+
+    ``write`` must perform the whole unit of work including the commit, so
+    that it can be re-run from scratch; anything it added to the session
+    is discarded by the rollback before the next attempt.
+
+    Returns:
+        The return value of ``write``
+    """
+    if retries is None:
+        from flask import current_app
+        retries = current_app.config.get('DB_WRITE_RETRIES', WRITE_RETRIES)
+
+    for attempt in range(retries + 1):
+        try:
+            return write()
+        except OperationalError as e:
+            db.session.rollback()
+            if attempt >= retries or not is_busy_error(e):
+                raise
+            # Full jitter so that competing writers do not retry in lockstep
+            time.sleep(random.uniform(0, base_delay * (2 ** attempt)))
@@ -0,0 +1,59 @@
+"""
+User XP Accounting
+
+Changes to UserStatus.total_xp are issued as a single SQL increment in
+the caller's transaction instead of read-modify-write in Python, so
+concurrent requests (or server processes) cannot overwrite each other's
+XP. reconcile_user_xp() recomputes a user's total from their records.
+"""
+
+from sqlalchemy import func, update
+
+from models import db, UserStatus, Record
+
+
+def get_user_status(user_id):
+    """ユーザーのステータス行を返します。無い場合は None。"""
+    return UserStatus.query.filter_by(user_id=user_id).first()
+
+
+def add_user_xp(delta, user_id):
+    """ユーザーの累計XPに delta を加算（負の値で減算、0未満にはしない）し、加算後の値を返します。
+
+    Runs as one UPDATE ... RETURNING in the current transaction; the
+    commit is left to the caller. The status row is created if missing.
+    """
+    total_xp = db.session.execute(
+        update(UserStatus)
+        .where(UserStatus.user_id == user_id)
+        .values(total_xp=func.max(0, UserStatus.total_xp + delta))
+        .returning(UserStatus.total_xp),
+        execution_options={'synchronize_session': 'fetch'}
+    ).scalar()
+    if total_xp is None:
+        total_xp = max(0, delta)
+        db.session.add(UserStatus(user_id=user_id, username='新規ユーザー', total_xp=total_xp))
+    return total_xp
+
+
+def reconcile_user_xp(user_id, apply=True):
+    """ユーザーの累計XPを記録の合計から再計算します。
+
+    Returns:
+        Tuple of (stored_total, recomputed_total); the stored value is
+        replaced when ``apply`` is true
+    """
+    recomputed = db.session.query(func.coalesce(func.sum(Record.xp_gained), 0)).filter(
+        Record.user_id == user_id
+    ).scalar()
+    user_status = get_user_status(user_id)
+    stored = user_status.total_xp if user_status else 0
+    if apply and stored != recomputed:
+        if user_status:
+            db.session.execute(
+                update(UserStatus).where(UserStatus.user_id == user_id).values(total_xp=recomputed)
+            )
+        else:
+            db.session.add(UserStatus(user_id=user_id, username='新規ユーザー', total_xp=recomputed))
+        db.session.commit()
+    return stored, recomputed